@@ -1,6 +1,8 @@
 import streamlit as st
 from datetime import datetime, timedelta
 
+from gazetteer import destination_season
+
 # Set page configuration
 st.set_page_config(
     page_title="Destination & Budget - AI Travel Magic",
@@ -18,15 +20,14 @@ if 'trip_purpose' not in st.session_state:
 if 'preferences' not in st.session_state:
     st.session_state.preferences = []
 if 'season' not in st.session_state:
-    current_month = datetime.now().month
-    if 3 <= current_month <= 5:
-        st.session_state.season = "Spring"
-    elif 6 <= current_month <= 8:
-        st.session_state.season = "Summer"
-    elif 9 <= current_month <= 11:
-        st.session_state.season = "Fall"
-    else:
-        st.session_state.season = "Winter"
+    st.session_state.season = destination_season(st.session_state.destination, datetime.now())
+if 'season_chosen' not in st.session_state:
+    st.session_state.season_chosen = False
+
+def choose_season():
+    """Keep the season the user picked instead of the one derived from the destination"""
+    st.session_state.season = st.session_state.season_select
+    st.session_state.season_chosen = True
 
 # Title and description
 st.title("✈️ Where to Next?")
@@ -112,13 +113,17 @@ with col2:
 
     # Season selection
     st.markdown("### Travel Season")
+    # Until the user picks a season, default to the current one at the destination
+    # (so Sydney in July is Winter)
+    if not st.session_state.season_chosen:
+        st.session_state.season = destination_season(st.session_state.destination, datetime.now())
+    st.session_state.season_select = st.session_state.season
     season = st.selectbox(
         "When are you planning to travel?",
         options=["Spring", "Summer", "Fall", "Winter"],
-        index=["Spring", "Summer", "Fall", "Winter"].index(st.session_state.season),
-        key="season_select"
+        key="season_select",
+        on_change=choose_season
     )
-    st.session_state.season = season
 
 # Navigation buttons
 st.markdown("---")
@@ -1,7 +1,10 @@
 import streamlit as st
 from datetime import datetime, timedelta
-import json
-import random
+
+from inference_worker import get_inference_client
+from model_registry import get_model
+from station_history import trip_history
+from weather_prediction import predict_weather_range
 
 # Set page configuration
 st.set_page_config(
@@ -10,90 +13,6 @@ st.set_page_config(
     layout="wide"
 )
 
-# Function to predict weather based on destination, season and date
-def predict_weather(destination, date, season, model, tokenizer):
-    """
-    Generate weather prediction for a specific date at the destination.
-    Uses the destination, date, and season to predict likely weather.
-    
-    Returns a tuple of (weather_description, temperature_range, weather_icon)
-    """
-    # First check cache to avoid regenerating
-    cache_key = f"{destination}_{date.strftime('%Y-%m-%d')}_{season}"
-    if cache_key in st.session_state.weather_cache:
-        return st.session_state.weather_cache[cache_key]
-    
-    # Prepare prompt for weather prediction
-    month_name = date.strftime("%B")
-    day_of_month = date.strftime("%d")
-    
-    prompt = f"""Predict the most likely weather for {destination} on {month_name} {day_of_month} during {season} season.
-Return the response as valid JSON in this exact format:
-{{
-  "weather_description": "Short 2-3 word description (e.g., 'Sunny and clear', 'Light rain', 'Partly cloudy')",
-  "temperature_range": "Temperature range in both Celsius and Fahrenheit (e.g., '18-24°C (64-75°F)')",
-  "weather_icon": "One of: ☀️ (sunny), ⛅ (partly cloudy), ☁️ (cloudy), 🌧️ (rainy), ⛈️ (thunderstorm), ❄️ (snow), 🌫️ (foggy)"
-}}
-For your prediction, consider that {destination} in {season} typically has [typical weather pattern].
-"""
-    
-    try:
-        if model is None or tokenizer is None:
-            raise ValueError("Weather model not available")
-            
-        # Generate the weather prediction using LLM from main.py
-        # For this page we'll use the fallback since the real function relies on imported functions
-        raise ValueError("Using fallback weather generation")
-            
-    except Exception as e:
-        # Fallback weather generation based on season
-        if not st.session_state.get('suppress_warnings', False):
-            st.warning(f"Using simplified weather prediction. LLM-based prediction will be available in the full app.")
-            st.session_state.suppress_warnings = True
-        
-        # Generate fallback weather by season
-        season_weather = {
-            "Spring": [
-                ("Mild and sunny", "15-22°C (59-72°F)", "⛅"),
-                ("Light showers", "12-18°C (54-64°F)", "🌧️"),
-                ("Partly cloudy", "14-20°C (57-68°F)", "☁️")
-            ],
-            "Summer": [
-                ("Hot and sunny", "25-32°C (77-90°F)", "☀️"),
-                ("Warm with clouds", "22-28°C (72-82°F)", "⛅"),
-                ("Afternoon thunderstorm", "23-30°C (73-86°F)", "⛈️")
-            ],
-            "Fall": [
-                ("Cool and breezy", "12-18°C (54-64°F)", "⛅"),
-                ("Misty morning", "10-16°C (50-61°F)", "🌫️"),
-                ("Partly cloudy", "13-20°C (55-68°F)", "☁️")
-            ],
-            "Winter": [
-                ("Cold and clear", "2-8°C (36-46°F)", "☀️"),
-                ("Light snow", "-2-5°C (28-41°F)", "❄️"),
-                ("Overcast", "0-6°C (32-43°F)", "☁️")
-            ]
-        }
-        
-        # For destinations with extreme weather, modify predictions
-        if "Iceland" in destination or "Norway" in destination and season == "Winter":
-            season_weather["Winter"] = [
-                ("Very cold", "-10-0°C (14-32°F)", "❄️"),
-                ("Snow showers", "-15--5°C (5-23°F)", "❄️"),
-                ("Northern lights", "-12--2°C (10-28°F)", "☀️")
-            ]
-        elif "Dubai" in destination or "Egypt" in destination and season == "Summer":
-            season_weather["Summer"] = [
-                ("Extremely hot", "35-45°C (95-113°F)", "☀️"),
-                ("Hot and dry", "33-42°C (91-108°F)", "☀️"),
-                ("Hot and hazy", "34-43°C (93-109°F)", "☀️")
-            ]
-        
-        # Get random weather for the season
-        result = random.choice(season_weather.get(season, season_weather["Spring"]))
-        st.session_state.weather_cache[cache_key] = result
-        return result
-
 # Initialize session state variables
 if 'destination' not in st.session_state or not st.session_state.destination:
     st.session_state.destination = ""
@@ -103,8 +22,6 @@ if 'start_date' not in st.session_state:
 if 'end_date' not in st.session_state:
     # Default to a week after start date
     st.session_state.end_date = (datetime.now() + timedelta(days=7)).date()
-if 'weather_cache' not in st.session_state:
-    st.session_state.weather_cache = {}
 
 # Title and description
 st.title("📅 Travel Dates & Weather")
@@ -154,59 +71,67 @@ st.markdown(f"**Trip Duration:** {trip_duration} {'days' if trip_duration > 1 el
 st.markdown("### Weather Forecast")
 st.markdown(f"Predicted weather for your trip to {st.session_state.destination}:")
 
-# Create weather forecast cards
-current_date = start_date
-weather_data = []
+# Predict the whole trip in one pass, then render the cards from the result
+# (the inference worker has its own model, so none is loaded here when it is used)
+if get_inference_client() is None:
+    weather_model, weather_tokenizer = get_model("weather", wait=False)
+else:
+    weather_model, weather_tokenizer = None, None
+forecast = predict_weather_range(
+    st.session_state.destination,
+    start_date,
+    end_date,
+    st.session_state.season,
+    weather_model,
+    weather_tokenizer
+)
+if forecast.estimated and not st.session_state.get('suppress_warnings', False):
+    st.warning(f"Using simplified weather prediction. LLM-based prediction will be available in the full app.")
+    st.session_state.suppress_warnings = True
+
+# What the nearest weather station recorded around each day in past years
+history = trip_history(st.session_state.destination, [forecast.date(i) for i in range(len(forecast))])
 
 # Display calendar with weather in a grid
 num_cols = min(5, trip_duration)  # Display 5 days per row
-remaining_days = trip_duration
 
 st.markdown('<div class="calendar-container">', unsafe_allow_html=True)
 
-while remaining_days > 0:
-    cols = st.columns(min(num_cols, remaining_days))
+for row_start in range(0, len(forecast), num_cols):
+    row_days = min(num_cols, len(forecast) - row_start)
+    cols = st.columns(row_days)
     
-    for i in range(min(num_cols, remaining_days)):
+    for i in range(row_days):
         with cols[i]:
-            date_str = current_date.strftime("%b %d")
-            day_name = current_date.strftime("%A")
-            
-            # Get weather prediction
-            weather_desc, temp_range, weather_icon = predict_weather(
-                st.session_state.destination, 
-                current_date, 
-                st.session_state.season,
-                st.session_state.get('weather_model'),
-                st.session_state.get('weather_tokenizer')
-            )
-            
-            # Store weather data for later use
-            weather_data.append({
-                "date": current_date.strftime("%Y-%m-%d"),
-                "day_name": day_name,
-                "weather": weather_desc,
-                "temperature": temp_range,
-                "icon": weather_icon
-            })
+            current_date = forecast.date(row_start + i)
+            weather_desc, temp_range, weather_icon = forecast[row_start + i]
+            history_line = ""
+            if history is not None:
+                day = row_start + i
+                history_line = (
+                    f"<div style=\"font-size: 0.85rem;\">🌧️ {history['rain_probability'][day]:.0%} chance of rain<br>"
+                    f"Highs {history['tmax_p10'][day]:.0f} to {history['tmax_p90'][day]:.0f}°C most years</div>"
+                )
             
             # Display weather card
-            st.markdown(f"<h4>{date_str} ({day_name})</h4>", unsafe_allow_html=True)
+            st.markdown(f"<h4>{current_date.strftime('%b %d')} ({current_date.strftime('%A')})</h4>", unsafe_allow_html=True)
             st.markdown(f"""
             <div style="text-align: center; padding: 10px;">
                 <div style="font-size: 2rem;">{weather_icon}</div>
                 <div><b>{weather_desc}</b></div>
                 <div>{temp_range}</div>
+                {history_line}
             </div>
             """, unsafe_allow_html=True)
-            
-            current_date = current_date + timedelta(days=1)
-            
-    remaining_days -= num_cols
 
 st.markdown('</div>', unsafe_allow_html=True)
 
+if history is not None:
+    st.caption(f"Rain chances and temperature ranges are from daily records at {history['station_name']} "
+               f"over past years (10th to 90th percentile of daily highs).")
+
 # Save weather data to session state for use in itinerary generation
+weather_data = forecast.records()
 st.session_state.weather_data = weather_data
 
 # Packing suggestions based on weather and destination
@@ -1,6 +1,11 @@
 import streamlit as st
 import random
 
+from destination_names import canonical_destination
+from inference_worker import get_inference_client
+from itinerary_generator import stream_itinerary
+from model_registry import get_model
+
 # Set page configuration
 st.set_page_config(
     page_title="Itinerary Generation - AI Travel Magic",
@@ -32,11 +37,78 @@ st.markdown(f"*Trip Duration:* {trip_duration} days")
 if 'trip_purpose' in st.session_state:
     st.markdown(f"*Trip Purpose:* {st.session_state.trip_purpose}")
 
-# Ensure we have an itinerary
+def render_day(day):
+    """Show one day of the itinerary with its morning, afternoon and evening"""
+    st.markdown(f"### Day {day['day']}: {day['day_name']}")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.subheader("Morning")
+        morning = day.get('morning', {})
+        st.markdown(f"{morning.get('title', '')}")
+        st.markdown(morning.get('description', ''))
+
+    with col2:
+        st.subheader("Afternoon")
+        afternoon = day.get('afternoon', {})
+        st.markdown(f"{afternoon.get('title', '')}")
+        st.markdown(afternoon.get('description', ''))
+
+    with col3:
+        st.subheader("Evening")
+        evening = day.get('evening', {})
+        st.markdown(f"{evening.get('title', '')}")
+        st.markdown(evening.get('description', ''))
+
+    st.markdown("---")
+
+# Have the model write the itinerary, showing each day as soon as it's written.
+# The inference worker has its own model, so none is loaded here when it is used
+streamed_days = []
+if 'itinerary' not in st.session_state or not st.session_state.itinerary:
+    if get_inference_client() is None:
+        llm_model, llm_tokenizer = get_model("llm", wait=False)
+    else:
+        llm_model, llm_tokenizer = None, None
+    if get_inference_client() is not None or llm_model is not None:
+        stream_area = st.empty()
+        with stream_area.container():
+            progress = st.empty()
+            progress.caption(f"✍️ Writing day 1 of {trip_duration}...")
+            for day in stream_itinerary(
+                st.session_state.destination,
+                trip_duration,
+                st.session_state.budget,
+                st.session_state.get('trip_purpose'),
+                st.session_state.weather_data,
+                llm_model,
+                llm_tokenizer
+            ):
+                streamed_days.append(day)
+                render_day(day)
+                if len(streamed_days) < trip_duration:
+                    progress.caption(f"✍️ Writing day {len(streamed_days) + 1} of {trip_duration}...")
+            progress.empty()
+        if streamed_days and len(streamed_days) == trip_duration:
+            st.session_state.itinerary = {
+                "trip_info": {
+                    "destination": st.session_state.destination,
+                    "budget": st.session_state.budget,
+                    "duration": f"{trip_duration} days"
+                },
+                "daily_plan": streamed_days
+            }
+        else:
+            # The model stopped short: drop the partial plan and use the templates
+            stream_area.empty()
+            streamed_days = []
+
+# Otherwise build it from the destination templates
 if 'itinerary' not in st.session_state or not st.session_state.itinerary:
     # Create specific activities based on destination
     destination_specific = {
-        "Paris": {
+        "paris": {
             "attractions": [
                 "Eiffel Tower Summit & Iron Lady Restaurant",
                 "Louvre Museum - Mona Lisa & Venus de Milo Gallery",
@@ -126,12 +198,12 @@ if 'itinerary' not in st.session_state or not st.session_state.itinerary:
                 "Sunset at Montparnasse Tower"
             ]
         },
-        "Tokyo": {
+        "tokyo": {
             "attractions": ["Sensoji Temple", "Meiji Shrine", "Tokyo Skytree", "Tsukiji Outer Market", "Shinjuku Gyoen"],
             "restaurants": ["Narisawa", "Sukiyabashi Jiro", "Ukai-tei", "Gonpachi Nishi-Azabu", "Tsuta Japanese Soba"],
             "activities": ["Teamlab Borderless", "Harajuku Fashion Street", "Sumo Wrestling Match", "Robot Restaurant Show", "Mt. Fuji Day Trip"]
         },
-        "New York": {
+        "new-york": {
             "attractions": ["Statue of Liberty", "Central Park", "Empire State Building", "Metropolitan Museum", "Times Square"],
             "restaurants": ["Le Bernardin", "Eleven Madison Park", "Peter Luger", "Katz's Delicatessen", "Grimaldi's Pizza"],
             "activities": ["Broadway Show", "High Line Walk", "Brooklyn Bridge Sunset", "Fifth Avenue Shopping", "NYC Food Tour"]
@@ -139,7 +211,7 @@ if 'itinerary' not in st.session_state or not st.session_state.itinerary:
     }
 
     # Get destination-specific details or use generic ones
-    dest_details = destination_specific.get(st.session_state.destination, {
+    dest_details = destination_specific.get(canonical_destination(st.session_state.destination), {
         "attractions": [f"Famous {st.session_state.destination} Landmark", f"{st.session_state.destination} Historical Site"],
         "restaurants": [f"Top-rated {st.session_state.destination} Restaurant", f"Local {st.session_state.destination} Eatery"],
         "activities": [f"{st.session_state.destination} City Tour", f"{st.session_state.destination} Cultural Experience"]
@@ -225,33 +297,11 @@ if 'itinerary' not in st.session_state or not st.session_state.itinerary:
             }
             st.session_state.itinerary["daily_plan"].append(new_day)
 
-# Display daily itinerary
+# Display daily itinerary (days streamed in above are already on the page)
 daily_plan = st.session_state.itinerary.get('daily_plan', [])
 
-for day in daily_plan:
-    st.markdown(f"### Day {day['day']}: {day['day_name']}")
-
-    col1, col2, col3 = st.columns(3)
-
-    with col1:
-        st.subheader("Morning")
-        morning = day.get('morning', {})
-        st.markdown(f"{morning.get('title', '')}")
-        st.markdown(morning.get('description', ''))
-
-    with col2:
-        st.subheader("Afternoon")
-        afternoon = day.get('afternoon', {})
-        st.markdown(f"{afternoon.get('title', '')}")
-        st.markdown(afternoon.get('description', ''))
-
-    with col3:
-        st.subheader("Evening")
-        evening = day.get('evening', {})
-        st.markdown(f"{evening.get('title', '')}")
-        st.markdown(evening.get('description', ''))
-
-    st.markdown("---")
+for day in daily_plan[len(streamed_days):]:
+    render_day(day)
 
 # Add a download button for the itinerary
 st.download_button(
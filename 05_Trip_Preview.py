@@ -9,6 +9,9 @@ import hashlib
 from urllib.parse import quote_plus
 import base64
 
+from destination_names import canonical_destination
+from inference_worker import CAPTION, get_inference_client
+
 # Set page configuration
 st.set_page_config(
     page_title="Trip Preview - AI Travel Magic",
@@ -313,16 +316,42 @@ def get_placeholder_image(idx=0):
     return cache_file if os.path.exists(cache_file) else placeholder_url
 
 # Use a local LLM for enhanced image descriptions
-def generate_image_description(location, activity):
-    """Generate an enhanced image description using a local LLM"""
-    try:
-        # Prepare prompt for LLM
-        prompt = f"""Create a detailed, accurate description for a travel image of '{activity}' in '{location}'. 
+def image_description_prompt(location, activity):
+    """Prompt asking the LLM to describe a travel image"""
+    return f"""Create a detailed, accurate description for a travel image of '{activity}' in '{location}'. 
         Focus on visual elements like landscape, architecture, colors, and atmosphere. 
         Keep it under 50 words and don't include any non-visual elements."""
-        
-        # In real implementation, call your local LLM here
-        # For now, we'll provide some handcrafted descriptions based on activity type
+
+def submit_image_descriptions(location, activities):
+    """Send every caption prompt to the inference worker at once so they share batches"""
+    client = get_inference_client()
+    if client is None:
+        return {}
+    pending = {}
+    try:
+        for activity in activities:
+            if activity not in pending:
+                pending[activity] = client.submit(CAPTION, image_description_prompt(location, activity), max_new_tokens=80)
+    except Exception as e:
+        print(f"Error submitting image descriptions: {e}")
+    return pending
+
+def generate_image_description(location, activity, pending=None):
+    """Generate an enhanced image description using the LLM on the inference worker"""
+    try:
+        # Captions come from the inference worker when one is configured
+        client = get_inference_client()
+        if client is not None:
+            try:
+                if pending is None:
+                    pending = client.submit(CAPTION, image_description_prompt(location, activity), max_new_tokens=80)
+                caption = pending.result(timeout=client.timeout).strip()
+                if caption:
+                    return caption
+            except Exception as e:
+                print(f"Error generating image description: {e}")
+
+        # Otherwise, handcrafted descriptions based on activity type
         if "restaurant" in activity.lower() or "food" in activity.lower() or "dining" in activity.lower():
             return f"Authentic local cuisine from {location}, showcasing traditional dishes with fresh ingredients, vibrant colors, and artful presentation."
         elif "museum" in activity.lower() or "gallery" in activity.lower():
@@ -384,7 +413,7 @@ def get_smart_image(location, activity, index=0):
 # Activity fingerprint to ensure uniqueness
 def create_activity_fingerprint(location, activity, day_idx, period_idx):
     """Create a unique fingerprint for this specific activity instance"""
-    return f"{location}_{activity}_{day_idx}_{period_idx}"
+    return f"{canonical_destination(location)}_{activity}_{day_idx}_{period_idx}"
 
 # Function to get unique image for each activity
 def get_unique_activity_image(location, activity, day_idx, period_idx):
@@ -423,6 +452,13 @@ if st.session_state.get('refresh_images', False):
                 
     st.session_state.refresh_images = False
 
+# Ask for every caption up front; each is collected when its image is shown
+caption_requests = submit_image_descriptions(
+    st.session_state.destination,
+    [day.get(period, {}).get('title', '') for day in daily_plan for period in ['morning', 'afternoon', 'evening']
+     if day.get(period, {}).get('title', '')]
+)
+
 # Display daily activities with images
 for day_idx, day in enumerate(daily_plan):
     st.markdown(f"### Day {day['day']}: {day['day_name']}")
@@ -444,7 +480,7 @@ for day_idx, day in enumerate(daily_plan):
                     0
                 )
                 # Generate enhanced description
-                enhanced_description = generate_image_description(st.session_state.destination, morning_activity)
+                enhanced_description = generate_image_description(st.session_state.destination, morning_activity, caption_requests.get(morning_activity))
                 st.image(image_path, caption=enhanced_description, use_container_width=True)
                 st.markdown(f"**{morning_activity}**")
                 if description:
@@ -465,7 +501,7 @@ for day_idx, day in enumerate(daily_plan):
                     1
                 )
                 # Generate enhanced description
-                enhanced_description = generate_image_description(st.session_state.destination, afternoon_activity)
+                enhanced_description = generate_image_description(st.session_state.destination, afternoon_activity, caption_requests.get(afternoon_activity))
                 st.image(image_path, caption=enhanced_description, use_container_width=True)
                 st.markdown(f"**{afternoon_activity}**")
                 if description:
@@ -486,7 +522,7 @@ for day_idx, day in enumerate(daily_plan):
                     2
                 )
                 # Generate enhanced description
-                enhanced_description = generate_image_description(st.session_state.destination, evening_activity)
+                enhanced_description = generate_image_description(st.session_state.destination, evening_activity, caption_requests.get(evening_activity))
                 st.image(image_path, caption=enhanced_description, use_container_width=True)
                 st.markdown(f"**{evening_activity}**")
                 if description:
@@ -522,7 +558,7 @@ if highlights:
                     1000 + idx  # Use 1000+ to ensure different from main listing
                 )
                 # Generate custom caption
-                caption = generate_image_description(st.session_state.destination, highlight['activity'])
+                caption = generate_image_description(st.session_state.destination, highlight['activity'], caption_requests.get(highlight['activity']))
                 st.image(image_path, caption=f"Day {highlight['day']}: {highlight['activity']}", use_container_width=True)
 
 # Navigation buttons
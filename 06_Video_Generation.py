@@ -14,6 +14,8 @@ import shutil
 import base64
 import io
 
+from destination_names import canonical_destination
+
 # Set page configuration
 st.set_page_config(
     page_title="Cinematic Video - AI Travel Magic",
@@ -664,7 +666,7 @@ def get_video_path():
         return st.session_state.video_path
     
     # Create a unique video filename
-    destination_slug = st.session_state.destination.lower().replace(' ', '_')
+    destination_slug = canonical_destination(st.session_state.destination).replace('-', '_')
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     return f"data/videos/{destination_slug}_{timestamp}.mp4"
 
@@ -4,6 +4,8 @@ import requests
 from datetime import datetime, timedelta
 import time
 
+from destination_names import canonical_destination
+
 # Set page configuration
 st.set_page_config(
     page_title="Travel Bookings - AI Travel Magic",
@@ -48,7 +50,7 @@ def format_url_safely(url_template, **kwargs):
         return None
 
 def get_airport_codes():
-    """Return a dictionary of city names to airport codes"""
+    """Return a dictionary of destination IDs (see canonical_destination) to airport codes"""
     # Common airport codes for popular destinations
     return {
         "delhi": "DEL",
@@ -62,7 +64,7 @@ def get_airport_codes():
         "pune": "PNQ",
         "jaipur": "JAI",
         "lucknow": "LKO",
-        "new york": "NYC",
+        "new-york": "NYC",
         "london": "LON",
         "paris": "PAR",
         "tokyo": "TYO",
@@ -269,12 +271,12 @@ with col2:
 
 # Get airport codes
 airport_codes = get_airport_codes()
-destination_lower = st.session_state.destination.split(',')[0].strip().lower()
-origin_lower = origin_city.split(',')[0].strip().lower() if origin_city else ""
+destination_id = canonical_destination(st.session_state.destination)
+origin_id = canonical_destination(origin_city) if origin_city else ""
 
 # Try to get airport codes
-destination_code = airport_codes.get(destination_lower, "")
-origin_code = airport_codes.get(origin_lower, "")
+destination_code = airport_codes.get(destination_id, "")
+origin_code = airport_codes.get(origin_id, "")
 
 # Load booking options
 booking_options = load_booking_options()
@@ -3,6 +3,10 @@ import json
 import os
 import time
 
+from inference_worker import INFERENCE_WORKER_ADDRESS, get_inference_client
+from model_registry import FAILED, LOADED, LOADING, get_registry
+from prompt_cache import get_prompt_cache
+
 # Set page configuration
 st.set_page_config(
     page_title="Settings - AI Travel Magic",
@@ -316,6 +320,68 @@ global_css = f"""
 """
 st.markdown(global_css, unsafe_allow_html=True)
 
+# Model warm-up progress
+st.markdown("## 🧠 AI Models")
+
+prompt_cache_stats = None
+client = get_inference_client()
+if client is not None:
+    st.markdown(f"Text generation runs on the inference worker at `{INFERENCE_WORKER_ADDRESS}`.")
+    try:
+        worker_stats = client.stats()
+        st.markdown(f"*Model:* {worker_stats['model']}")
+        st.markdown(f"*Requests:* {worker_stats['requests']} in {worker_stats['batches']} batches "
+                    f"(mean batch size {worker_stats['mean_batch_size']})")
+        prompt_cache_stats = worker_stats['prompt_cache']
+    except Exception as e:
+        st.warning(f"The inference worker isn't reachable, so simplified text generation is used: {e}")
+else:
+    registry = get_registry()
+    warm_up = registry.warm_up_status()
+    models = registry.status()
+    if not warm_up['started']:
+        st.info("Models haven't started loading yet. Loading starts in the background when the home page is first opened.")
+    else:
+        total = len(warm_up['names'])
+        st.progress(warm_up['done'] / total, text=f"{warm_up['done']} of {total} models ready")
+        if warm_up['finished']:
+            st.markdown(f"*Warm-up finished in:* {warm_up['seconds']:.1f} seconds")
+        else:
+            st.markdown(f"*Warming up for:* {warm_up['seconds']:.0f} seconds - pages use simplified generation until it's done")
+
+    model_rows = []
+    for name in warm_up['names'] or [name for name in models if name != "process_memory_bytes"]:
+        model = models[name]
+        if model['state'] == LOADED:
+            ready = (registry.peek(name) or (None, None))[0] is not None
+            status = "✅ Ready" if ready else "Not configured (simplified generation)"
+        elif model['state'] == LOADING:
+            status = f"⏳ Loading for {time.time() - model['started_at']:.0f}s"
+        elif model['state'] == FAILED:
+            status = f"❌ Failed: {model['error']}"
+        else:
+            status = "Waiting"
+        model_rows.append({
+            "Model": name if model['shares'] is None else f"{name} (shares {model['shares']})",
+            "Status": status,
+            "Load time": f"{model['load_seconds']:.1f}s" if model['load_seconds'] is not None else "-",
+            "Memory": f"{model['memory_bytes'] / (1024 * 1024):.0f} MB" if model['memory_bytes'] is not None else "-"
+        })
+    st.table(model_rows)
+    if models['process_memory_bytes'] is not None:
+        st.caption(f"Server memory in use: {models['process_memory_bytes'] / (1024 * 1024):.0f} MB")
+    prompt_cache = get_prompt_cache()
+    if prompt_cache is not None:
+        prompt_cache_stats = prompt_cache.stats()
+
+if prompt_cache_stats is not None:
+    st.markdown(f"*Prompt cache:* {prompt_cache_stats['hits']} hits, {prompt_cache_stats['misses']} misses "
+                f"({prompt_cache_stats['hit_rate']:.0%} hit rate), "
+                f"{prompt_cache_stats['entries']} of {prompt_cache_stats['max_entries']} completions stored")
+
+if st.button("Refresh Model Status", use_container_width=True):
+    st.rerun()
+
 # Navigation buttons
 st.markdown("---")
 col1, col2 = st.columns([1, 1])
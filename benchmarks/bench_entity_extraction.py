@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Compare the legacy findall regexes with the keyword-scan extractors in guide_entities.
+
+Runs both over the See/Eat/Do sections of each page, checks that they return
+identical results and prints the time each one took.
+
+Usage:
+    python benchmarks/bench_entity_extraction.py [page.html ...] [--repeat 20]
+
+With no pages given, every recorded page under benchmarks/fixtures/ is used
+(including the scraper benchmark's fixtures/pipeline/<source>/ recordings), or
+a set of generated guide pages if there are none.
+"""
+
+import argparse
+import glob
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from guide_entities import activity_names, attraction_names, restaurant_names
+from guide_sections import index_sections, index_xml_sections, section_text
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+REPEAT = 20
+
+# The patterns get_destination_info used before guide_entities existed
+LEGACY_PATTERNS = {
+    "attractions": r'(?:^|\n)[^\n]*?([A-Z][a-zA-Z\s\'\-]{3,}(?:Museum|Palace|Castle|Cathedral|Temple|Church|Square|Park|Garden|Bridge|Tower|Monument|Gallery|Arena|Center|Theatre|Library|Zoo|Aquarium))[^\n]*',
+    "restaurants": r'(?:^|\n)[^\n]*?([A-Z][a-zA-Z\s\'\-]{2,}(?:Restaurant|Café|Bistro|Trattoria|Pizzeria|Brasserie|Steakhouse|Grill|Diner|Eatery))[^\n]*',
+    "activity_names": r'(?:^|\n)[^\n]*?([A-Z][a-zA-Z\s\'\-]{5,}(?:Tour|Class|Experience|Festival|Show|Event))[^\n]*'
+}
+
+EXTRACTORS = {
+    "attractions": (attraction_names, "see"),
+    "restaurants": (restaurant_names, "eat"),
+    "activity_names": (activity_names, "do")
+}
+
+
+def generated_page(seed, listings=400):
+    """Build a long WikiVoyage-style page in plain text"""
+    rng = random.Random(seed)
+    words = ["Old", "Grand", "Royal", "National", "Saint", "Marco", "Central", "North", "Harbour", "River",
+             "the", "with", "and", "open", "daily", "from", "until", "free", "entry", "near", "station"]
+    suffixes = ["Museum", "Palace", "Park", "Tower", "Gallery", "Bistro", "Grill", "Restaurant", "Tour", "Show"]
+    lines = []
+    for heading in ["Understand", "See", "Do", "Buy", "Eat", "Drink", "Sleep", "Go next"]:
+        lines.append(f"{heading}[edit]")
+        for _ in range(listings // 8):
+            name = " ".join(rng.choice(words).capitalize() for _ in range(rng.randint(1, 3)))
+            blurb = " ".join(rng.choice(words) for _ in range(rng.randint(30, 80)))
+            lines.append(f"- {name} {rng.choice(suffixes)}, {rng.randint(1, 200)} Main St. {blurb.capitalize()}. "
+                         f"Visit {blurb} and more")
+    return "\n".join(lines)
+
+
+def load_pages(paths):
+    """Return (name, text, sections) for each page"""
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            content = f.read()
+        if path.endswith(".html"):
+            import trafilatura
+            xml = trafilatura.extract(content, output_format="xml")
+            if not xml:
+                continue
+            text, sections = index_xml_sections(xml)
+        else:
+            text = content
+            sections = index_sections(text)
+        name = os.path.relpath(path, FIXTURES_DIR) if path.startswith(FIXTURES_DIR) else os.path.basename(path)
+        pages.append((name, text, sections))
+    if not pages:
+        print("No recorded pages found; using generated guide pages")
+        for seed in range(5):
+            text = generated_page(seed)
+            pages.append((f"generated-{seed}", text, index_sections(text)))
+    return pages
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the legacy entity regexes with the keyword-scan extractors")
+    parser.add_argument("pages", nargs="*", help="HTML or plain-text guide pages (default: every recorded fixture)")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="Runs of each extractor to average over")
+    args = parser.parse_args()
+
+    paths = args.pages or sorted(glob.glob(os.path.join(FIXTURES_DIR, "**", "*.html"), recursive=True))
+    pages = load_pages(paths)
+    compiled = {name: re.compile(pattern) for name, pattern in LEGACY_PATTERNS.items()}
+
+    total_legacy = total_new = 0.0
+    print(f"{'page':<28}{'extractor':<18}{'chars':>8}{'found':>7}{'regex ms':>11}{'scan ms':>10}{'speedup':>9}")
+    for name, text, sections in pages:
+        for extractor_name, (extractor, section) in EXTRACTORS.items():
+            body = section_text(text, sections, [section])
+            legacy, legacy_time = timed(lambda: compiled[extractor_name].findall(body), args.repeat)
+            new, new_time = timed(lambda: extractor.findall(body), args.repeat)
+            if legacy != new:
+                print(f"MISMATCH in {name} / {extractor_name}")
+                return 1
+            total_legacy += legacy_time
+            total_new += new_time
+            speedup = legacy_time / new_time if new_time else float("inf")
+            print(f"{name[:27]:<28}{extractor_name:<18}{len(body):>8}{len(new):>7}"
+                  f"{legacy_time * 1000:>11.2f}{new_time * 1000:>10.2f}{speedup:>8.1f}x")
+
+    print(f"\nTotal: regex {total_legacy * 1000:.1f} ms, keyword scan {total_new * 1000:.1f} ms "
+          f"({total_legacy / total_new if total_new else float('inf'):.1f}x), results identical")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Load test of the forecast provider adapter against the local stand-in API.
+
+Simulates many sessions planning trips at the same time, each asking for the
+forecast of one of a few popular destinations, and reports how many requests
+reached the upstream API together with the latency sessions saw. With request
+coalescing and the short-TTL cache, upstream calls should track the number of
+distinct destinations, not the number of sessions.
+
+Usage:
+    python benchmarks/bench_forecast_coalescing.py --sessions 200 --destinations 5 --latency 0.3
+    python benchmarks/bench_forecast_coalescing.py --waves 3 --output results.json
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from forecast_provider import ForecastProvider, StandInForecastServer
+from gazetteer import locate
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DESTINATIONS_FILE = os.path.join(BENCH_DIR, "destinations.txt")
+
+
+def load_destinations(path, count):
+    with open(path, encoding="utf-8") as f:
+        names = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    located = [name for name in names if locate(name) is not None]
+    return located[:count]
+
+
+def run_wave(provider, destinations, sessions, rng):
+    """Start every session at once and return the seconds each one waited"""
+    barrier = threading.Barrier(sessions)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def session():
+        destination = rng.choice(destinations)
+        start = date.today() + timedelta(days=rng.randrange(10))
+        dates = [start + timedelta(days=offset) for offset in range(rng.randrange(3, 15))]
+        latitude, longitude = locate(destination)
+        barrier.wait()
+        started = time.perf_counter()
+        try:
+            provider.trip_forecast(latitude, longitude, dates)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+            return
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=session) for _ in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark forecast request coalescing against a local stand-in API")
+    parser.add_argument("--sessions", type=int, default=100, help="Concurrent sessions per wave")
+    parser.add_argument("--destinations", type=int, default=5, help="Distinct destinations the sessions pick from")
+    parser.add_argument("--waves", type=int, default=2, help="Waves of sessions; later waves should be served from cache")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stand-in API latency in seconds")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the sessions")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    destinations = load_destinations(DESTINATIONS_FILE, args.destinations)
+    server = StandInForecastServer(latency=args.latency)
+    provider = ForecastProvider(server.url)
+    rng = random.Random(args.seed)
+
+    waves = []
+    try:
+        for wave in range(args.waves):
+            before = server.requests
+            started = time.perf_counter()
+            latencies, errors = run_wave(provider, destinations, args.sessions, rng)
+            elapsed = time.perf_counter() - started
+            latencies.sort()
+            waves.append({
+                "wave": wave + 1,
+                "sessions": args.sessions,
+                "upstream_requests": server.requests - before,
+                "errors": len(errors),
+                "seconds": round(elapsed, 3),
+                "latency_p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+                "latency_p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1) if latencies else None
+            })
+    finally:
+        server.close()
+
+    report = {
+        "destinations": destinations,
+        "latency": args.latency,
+        "waves": waves,
+        "provider": provider.stats()
+    }
+
+    print(f"{len(destinations)} destinations, {args.sessions} sessions per wave, {args.latency}s upstream latency")
+    for wave in waves:
+        print(f"  wave {wave['wave']}: {wave['upstream_requests']} upstream requests for {wave['sessions']} sessions, "
+              f"p50 {wave['latency_p50_ms']} ms, p95 {wave['latency_p95_ms']} ms, {wave['errors']} errors")
+    stats = report["provider"]
+    print(f"  total: {stats['requests']} requests, {stats['upstream_calls']} upstream calls, "
+          f"{stats['coalesced']} coalesced, {stats['cache']['hits']} cache hits")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
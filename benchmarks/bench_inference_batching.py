@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Load test of the inference worker's dynamic batching.
+
+Starts the worker as a separate process with the stub model, whose generate
+call takes a fixed time whatever the batch size (like a forward pass on a
+model that isn't saturated), then has many sessions submit prompts at once.
+Runs once per batch limit so the throughput with and without batching can be
+compared. The prompt cache is off so every prompt reaches the model.
+
+Usage:
+    python benchmarks/bench_inference_batching.py --sessions 64 --batch 1 8 16 --stub-latency 0.1
+    python benchmarks/bench_inference_batching.py --output results.json
+"""
+
+import argparse
+import json
+import os
+import secrets
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from inference_worker import CAPTION, ITINERARY, WEATHER, InferenceClient
+
+# Key shared with the worker processes the benchmark starts
+AUTHKEY = secrets.token_hex(16)
+
+TASKS = [
+    (WEATHER, "Predict the most likely weather for Lisbon on each of these days. Return exactly 3 objects."),
+    (ITINERARY, "Plan a 3-day trip to Kyoto for a traveller on a moderate budget."),
+    (CAPTION, "Create a description for a travel image of 'Harbour Walk' in 'Sydney'.")
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_worker(port, max_batch, max_wait_ms, stub_latency):
+    """Run the worker in its own process and wait until it accepts connections"""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_DIR, "inference_worker.py"), "serve", "--model", "stub",
+         "--port", str(port), "--max-batch", str(max_batch), "--max-wait-ms", str(max_wait_ms),
+         "--stub-latency", str(stub_latency), "--no-cache"],
+        stdout=subprocess.DEVNULL,
+        env=dict(os.environ, INFERENCE_WORKER_AUTHKEY=AUTHKEY)
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("Inference worker didn't start")
+
+
+def run_sessions(client, sessions, prompts_per_session):
+    """Start every session at once and return the seconds each prompt waited"""
+    barrier = threading.Barrier(sessions)
+    latencies = []
+    lock = threading.Lock()
+
+    def session(number):
+        barrier.wait()
+        for index in range(prompts_per_session):
+            task, prompt = TASKS[(number + index) % len(TASKS)]
+            started = time.perf_counter()
+            client.generate(task, f"{prompt} (session {number}, request {index})")
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=session, args=(number,)) for number in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dynamic batching in the inference worker")
+    parser.add_argument("--sessions", type=int, default=64, help="Concurrent sessions")
+    parser.add_argument("--prompts", type=int, default=3, help="Prompts each session sends, one after the other")
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 8, 16], help="Batch limits to compare")
+    parser.add_argument("--max-wait-ms", type=float, default=25, help="Longest a request waits for a batch to fill")
+    parser.add_argument("--stub-latency", type=float, default=0.1, help="Seconds per generate call of the stub model")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    runs = []
+    for max_batch in args.batch:
+        port = free_port()
+        process = start_worker(port, max_batch, args.max_wait_ms, args.stub_latency)
+        client = InferenceClient(("127.0.0.1", port), authkey=AUTHKEY.encode("utf-8"), timeout=600)
+        try:
+            started = time.perf_counter()
+            latencies = run_sessions(client, args.sessions, args.prompts)
+            elapsed = time.perf_counter() - started
+            stats = client.stats()
+        finally:
+            client.close()
+            process.terminate()
+            process.wait()
+        latencies.sort()
+        runs.append({
+            "max_batch": max_batch,
+            "prompts": len(latencies),
+            "seconds": round(elapsed, 3),
+            "prompts_per_second": round(len(latencies) / elapsed, 1),
+            "latency_p50_ms": round(statistics.median(latencies) * 1000, 1),
+            "latency_p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1),
+            "batches": stats["batches"],
+            "mean_batch_size": stats["mean_batch_size"]
+        })
+
+    print(f"{args.sessions} sessions x {args.prompts} prompts, stub model at {args.stub_latency}s per generate call")
+    for run in runs:
+        print(f"  max batch {run['max_batch']:>3}: {run['prompts_per_second']} prompts/s, "
+              f"{run['batches']} batches (mean {run['mean_batch_size']}), "
+              f"p50 {run['latency_p50_ms']} ms, p95 {run['latency_p95_ms']} ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"sessions": args.sessions, "stub_latency": args.stub_latency, "runs": runs}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Time to first day of a streamed itinerary.
+
+Starts the inference worker as a separate process with the stub model, whose
+answer comes out line by line over --stub-latency seconds like a model
+generating tokens, then streams itineraries from it and reports when the
+first day was ready to show compared with the whole plan.
+
+Usage:
+    python benchmarks/bench_itinerary_streaming.py --days 7 --stub-latency 5
+    python benchmarks/bench_itinerary_streaming.py --trips 5 --output results.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import inference_worker
+from bench_inference_batching import AUTHKEY, free_port, start_worker
+from itinerary_generator import stream_itinerary
+
+DESTINATIONS = ["Lisbon", "Kyoto", "Cape Town", "Vancouver", "Marrakech", "Buenos Aires", "Reykjavik", "Hanoi"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark time to first day of streamed itineraries")
+    parser.add_argument("--trips", type=int, default=3, help="Itineraries to generate, one after the other")
+    parser.add_argument("--days", type=int, default=7, help="Days per itinerary")
+    parser.add_argument("--stub-latency", type=float, default=5.0, help="Seconds the stub model takes for a whole answer")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    port = free_port()
+    process = start_worker(port, 8, 25, args.stub_latency)
+    inference_worker.INFERENCE_WORKER_ADDRESS = f"127.0.0.1:{port}"
+    inference_worker.INFERENCE_WORKER_AUTHKEY = AUTHKEY.encode("utf-8")
+    trips = []
+    try:
+        for number in range(args.trips):
+            destination = DESTINATIONS[number % len(DESTINATIONS)]
+            started = time.perf_counter()
+            arrivals = [time.perf_counter() - started for _ in stream_itinerary(destination, args.days, "Moderate")]
+            if len(arrivals) < args.days:
+                print(f"Only {len(arrivals)} of {args.days} days arrived for {destination}")
+                return 1
+            trips.append({"destination": destination, "first_day_seconds": round(arrivals[0], 3),
+                          "full_plan_seconds": round(arrivals[-1], 3)})
+    finally:
+        process.terminate()
+        process.wait()
+
+    first = statistics.median(trip["first_day_seconds"] for trip in trips)
+    full = statistics.median(trip["full_plan_seconds"] for trip in trips)
+    print(f"{args.trips} itineraries of {args.days} days, stub model at {args.stub_latency}s per answer")
+    print(f"  first day after {first:.2f}s, whole plan after {full:.2f}s (median)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"days": args.days, "stub_latency": args.stub_latency, "trips": trips}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
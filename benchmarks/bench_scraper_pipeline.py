@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the destination_scraper pipeline, fully offline.
+
+Guide pages for the destinations in benchmarks/destinations.txt are served by
+a local stand-in HTTP server with configurable latency, jitter and bandwidth,
+and every destination is scraped cold (empty caches, empty page archive).
+The report covers wall time per destination, time per pipeline stage (fetch,
+trafilatura extract, section indexing, entity extraction, fallback fill,
+dedupe), bytes served, and peak memory.
+
+Usage:
+    python benchmarks/bench_scraper_pipeline.py --output results.json
+    python benchmarks/bench_scraper_pipeline.py --latency 0.15 --jitter 0.1 --bandwidth 500
+    python benchmarks/bench_scraper_pipeline.py --compare baseline.json --threshold 0.2
+    python benchmarks/bench_scraper_pipeline.py --record    # needs network access
+
+Recorded pages live in benchmarks/fixtures/pipeline/<source>/<Page_Title>.html.
+--record downloads them once from WikiVoyage and Wikitravel; destinations
+without a recording are served a generated MediaWiki-style page instead.
+
+SYNTHETIC MODE: the repository ships no recorded pages (recording needs
+network access), so unless --record has been run every page is generated and
+the numbers describe the pipeline on synthetic input, not on real guides. The
+run's mode ("synthetic", "recorded" or "mixed") is printed before and after
+the run and stored as "fixture_mode" in the JSON report; --compare warns when
+two reports used different modes.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import requests
+import trafilatura
+
+import destination_scraper
+from destination_names import canonical_destination
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures", "pipeline")
+DESTINATIONS_FILE = os.path.join(BENCH_DIR, "destinations.txt")
+
+# Where --record downloads each source from
+RECORD_URLS = {
+    "wikivoyage": "https://en.wikivoyage.org/wiki/{page}",
+    "wikitravel": "https://wikitravel.org/en/{page}"
+}
+STAGES = ["fetch", "extract", "sections", "entities", "fill", "dedupe"]
+SERVE_CHUNK = 8192
+
+
+def load_destinations(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def page_title(destination):
+    return destination.strip().replace(" ", "_")
+
+
+def fixture_path(source, page):
+    return os.path.join(FIXTURES_DIR, source, f"{page}.html")
+
+
+def fixture_mode(fixture_kinds):
+    """Name the kind of input a run used: synthetic (all generated), recorded or mixed"""
+    if not fixture_kinds["generated"]:
+        return "recorded"
+    return "mixed" if fixture_kinds["recorded"] else "synthetic"
+
+
+def generated_page(page, source):
+    """Build a deterministic MediaWiki-style guide page of realistic size and layout"""
+    rng = random.Random(zlib.crc32(f"{source}/{page}".encode()))
+    city = page.replace("_", " ")
+    words = ["old", "grand", "royal", "city", "river", "harbour", "market", "open", "daily", "from", "until",
+             "free", "entry", "near", "station", "the", "with", "and", "local", "famous", "views", "built"]
+    names = ["Saint", "Marco", "Central", "North", "Victoria", "Golden", "Liberty", "Union", "Grand", "Royal"]
+    suffixes = {
+        "See": ["Museum", "Palace", "Cathedral", "Tower", "Gallery", "Park", "Bridge", "Castle"],
+        "Do": ["Tour", "Class", "Festival", "Show", "Experience"],
+        "Eat": ["Restaurant", "Bistro", "Grill", "Trattoria", "Diner", "Café"]
+    }
+
+    def sentence(low, high):
+        return " ".join(rng.choice(words) for _ in range(rng.randint(low, high))).capitalize() + "."
+
+    def heading(level, name):
+        return (f'<div class="mw-heading mw-heading{level}"><h{level} id="{name.replace(" ", "_")}">{name}</h{level}>'
+                f'<span class="mw-editsection">[<a href="#">edit</a>]</span></div>')
+
+    def listing(section):
+        name = f"{rng.choice(names)} {rng.choice(names)} {rng.choice(suffixes[section])}"
+        verb = "Visit" if section != "Eat" else "Try"
+        return f"<li><b>{name}</b>, {rng.randint(1, 300)} Main St. {verb} {sentence(10, 30)}</li>"
+
+    # Big-city articles run to hundreds of KB, mostly outside See/Do/Eat
+    scale = rng.uniform(0.5, 2.5)
+    parts = [f"<!DOCTYPE html><html><head><title>{city} – Travel guide</title></head><body>"
+             f'<nav><ul><li><a href="/">Main page</a></li></ul></nav><main id="content"><h1>{city}</h1>'
+             '<div class="mw-body-content"><div class="mw-content-ltr mw-parser-output">']
+    for section, paragraphs in [("Understand", 60), ("Get in", 30), ("Get around", 25), ("See", 0), ("Do", 0),
+                                ("Buy", 15), ("Eat", 0), ("Drink", 40), ("Sleep", 80), ("Stay safe", 15),
+                                ("Connect", 10), ("Go next", 10)]:
+        parts.append(heading(2, section))
+        if section in suffixes:
+            for district in range(rng.randint(2, 4)):
+                parts.append(heading(3, f"{rng.choice(names)} district"))
+                parts.append("<ul>" + "".join(listing(section) for _ in range(rng.randint(6, 14))) + "</ul>")
+        else:
+            parts.extend(f"<p>{sentence(40, 90)}</p>" for _ in range(int(paragraphs * scale)))
+    parts.append('</div></div></main><footer><p>Content is available under CC BY-SA.</p></footer></body></html>')
+    return "".join(parts).encode("utf-8")
+
+
+def record(destinations):
+    """Download the real guide pages for every destination into FIXTURES_DIR"""
+    session = requests.Session()
+    session.headers["User-Agent"] = destination_scraper.SCRAPE_USER_AGENT
+    for destination in destinations:
+        page = page_title(destination)
+        for source, url in RECORD_URLS.items():
+            try:
+                response = session.get(url.format(page=page), timeout=30)
+            except requests.RequestException as e:
+                print(f"Error recording {source}/{page}: {e}")
+                continue
+            if response.status_code != 200:
+                print(f"Skipping {source}/{page}: HTTP {response.status_code}")
+                continue
+            os.makedirs(os.path.join(FIXTURES_DIR, source), exist_ok=True)
+            with open(fixture_path(source, page), "wb") as f:
+                f.write(response.content)
+            print(f"Recorded {source}/{page} ({len(response.content) // 1024} KB)")
+            # Stay polite to the real sites
+            time.sleep(1)
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-response is expected with streaming fetches
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+class FixtureServer:
+    """
+    Local stand-in for the guide sites
+
+    Serves /<source>/<Page_Title> from the recorded fixtures (or a generated
+    page) after latency + uniform(0, jitter) seconds, optionally throttled to
+    `bandwidth` KB/s. Counts the bytes actually written, so early-terminated
+    downloads show up as savings.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, bandwidth=0, generate=True):
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.generate = generate
+        self.bytes_served = 0
+        self.bytes_full = 0
+        self.requests = 0
+        self.fixture_kinds = {"recorded": 0, "generated": 0, "missing": 0}
+        self._lock = threading.Lock()
+        self._pages = {}
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = _QuietHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def page(self, source, page):
+        key = (source, page)
+        if key not in self._pages:
+            kind = "missing"
+            body = None
+            if os.path.exists(fixture_path(source, page)):
+                with open(fixture_path(source, page), "rb") as f:
+                    body = f.read()
+                kind = "recorded"
+            elif self.generate:
+                body = generated_page(page, source)
+                kind = "generated"
+            with self._lock:
+                self._pages[key] = body
+                self.fixture_kinds[kind] += 1
+        return self._pages[key]
+
+    def handle(self, handler):
+        parts = unquote(handler.path).strip("/").split("/", 1)
+        body = self.page(parts[0], parts[1]) if len(parts) == 2 else None
+        time.sleep(self.latency + random.uniform(0, self.jitter))
+        with self._lock:
+            self.requests += 1
+
+        if body is None:
+            handler.send_response(404)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/html; charset=utf-8")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        sent = 0
+        try:
+            for start in range(0, len(body), SERVE_CHUNK):
+                chunk = body[start:start + SERVE_CHUNK]
+                handler.wfile.write(chunk)
+                sent += len(chunk)
+                if self.bandwidth:
+                    time.sleep(len(chunk) / (self.bandwidth * 1024))
+        except (BrokenPipeError, ConnectionResetError):
+            # The scraper stopped reading once it had the sections it needed
+            handler.close_connection = True
+        with self._lock:
+            self.bytes_served += sent
+            self.bytes_full += len(body)
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def reset_scraper_state():
+    """Forget every cache and breaker so each pass starts cold"""
+    destination_scraper._destination_cache = None
+    destination_scraper._source_failure_cache = None
+    destination_scraper._page_archive = None
+    destination_scraper._rate_limiter = None
+    destination_scraper._source_breakers.clear()
+
+
+def run_pass(destinations, server, concurrency, trace_memory):
+    """
+    Scrape every destination once, cold, in a fresh working directory
+
+    Returns:
+    - Dictionary with per-destination seconds and statuses, stage timings and
+      the tracemalloc peak (0 when trace_memory is off)
+    """
+    workdir = tempfile.mkdtemp(prefix="bench-scraper-")
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    reset_scraper_state()
+    destination_scraper.stage_timings = {}
+    seconds = {}
+    statuses = {}
+
+    def scrape(destination):
+        stats = {}
+        started = time.perf_counter()
+        destination_scraper._scrape_destination_info(destination, canonical_destination(destination), stats)
+        return destination, time.perf_counter() - started, stats.get("status", "failed")
+
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for destination, elapsed, status in executor.map(scrape, destinations):
+                seconds[destination] = elapsed
+                statuses[destination] = status
+        wall = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        timings = destination_scraper.stage_timings
+        destination_scraper.stage_timings = None
+        # Pages still downloading for the archive write into workdir
+        destination_scraper.finish_background_downloads()
+        os.chdir(previous_dir)
+        reset_scraper_state()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {"wall_seconds": wall, "seconds": seconds, "statuses": statuses, "stages": timings, "peak": peak}
+
+
+def summarize(values):
+    ordered = sorted(values)
+    if not ordered:
+        return {"calls": 0, "total_seconds": 0.0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    return {
+        "calls": len(ordered),
+        "total_seconds": sum(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "max_ms": ordered[-1] * 1000
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline_path, threshold):
+    """
+    Print how each metric moved against an earlier report
+
+    Returns:
+    - List of metrics that got slower (or bigger) by more than `threshold`
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("fixture_mode") != report["fixture_mode"]:
+        print(f"\nWarning: the baseline ran in {baseline.get('fixture_mode') or 'unknown'} fixture mode, "
+              f"this run in {report['fixture_mode']} mode")
+    elif baseline.get("fixtures") != report["fixtures"]:
+        # Generated pages are far more regular than real ones, so timings on different fixtures don't compare
+        print(f"\nWarning: the baseline used fixtures {baseline.get('fixtures')}, this run {report['fixtures']}")
+
+    metrics = [("wall_seconds", report["wall_seconds"], baseline.get("wall_seconds")),
+               ("destination_p95_ms", report["destination"]["p95_ms"], baseline.get("destination", {}).get("p95_ms")),
+               ("tracemalloc_peak_bytes", report["memory"]["tracemalloc_peak_bytes"],
+                baseline.get("memory", {}).get("tracemalloc_peak_bytes"))]
+    for stage in STAGES:
+        metrics.append((f"{stage}_total_seconds", report["stages"][stage]["total_seconds"],
+                        baseline.get("stages", {}).get(stage, {}).get("total_seconds")))
+
+    regressions = []
+    print(f"\nCompared with {baseline_path} ({baseline.get('git_commit') or 'unknown commit'}):")
+    for name, current, previous in metrics:
+        if not previous:
+            continue
+        change = (current - previous) / previous
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"   {name:<28}{previous:>14.4f} -> {current:<14.4f}{change * 100:>+8.1f}%{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the destination scraper pipeline offline")
+    parser.add_argument("--destinations", default=DESTINATIONS_FILE, help="File with one destination per line")
+    parser.add_argument("--latency", type=float, default=0.05, help="Base response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Extra random latency, up to this many seconds")
+    parser.add_argument("--bandwidth", type=float, default=0, help="Per-response bandwidth in KB/s (0 = unlimited)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Destinations scraped in parallel")
+    parser.add_argument("--recorded-only", action="store_true",
+                        help="Answer 404 for destinations without a recorded fixture instead of generating a page")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    parser.add_argument("--compare", help="Earlier JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative slowdown that counts as a regression with --compare")
+    parser.add_argument("--record", action="store_true", help="Download real fixtures for the destinations and exit")
+    args = parser.parse_args()
+
+    destinations = load_destinations(args.destinations)
+    if args.record:
+        record(destinations)
+        return 0
+
+    server = FixtureServer(args.latency, args.jitter, args.bandwidth, generate=not args.recorded_only)
+    destination_scraper.WIKIVOYAGE_URL = server.base_url + "/wikivoyage/{page}"
+    destination_scraper.WIKITRAVEL_URL = server.base_url + "/wikitravel/{page}"
+    # Every fixture is served by one local host; don't let the politeness limit serialize the run
+    destination_scraper.HOST_CONCURRENCY = max(destination_scraper.HOST_CONCURRENCY, 2 * args.concurrency)
+    # The stand-in server needs no rate limit; the benchmark measures the pipeline, not the politeness budget
+    destination_scraper.HOST_RATE = destination_scraper.HOST_BURST = 1e9
+    # The memory pass runs under tracemalloc and is much slower; it must not hit the scrape timeouts
+    destination_scraper.SOURCE_TIMEOUT = destination_scraper.SCRAPE_DEADLINE = 300
+
+    recorded = sum(os.path.exists(fixture_path(source, page_title(destination)))
+                   for source in RECORD_URLS for destination in destinations)
+    if not recorded and not args.recorded_only:
+        print("SYNTHETIC MODE: no recorded fixtures found, every page is generated "
+              "(run with --record to benchmark real guide pages)")
+    print(f"Scraping {len(destinations)} destinations from {server.base_url} "
+          f"(latency {args.latency}s + up to {args.jitter}s, concurrency {args.concurrency})")
+    # Timings come from a pass without tracemalloc, which would slow every allocation down;
+    # a second pass measures peak memory
+    timed = run_pass(destinations, server, args.concurrency, trace_memory=False)
+    bytes_served = server.bytes_served
+    bytes_full = server.bytes_full
+    traced = run_pass(destinations, server, args.concurrency, trace_memory=True)
+    server.shutdown()
+
+    statuses = list(timed["statuses"].values())
+    report = {
+        "benchmark": "scraper_pipeline",
+        "created": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "trafilatura": trafilatura.__version__,
+        "config": {
+            "destinations": len(destinations),
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "bandwidth_kbps": args.bandwidth,
+            "concurrency": args.concurrency,
+            "streaming": destination_scraper.SCRAPE_STREAMING
+        },
+        "fixture_mode": fixture_mode(server.fixture_kinds),
+        "fixtures": server.fixture_kinds,
+        "wall_seconds": timed["wall_seconds"],
+        "destinations_per_second": len(destinations) / timed["wall_seconds"],
+        "destination": summarize(list(timed["seconds"].values())),
+        "statuses": {status: statuses.count(status) for status in sorted(set(statuses))},
+        "stages": {stage: summarize(timed["stages"].get(stage, [])) for stage in STAGES},
+        "bytes_served": bytes_served,
+        "bytes_full_pages": bytes_full,
+        "memory": {
+            "tracemalloc_peak_bytes": traced["peak"],
+            # ru_maxrss is in KB on Linux and bytes on macOS
+            "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+        }
+    }
+
+    print(f"\n{'stage':<12}{'calls':>7}{'total s':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for stage in STAGES:
+        data = report["stages"][stage]
+        print(f"{stage:<12}{data['calls']:>7}{data['total_seconds']:>10.3f}{data['mean_ms']:>10.2f}"
+              f"{data['p50_ms']:>10.2f}{data['p95_ms']:>10.2f}")
+    print(f"\n{len(destinations)} destinations in {report['wall_seconds']:.2f}s "
+          f"(p50 {report['destination']['p50_ms']:.0f} ms, p95 {report['destination']['p95_ms']:.0f} ms per destination), "
+          f"statuses {report['statuses']}")
+    print(f"Served {bytes_served / 1024:.0f} KB of {bytes_full / 1024:.0f} KB; peak traced memory {traced['peak'] / 1024 / 1024:.1f} MB, "
+          f"max RSS {report['memory']['max_rss_bytes'] / 1024 / 1024:.0f} MB; fixtures {server.fixture_kinds}")
+    if report["fixture_mode"] == "synthetic":
+        print("SYNTHETIC MODE: every page was generated; these numbers don't describe real guide pages")
+    elif server.fixture_kinds["generated"]:
+        print(f"Warning: {server.fixture_kinds['generated']} pages were generated rather than recorded; "
+              f"run with --record (needs network access) to benchmark against real guide pages")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+    if args.compare:
+        regressions = compare(report, args.compare, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} metrics regressed by more than {args.threshold * 100:.0f}%")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
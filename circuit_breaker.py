@@ -0,0 +1,85 @@
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Track the health of one upstream source and stop calling it while it is failing
+
+    The breaker starts closed. After `failure_threshold` consecutive failures it
+    opens and every request is refused for `reset_timeout` seconds. Then it goes
+    half-open and lets a single probe request through: a success closes it again,
+    a failure re-opens it for another `reset_timeout`.
+
+    Parameters:
+    - failure_threshold: Consecutive failures that open the circuit
+    - reset_timeout: Seconds the circuit stays open before a probe is allowed
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probe_started = None
+
+    def _state(self, now):
+        if self._opened_at is None:
+            return CLOSED
+        if now - self._opened_at < self.reset_timeout:
+            return OPEN
+        return HALF_OPEN
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def allow_request(self):
+        """
+        Ask whether a request to the source may go ahead
+
+        Returns:
+        - True if the circuit is closed, or if it is half-open and this caller
+          gets to send the probe
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(now)
+            if state == CLOSED:
+                return True
+            if state == OPEN:
+                return False
+            # A probe whose result never came back (e.g. its caller stopped waiting)
+            # must not hold the circuit half-open forever
+            if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+                return False
+            self._probe_started = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_started = None
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            self._failures += 1
+            if self._state(now) == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = now
+            self._probe_started = None
+
+    def snapshot(self):
+        """
+        Returns:
+        - Dictionary with the current state and the consecutive failure count
+        """
+        with self._lock:
+            return {"state": self._state(time.monotonic()), "consecutive_failures": self._failures}
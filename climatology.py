@@ -0,0 +1,393 @@
+"""
+Offline climate normals for weather estimates.
+
+Monthly normals (mean daily high and low in °C, precipitation in mm) for each
+city are kept as compact NumPy arrays in climate/normals.npz. Estimates for a
+given day come from periodic linear interpolation between the mid-month
+normals, so they are deterministic, need no network and take microseconds.
+
+The arrays are rebuilt from station CSVs with
+
+    python climatology.py climate/stations.csv --output climate/normals.npz
+
+Each CSV has one row per station and month with the columns name, country,
+latitude, longitude, month, tmax, tmin and prcp. NOAA monthly normals exports
+(NAME, LATITUDE, LONGITUDE, DATE, MLY-TMAX-NORMAL, MLY-TMIN-NORMAL,
+MLY-PRCP-NORMAL) are read as well; pass --imperial for their °F and inch units.
+An optional city column groups several stations into one destination, whose
+normals are then the mean over its stations.
+"""
+
+import csv
+import glob
+import os
+import sys
+import threading
+
+import numpy as np
+
+from destination_names import canonical_destination
+from gazetteer import NearestIndex, locate
+
+# Every CSV in CLIMATE_DIR is read as station data, so keep other CSVs elsewhere
+CLIMATE_DIR = os.environ.get("CLIMATE_NORMALS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "climate"))
+NORMALS_FILE = os.path.join(CLIMATE_DIR, "normals.npz")
+# A city without normals of its own uses the nearest station up to this far away
+MAX_STATION_DISTANCE_KM = float(os.environ.get("CLIMATE_MAX_STATION_KM", 300))
+
+# Day of the year (counted from 0) at the middle of each month, where the monthly normal applies
+_MID_MONTH = np.array([15.5, 45.1, 74.6, 105.1, 135.6, 166.1, 196.6, 227.6, 258.1, 288.6, 319.1, 349.6])
+_DAYS_IN_MONTH = np.array([31, 28.25, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+_YEAR = 365.25
+# The mid-month days with December repeated before January and January after
+# December, so every day of the year falls between two of them
+_KNOTS = np.concatenate([[_MID_MONTH[-1] - _YEAR], _MID_MONTH, [_MID_MONTH[0] + _YEAR]])
+_KNOT_MONTHS = np.concatenate([[11], np.arange(12), [0]])
+
+# CSV column names accepted for each field, our own first and then NOAA's
+_COLUMNS = {
+    "city": ["city"],
+    "name": ["name", "NAME"],
+    "country": ["country", "COUNTRY"],
+    "latitude": ["latitude", "LATITUDE"],
+    "longitude": ["longitude", "LONGITUDE"],
+    "month": ["month", "DATE"],
+    "tmax": ["tmax", "MLY-TMAX-NORMAL"],
+    "tmin": ["tmin", "MLY-TMIN-NORMAL"],
+    "prcp": ["prcp", "MLY-PRCP-NORMAL"]
+}
+
+# Conditions checked in order; the first that holds describes the day. Each is
+# (description, icon, minimum rain in mm per day, maximum low °C, minimum high °C),
+# with thresholds on the interpolated daily values.
+_CONDITIONS = [
+    ("Light snow", "❄️", 1.5, 0, -np.inf),
+    ("Tropical downpours", "⛈️", 8, np.inf, 25),
+    ("Afternoon thunderstorm", "⛈️", 4.5, np.inf, 24),
+    ("Rainy", "🌧️", 3.5, np.inf, -np.inf),
+    ("Light showers", "🌧️", 2.2, np.inf, -np.inf),
+    ("Extremely hot", "☀️", -np.inf, np.inf, 36),
+    ("Hot and sunny", "☀️", -np.inf, np.inf, 30),
+    ("Warm and sunny", "☀️", -np.inf, np.inf, 24),
+    ("Mild and sunny", "⛅", -np.inf, np.inf, 17),
+    ("Cool and breezy", "⛅", -np.inf, np.inf, 10),
+    ("Cold and clear", "☀️", -np.inf, np.inf, 2),
+    ("Very cold", "❄️", -np.inf, np.inf, -np.inf)
+]
+_DESCRIPTIONS = np.array([condition[0] for condition in _CONDITIONS], dtype=object)
+_ICONS = np.array([condition[1] for condition in _CONDITIONS], dtype=object)
+_MIN_RAIN, _MAX_LOW, _MIN_HIGH = (np.array([condition[field] for condition in _CONDITIONS], dtype=np.float64) for field in (2, 3, 4))
+
+_normals = None
+_normals_lock = threading.Lock()
+
+
+def day_of_year(dates):
+    """Day of the year (counted from 0, at midday) for each date, as a float array"""
+    days = np.array(dates, dtype="datetime64[D]")
+    return (days - days.astype("datetime64[Y]")).astype(np.float64) + 0.5
+
+
+def temperature_label(low, high):
+    """Format a temperature range the way the app shows it, e.g. "15-22°C (59-72°F)" """
+    low_f = round(low * 9 / 5 + 32)
+    high_f = round(high * 9 / 5 + 32)
+    return f"{low}-{high}°C ({low_f}-{high_f}°F)"
+
+
+def describe(highs, lows, rain):
+    """
+    Turn daily climate values into the app's weather description, temperature range and icon
+
+    Parameters:
+    - highs, lows: Arrays of daily high and low temperatures in °C
+    - rain: Array of daily precipitation in mm
+
+    Returns:
+    - Three object arrays: descriptions, temperature ranges and icons
+    """
+    highs = np.asarray(highs, dtype=np.float64)[:, None]
+    lows = np.asarray(lows, dtype=np.float64)[:, None]
+    rain = np.asarray(rain, dtype=np.float64)[:, None]
+    # One row per day, one column per condition; the last condition always holds
+    matches = (rain >= _MIN_RAIN) & (lows <= _MAX_LOW) & (highs >= _MIN_HIGH)
+    first = matches.argmax(axis=1)
+
+    temperatures = np.empty(len(first), dtype=object)
+    temperatures[:] = [
+        temperature_label(low, high)
+        for low, high in zip(np.rint(lows[:, 0]).astype(int).tolist(), np.rint(highs[:, 0]).astype(int).tolist())
+    ]
+    return _DESCRIPTIONS[first], temperatures, _ICONS[first]
+
+
+class ClimateNormals:
+    """
+    Monthly climate normals for a set of cities, held as NumPy arrays
+
+    Parameters:
+    - ids: Destination ID of each city (see destination_names.canonical_destination)
+    - names, countries: Readable city and country names
+    - latitudes, longitudes: Coordinates in degrees
+    - tmax, tmin: Arrays of shape (cities, 12) with the mean daily high and low in °C
+    - prcp: Array of shape (cities, 12) with the monthly precipitation in mm
+    """
+
+    def __init__(self, ids, names, countries, latitudes, longitudes, tmax, tmin, prcp):
+        self.ids = np.asarray(ids, dtype=str)
+        self.names = np.asarray(names, dtype=str)
+        self.countries = np.asarray(countries, dtype=str)
+        self.latitudes = np.asarray(latitudes, dtype=np.float32)
+        self.longitudes = np.asarray(longitudes, dtype=np.float32)
+        self.tmax = np.asarray(tmax, dtype=np.float32)
+        self.tmin = np.asarray(tmin, dtype=np.float32)
+        self.prcp = np.asarray(prcp, dtype=np.float32)
+        # High, low and rain per day (rather than per month, so months of different
+        # length interpolate smoothly) side by side, in the order of _KNOTS
+        daily_prcp = self.prcp / _DAYS_IN_MONTH.astype(np.float32)
+        self._knot_values = np.stack([self.tmax, self.tmin, daily_prcp], axis=1)[:, :, _KNOT_MONTHS]
+
+        self._rows = {destination_id: row for row, destination_id in enumerate(self.ids.tolist())}
+        self._index = NearestIndex(self.latitudes, self.longitudes)
+        # A destination that is only a country ("Iceland") uses the first city listed for it
+        self._country_rows = {}
+        for row, country in enumerate(self.countries.tolist()):
+            if country:
+                self._country_rows.setdefault(canonical_destination(country), row)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, path=NORMALS_FILE):
+        with np.load(path) as arrays:
+            return cls(**{name: arrays[name] for name in arrays.files})
+
+    def save(self, path=NORMALS_FILE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez_compressed(
+            path, ids=self.ids, names=self.names, countries=self.countries, latitudes=self.latitudes,
+            longitudes=self.longitudes, tmax=self.tmax, tmin=self.tmin, prcp=self.prcp
+        )
+
+    def nearest(self, latitude, longitude):
+        """
+        Returns:
+        - Tuple of (row of the closest station, distance in km), or (None, inf) if there are no stations
+        """
+        return self._index.nearest(latitude, longitude)
+
+    def find(self, destination):
+        """
+        Find the row for a destination
+
+        Tries the city itself, then the nearest station within
+        MAX_STATION_DISTANCE_KM of its gazetteer coordinates, then its country.
+
+        Returns:
+        - Row index, or None if there are no normals for the destination
+        """
+        destination_id = canonical_destination(destination)
+        if destination_id in self._rows:
+            return self._rows[destination_id]
+        location = locate(destination)
+        if location is not None:
+            row, distance = self.nearest(*location)
+            if distance <= MAX_STATION_DISTANCE_KM:
+                return row
+        if destination_id in self._country_rows:
+            return self._country_rows[destination_id]
+        parts = [part for part in destination.split(",") if part.strip()]
+        if len(parts) > 1:
+            return self._country_rows.get(canonical_destination(parts[-1]))
+        return None
+
+    def daily(self, row, dates):
+        """
+        Interpolate the normals of one city to individual days
+
+        Returns:
+        - Arrays of the daily high (°C), daily low (°C) and daily precipitation (mm), one entry per date
+        """
+        days = day_of_year(dates)
+        left = np.searchsorted(_KNOTS, days, side="right") - 1
+        weight = (days - _KNOTS[left]) / (_KNOTS[left + 1] - _KNOTS[left])
+        values = self._knot_values[row]
+        highs, lows, rain = values[:, left] * (1 - weight) + values[:, left + 1] * weight
+        return highs, lows, rain
+
+    def estimate(self, destination, dates):
+        """
+        Climate-based weather for a destination on each of the given dates
+
+        Returns:
+        - Three object arrays (descriptions, temperature ranges, icons), or None
+          if there are no normals for the destination
+        """
+        row = self.find(destination)
+        if row is None:
+            return None
+        return describe(*self.daily(row, dates))
+
+
+def get_normals():
+    """
+    Return the bundled climate normals, loading them on first use
+
+    Falls back to building them from the CSVs in CLIMATE_DIR if the arrays
+    haven't been built yet, and to an empty set if there is nothing to build from.
+    """
+    global _normals
+    if _normals is None:
+        with _normals_lock:
+            if _normals is None:
+                try:
+                    _normals = ClimateNormals.load(NORMALS_FILE)
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Error loading climate normals from {NORMALS_FILE}: {e}")
+                    try:
+                        _normals = build_normals(sorted(glob.glob(os.path.join(CLIMATE_DIR, "*.csv"))))
+                    except (OSError, ValueError) as e:
+                        print(f"Error building climate normals: {e}")
+                        _normals = build_normals([])
+    return _normals
+
+
+def _column(header, field):
+    for name in _COLUMNS[field]:
+        if name in header:
+            return name
+    return None
+
+
+def read_station_csv(path, imperial=False):
+    """
+    Read monthly station normals from one CSV file
+
+    Parameters:
+    - path: CSV file with one row per station and month
+    - imperial: True if temperatures are in °F and precipitation in inches
+
+    Returns:
+    - List of (city, country, latitude, longitude, month, tmax, tmin, prcp) tuples in metric units
+    """
+    rows = []
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        header = reader.fieldnames or []
+        columns = {field: _column(header, field) for field in _COLUMNS}
+        missing = [field for field in ("name", "latitude", "longitude", "month", "tmax", "tmin", "prcp") if columns[field] is None]
+        if missing:
+            raise ValueError(f"{path} has no {', '.join(missing)} column")
+
+        for record in reader:
+            try:
+                city = (record.get(columns["city"]) if columns["city"] else None) or record[columns["name"]]
+                # NOAA writes the month as "01" or "2020-01"
+                month = int(record[columns["month"]].split("-")[-1])
+                tmax = float(record[columns["tmax"]])
+                tmin = float(record[columns["tmin"]])
+                prcp = float(record[columns["prcp"]])
+                latitude = float(record[columns["latitude"]])
+                longitude = float(record[columns["longitude"]])
+            except (TypeError, ValueError):
+                # Stations leave out normals they don't have enough years for
+                continue
+            if not 1 <= month <= 12:
+                continue
+            if imperial:
+                tmax = (tmax - 32) * 5 / 9
+                tmin = (tmin - 32) * 5 / 9
+                prcp = prcp * 25.4
+            country = record.get(columns["country"], "") if columns["country"] else ""
+            rows.append((city.strip(), country.strip(), latitude, longitude, month, tmax, tmin, prcp))
+    return rows
+
+
+def build_normals(paths, imperial=False):
+    """
+    Build climate normals from station CSVs
+
+    Stations that map to the same destination ID are averaged. A destination
+    is left out if any month is missing for it.
+
+    Parameters:
+    - paths: CSV files to read
+    - imperial: True if the files use °F and inches
+
+    Returns:
+    - ClimateNormals
+    """
+    # destination ID -> [name, country, coordinates, sums of shape (3, 12), counts of shape (12,)]
+    cities = {}
+    for path in paths:
+        for city, country, latitude, longitude, month, tmax, tmin, prcp in read_station_csv(path, imperial):
+            destination_id = canonical_destination(city)
+            if not destination_id:
+                continue
+            if destination_id not in cities:
+                cities[destination_id] = [city, country, [], np.zeros((3, 12)), np.zeros(12)]
+            entry = cities[destination_id]
+            entry[2].append((latitude, longitude))
+            entry[3][:, month - 1] += (tmax, tmin, prcp)
+            entry[4][month - 1] += 1
+
+    ids, names, countries, latitudes, longitudes, values = [], [], [], [], [], []
+    for destination_id, (name, country, coordinates, sums, counts) in cities.items():
+        if (counts == 0).any():
+            print(f"Skipping {name}: no normals for month(s) {', '.join(str(m + 1) for m in np.flatnonzero(counts == 0))}")
+            continue
+        latitude, longitude = np.mean(coordinates, axis=0)
+        ids.append(destination_id)
+        names.append(name)
+        countries.append(country)
+        latitudes.append(latitude)
+        longitudes.append(longitude)
+        values.append(sums / counts)
+
+    values = np.array(values).reshape(len(ids), 3, 12)
+    return ClimateNormals(ids, names, countries, latitudes, longitudes, values[:, 0], values[:, 1], values[:, 2])
+
+
+def estimate_weather(destination, dates):
+    """
+    Climate-based weather for a destination, or None if it has no normals
+
+    Parameters:
+    - destination: Destination as typed by the user
+    - dates: Dates to estimate
+
+    Returns:
+    - Three object arrays (descriptions, temperature ranges, icons), or None
+    """
+    return get_normals().estimate(destination, dates)
+
+
+def main():
+    """Rebuild the climate normals arrays from station CSVs"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build climate normals from monthly station CSVs")
+    parser.add_argument("csv_files", nargs="*", help=f"Station CSVs (default: every CSV in {CLIMATE_DIR})")
+    parser.add_argument("--output", default=NORMALS_FILE, help="Where to write the arrays")
+    parser.add_argument("--imperial", action="store_true", help="Inputs are in °F and inches (NOAA's default units)")
+    args = parser.parse_args()
+
+    paths = args.csv_files or sorted(glob.glob(os.path.join(CLIMATE_DIR, "*.csv")))
+    if not paths:
+        print("No station CSVs to read")
+        return 1
+    try:
+        normals = build_normals(paths, imperial=args.imperial)
+    except (OSError, ValueError) as e:
+        print(f"Error reading station CSVs: {e}")
+        return 1
+    normals.save(args.output)
+    print(f"Wrote normals for {len(normals)} destinations to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
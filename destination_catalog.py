@@ -0,0 +1,167 @@
+import glob
+import json
+import os
+import random
+import string
+import threading
+
+# Directory of JSON catalog files. Every *.json file in it is merged in name
+# order, so a destination pack (e.g. "pack-italy.json") can add or override
+# destinations, preferences or templates without a code change.
+CATALOG_DIR = os.environ.get("DESTINATION_CATALOG_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog"))
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+class Template:
+    """
+    A "{destination}"-style string template parsed once when the catalog loads
+
+    The template is split into its literal text and field names up front, so
+    rendering only joins the pieces with the field values.
+
+    Parameters:
+    - source: Template text; fields are written as {destination} or {pref}
+    """
+
+    __slots__ = ("source", "fields", "_parts")
+
+    def __init__(self, source):
+        self.source = source
+        self.fields = []
+        # (literal text, field name or None) pairs in template order
+        self._parts = []
+        for literal, field, format_spec, conversion in string.Formatter().parse(source):
+            if field is not None and (not field.isidentifier() or format_spec or conversion):
+                raise ValueError(f"Unsupported template field {{{field}}} in {source!r}")
+            if field is not None:
+                self.fields.append(field)
+            self._parts.append((literal, field))
+
+    def render(self, values):
+        """
+        Fill in the template
+
+        Parameters:
+        - values: Dictionary with a value for every field
+
+        Returns:
+        - Rendered text
+        """
+        return "".join(literal + (str(values[field]) if field is not None else "") for literal, field in self._parts)
+
+
+def _merge(target, source):
+    """Merge one catalog file into the catalog; nested groups merge, lists replace"""
+    for key, value in source.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = value
+
+
+def _compile(node):
+    """Compile every template string in a nested group, leaving out malformed ones"""
+    if isinstance(node, list):
+        templates = []
+        for source in node:
+            try:
+                templates.append(Template(source))
+            except ValueError as e:
+                print(f"Error compiling catalog template: {e}")
+        return templates
+    return {key: _compile(value) for key, value in node.items()}
+
+
+def load_catalog(directory=None):
+    """
+    Read and compile the catalog files
+
+    Parameters:
+    - directory: Catalog directory (defaults to CATALOG_DIR)
+
+    Returns:
+    - Dictionary with "destinations" and "preferences" (plain strings keyed by
+      destination ID) and "templates" (compiled Template objects)
+    """
+    merged = {"destinations": {}, "preferences": {}, "templates": {}}
+    for path in sorted(glob.glob(os.path.join(directory or CATALOG_DIR, "*.json"))):
+        try:
+            with open(path, encoding="utf-8") as f:
+                _merge(merged, json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"Error loading catalog file {path}: {e}")
+    merged["templates"] = _compile(merged["templates"])
+    return merged
+
+
+def get_catalog():
+    """Return the shared catalog, loading it on first use"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = load_catalog()
+    return _catalog
+
+
+def reload_catalog():
+    """Drop the loaded catalog so the next lookup picks up changed files"""
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
+
+
+def get_curated_destination(destination_id):
+    """
+    Parameters:
+    - destination_id: Canonical destination ID, e.g. "new-york"
+
+    Returns:
+    - Curated destination details, or None if the destination isn't curated
+    """
+    curated = get_catalog()["destinations"].get(destination_id)
+    if curated is None:
+        return None
+    # Callers get their own lists so they can't change the shared catalog
+    return {key: list(value) for key, value in curated.items()}
+
+
+def get_curated_preferences(destination_id):
+    """
+    Returns:
+    - Dictionary of preference to curated activities, or None if the destination has none
+    """
+    return get_catalog()["preferences"].get(destination_id)
+
+
+def get_templates(*path):
+    """
+    Look up a group of compiled templates, e.g. get_templates("fallback", "city", "attractions")
+
+    Returns:
+    - A list of Template objects, a dictionary of them, or None if the group doesn't exist
+    """
+    node = get_catalog()["templates"]
+    for key in path:
+        if not isinstance(node, dict) or key not in node:
+            return None
+        node = node[key]
+    return node
+
+
+def render_all(templates, **values):
+    """Format every template in a list"""
+    return [template.render(values) for template in templates]
+
+
+def render_sample(templates, count, **values):
+    """
+    Pick up to `count` templates at random and format only those
+
+    Returns:
+    - List of formatted strings in random order
+    """
+    chosen = random.sample(templates, min(count, len(templates)))
+    return [template.render(values) for template in chosen]
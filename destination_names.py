@@ -0,0 +1,122 @@
+import hashlib
+import re
+import unicodedata
+from functools import lru_cache
+
+# Alternative spellings, nicknames and local names mapped to the canonical city name
+DESTINATION_ALIASES = {
+    "new york": ["new york city", "nyc", "ny", "manhattan", "big apple"],
+    "london": ["greater london"],
+    "paris": [],
+    "tokyo": ["tokio", "edo"],
+    "rome": ["roma"],
+    "barcelona": [],
+    "bali": ["denpasar", "ubud"],
+    "mumbai": ["bombay"],
+    "chennai": ["madras"],
+    "kolkata": ["calcutta"],
+    "bangalore": ["bengaluru"],
+    "delhi": ["new delhi"],
+    "beijing": ["peking"],
+    "ho chi minh city": ["saigon", "ho chi minh"],
+    "istanbul": ["constantinople"],
+    "prague": ["praha"],
+    "vienna": ["wien"],
+    "munich": ["munchen"],
+    "florence": ["firenze"],
+    "venice": ["venezia"],
+    "milan": ["milano"],
+    "naples": ["napoli"],
+    "lisbon": ["lisboa"],
+    "copenhagen": ["kobenhavn"],
+    "zurich": [],
+    "cologne": ["koln"],
+    "athens": ["athina"],
+    "los angeles": ["la"],
+    "san francisco": ["sf"],
+    "washington": ["washington dc", "dc"],
+    "rio de janeiro": ["rio"],
+    "mexico city": ["cdmx", "ciudad de mexico"],
+    "dubai": []
+}
+
+# Country names and abbreviations that may follow a city name ("Paris, France", "Rome Italy")
+COUNTRY_NAMES = {
+    "usa", "us", "u s", "u s a", "united states", "united states of america", "america",
+    "uk", "u k", "united kingdom", "england", "scotland", "wales", "great britain",
+    "france", "italy", "spain", "portugal", "germany", "austria", "switzerland", "netherlands", "belgium",
+    "denmark", "norway", "sweden", "finland", "iceland", "ireland", "greece", "turkey", "croatia",
+    "czech republic", "czechia", "hungary", "poland", "japan", "china", "south korea", "korea", "india",
+    "indonesia", "thailand", "vietnam", "singapore", "malaysia", "philippines", "australia", "new zealand",
+    "canada", "mexico", "brazil", "argentina", "peru", "chile", "colombia", "egypt", "morocco",
+    "south africa", "kenya", "uae", "united arab emirates", "israel", "jordan", "russia"
+}
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def _fold(text):
+    """Lowercase, strip accents and punctuation, and collapse whitespace"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def _slug(name):
+    return name.replace(" ", "-")
+
+
+# Precomputed index from every known spelling to its destination ID
+_INDEX = {}
+for _canonical, _aliases in DESTINATION_ALIASES.items():
+    for _name in [_canonical] + _aliases:
+        _INDEX[_fold(_name)] = _slug(_fold(_canonical))
+
+
+@lru_cache(maxsize=4096)
+def canonical_destination(destination):
+    """
+    Turn any spelling of a destination into a stable destination ID
+
+    Accents and punctuation are stripped, a trailing ", <country>" is dropped
+    and known aliases are resolved, so "Paris, France", "paris" and "PARIS" all
+    map to "paris" and "NYC" maps to "new-york". A country after a known city
+    without a comma ("Rome Italy") is dropped too, but other names are kept
+    whole, so "New Mexico" stays "new-mexico". Names with nothing left after
+    folding (e.g. in a non-Latin script) get an ID derived from a hash of the
+    name. Every cache in the app keys on this ID.
+
+    Parameters:
+    - destination: Destination as typed by the user
+
+    Returns:
+    - Destination ID (lowercase, words joined with hyphens), or "" for empty input
+    """
+    names = [part.strip() for part in unicodedata.normalize("NFC", destination).split(",")]
+    names = [name for name in names if name]
+    if not names:
+        return ""
+    parts = [_fold(name) for name in names]
+
+    full = " ".join(part for part in parts if part)
+    if full in _INDEX:
+        return _INDEX[full]
+
+    # Drop trailing country segments, but never the only one ("South Korea" is a destination too)
+    while len(parts) > 1 and parts[-1] in COUNTRY_NAMES:
+        parts.pop()
+        names.pop()
+    city = " ".join(part for part in parts if part)
+    if city in _INDEX:
+        return _INDEX[city]
+
+    # "Rome Italy" without a comma
+    words = city.split()
+    for size in (4, 3, 2, 1):
+        if len(words) > size and " ".join(words[-size:]) in COUNTRY_NAMES and " ".join(words[:-size]) in _INDEX:
+            return _INDEX[" ".join(words[:-size])]
+
+    if not city:
+        digest = hashlib.sha1(", ".join(names).casefold().encode("utf-8")).hexdigest()
+        return f"place-{digest[:12]}"
+    return _slug(city)
@@ -1,8 +1,95 @@
 import trafilatura
 import json
+import requests
+import os
 import random
 import re
+import sys
+import threading
 import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from urllib.parse import urlparse
+
+from circuit_breaker import CircuitBreaker
+from destination_catalog import get_curated_destination, get_curated_preferences, get_templates, render_all, render_sample
+from destination_names import canonical_destination
+from disk_cache import DiskCache, CACHE_DIR
+from guide_entities import activity_names, activity_phrases, attraction_names, restaurant_names
+from guide_sections import SectionStreamDetector, index_sections, index_xml_sections, section_text
+from page_archive import PageArchive, read_body
+from poi_database import get_pois
+from rate_limiter import HostRateLimiter, PRIORITY_BACKGROUND, PRIORITY_BULK, PRIORITY_INTERACTIVE
+
+# Scraped destination data is kept on disk so repeat lookups skip the network.
+# Both settings can be overridden through the environment.
+DESTINATION_CACHE_TTL = int(os.environ.get("DESTINATION_CACHE_TTL", 7 * 24 * 3600))
+DESTINATION_CACHE_MAX_ENTRIES = int(os.environ.get("DESTINATION_CACHE_MAX_ENTRIES", 5000))
+# Results missing a source (timed out, failed or skipped) turn stale after this
+# long instead, so the next lookup refreshes them
+DESTINATION_CACHE_PARTIAL_TTL = int(os.environ.get("DESTINATION_CACHE_PARTIAL_TTL", 3600))
+
+# Per-source fetch timeout and the overall deadline for one lookup (seconds).
+# Sources can override SOURCE_TIMEOUT with their own "timeout" entry.
+SOURCE_TIMEOUT = float(os.environ.get("SCRAPE_SOURCE_TIMEOUT", 6))
+SCRAPE_DEADLINE = float(os.environ.get("SCRAPE_DEADLINE", 10))
+# Stop waiting for slower sources once every category has this many names
+MIN_SCRAPED_ITEMS = 5
+# Stale entries are served for up to this long past their TTL while being refreshed
+DESTINATION_CACHE_MAX_STALE = int(os.environ.get("DESTINATION_CACHE_MAX_STALE", 30 * 24 * 3600))
+# How many stale destinations may be re-scraped in the background at once,
+# and how long a refresh may take before another worker is allowed to retry it
+MAX_BACKGROUND_REFRESHES = int(os.environ.get("MAX_BACKGROUND_REFRESHES", 2))
+REFRESH_LEASE = 60
+
+# Guide page URLs; {page} is the destination's page title, e.g. "New_York"
+WIKIVOYAGE_URL = os.environ.get("WIKIVOYAGE_URL", "https://en.wikivoyage.org/wiki/{page}")
+WIKITRAVEL_URL = os.environ.get("WIKITRAVEL_URL", "https://wikitravel.org/en/{page}")
+
+# Politeness limit: at most this many requests in flight to any one host
+HOST_CONCURRENCY = int(os.environ.get("SCRAPE_HOST_CONCURRENCY", 2))
+# Request rate allowed to each host across every process on the machine (requests
+# per second, and how many may go out back to back)
+HOST_RATE = float(os.environ.get("SCRAPE_HOST_RATE", 1.0))
+HOST_BURST = int(os.environ.get("SCRAPE_HOST_BURST", 3))
+# Guide pages are read in chunks of STREAM_CHUNK_SIZE bytes and extraction starts as
+# soon as the sections we extract from are complete, while the rest of the page is
+# downloaded in the background for the archive (set SCRAPE_STREAMING=0 to wait for
+# whole pages). Pages are never read past MAX_PAGE_BYTES.
+SCRAPE_STREAMING = os.environ.get("SCRAPE_STREAMING", "1") != "0"
+STREAM_CHUNK_SIZE = 16 * 1024
+MAX_PAGE_BYTES = int(os.environ.get("SCRAPE_MAX_PAGE_BYTES", 5 * 1024 * 1024))
+SCRAPE_USER_AGENT = os.environ.get("SCRAPE_USER_AGENT", "TravelPlannerBot/1.0 (+https://github.com/swetha600/hackathon)")
+
+# A source is skipped for SOURCE_RESET_TIMEOUT seconds after this many consecutive
+# failures, and a (source, destination) pair that failed isn't retried for NEGATIVE_CACHE_TTL
+SOURCE_FAILURE_THRESHOLD = int(os.environ.get("SCRAPE_SOURCE_FAILURE_THRESHOLD", 5))
+SOURCE_RESET_TIMEOUT = float(os.environ.get("SCRAPE_SOURCE_RESET_TIMEOUT", 60))
+NEGATIVE_CACHE_TTL = int(os.environ.get("SCRAPE_NEGATIVE_CACHE_TTL", 15 * 60))
+
+_refresh_slots = threading.BoundedSemaphore(MAX_BACKGROUND_REFRESHES)
+_background_downloads = set()
+_background_downloads_lock = threading.Lock()
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+_source_breakers = {}
+
+_destination_cache = None
+_source_failure_cache = None
+_page_archive = None
+_rate_limiter = None
+
+# Benchmarks set this to a dictionary to collect the seconds spent in each
+# pipeline stage (fetch, extract, sections, entities, fill, dedupe)
+stage_timings = None
+_stage_timings_lock = threading.Lock()
+
+def _record_stage(stage, started):
+    """Add the time since `started` (a perf_counter value) to stage_timings, if it is being collected"""
+    if stage_timings is not None:
+        seconds = time.perf_counter() - started
+        with _stage_timings_lock:
+            stage_timings.setdefault(stage, []).append(seconds)
 
 def clean_text(text):
     """Clean the scraped text"""
@@ -12,442 +99,568 @@ def clean_text(text):
     text = re.sub(r'\s+', ' ', text).strip()
     return text
 
-def get_destination_info(destination):
+def _host_slot(url):
+    """Semaphore limiting concurrent requests to the host of a URL"""
+    host = urlparse(url).netloc
+    with _host_slots_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(HOST_CONCURRENCY)
+        return _host_slots[host]
+
+def _source_breaker(url):
+    """Circuit breaker tracking the health of the host of a URL"""
+    host = urlparse(url).netloc
+    with _host_slots_lock:
+        if host not in _source_breakers:
+            _source_breakers[host] = CircuitBreaker(SOURCE_FAILURE_THRESHOLD, SOURCE_RESET_TIMEOUT)
+        return _source_breakers[host]
+
+def get_source_health():
+    """
+    Report the circuit state of every source contacted so far
+    
+    Returns:
+    - Dictionary mapping host to its state ("closed", "open" or "half_open")
+      and consecutive failure count
+    """
+    with _host_slots_lock:
+        breakers = dict(_source_breakers)
+    return {host: breaker.snapshot() for host, breaker in breakers.items()}
+
+def get_source_failure_cache():
+    """Return the short-lived on-disk cache of (source, destination) pairs that recently failed"""
+    global _source_failure_cache
+    if _source_failure_cache is None:
+        _source_failure_cache = DiskCache(
+            os.path.join(CACHE_DIR, "source_failures.sqlite3"),
+            ttl=NEGATIVE_CACHE_TTL,
+            max_entries=DESTINATION_CACHE_MAX_ENTRIES
+        )
+    return _source_failure_cache
+
+def get_rate_limiter():
+    """Return the machine-wide per-host rate limiter for outbound fetches"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = HostRateLimiter(os.path.join(CACHE_DIR, "rate_limits.sqlite3"), rate=HOST_RATE, burst=HOST_BURST)
+    return _rate_limiter
+
+def get_destination_cache():
+    """Return the shared on-disk cache of scraped destination data"""
+    global _destination_cache
+    if _destination_cache is None:
+        _destination_cache = DiskCache(
+            os.path.join(CACHE_DIR, "destinations.sqlite3"),
+            ttl=DESTINATION_CACHE_TTL,
+            max_entries=DESTINATION_CACHE_MAX_ENTRIES,
+            max_stale=DESTINATION_CACHE_MAX_STALE
+        )
+    return _destination_cache
+
+def get_page_archive():
+    """Return the shared archive of raw fetched pages"""
+    global _page_archive
+    if _page_archive is None:
+        _page_archive = PageArchive()
+    return _page_archive
+
+def _guide_sources(destination):
+    """Guide pages to scrape for a destination, with the sections each category is read from"""
+    page_title = destination.strip().replace(' ', '_')
+    return [
+        # WikiVoyage
+        {
+            "url": WIKIVOYAGE_URL.format(page=page_title),
+            "timeout": SOURCE_TIMEOUT,
+            "attractions_sections": ["see"],
+            "restaurants_sections": ["eat"],
+            "activities_sections": ["do"]
+        },
+        # Wikitravel as second source
+        {
+            "url": WIKITRAVEL_URL.format(page=page_title),
+            "timeout": SOURCE_TIMEOUT,
+            "attractions_sections": ["see"],
+            "restaurants_sections": ["eat"],
+            "activities_sections": ["do"]
+        }
+    ]
+
+def _fetch_page(source, destination, destination_id):
+    """
+    Download a guide page, archiving the body and revalidating archived copies
+    
+    If a complete copy of the page was archived before, the request carries
+    its ETag and Last-Modified headers, and a 304 answer is served from the
+    archive. The body is streamed, and with SCRAPE_STREAMING on the sections
+    the source reads from are returned as soon as they have been received;
+    the rest of the page is downloaded on a background thread and the whole
+    page archived (see finish_background_downloads).
+    
+    Returns:
+    - Raw page body as bytes, or None if the server has no such page
+    
+    Raises:
+    - requests.RequestException on transport errors and 5xx answers
+    """
+    archive = get_page_archive()
+    archived = archive.get(source["url"])
+    headers = {"User-Agent": SCRAPE_USER_AGENT}
+    # A copy cut off at MAX_PAGE_BYTES isn't revalidated, so a full fetch replaces it
+    if archived is not None and archived["truncated"]:
+        archived = None
+    if archived is not None:
+        if archived["etag"]:
+            headers["If-None-Match"] = archived["etag"]
+        if archived["last_modified"]:
+            headers["If-Modified-Since"] = archived["last_modified"]
+    
+    wanted = set()
+    for key in ("attractions_sections", "restaurants_sections", "activities_sections"):
+        wanted.update(source.get(key, []))
+    detector = SectionStreamDetector(wanted) if SCRAPE_STREAMING else None
+    page = bytearray()
+    truncated = False
+    
+    response = requests.get(source["url"], headers=headers, timeout=source.get("timeout", SOURCE_TIMEOUT), stream=True)
+    try:
+        if response.status_code == 304 and archived is not None:
+            archive.touch(source["url"])
+            return archive.read(archived)
+        if response.status_code >= 500:
+            # The host itself is in trouble, unlike a 404 for a destination it has no article on
+            response.raise_for_status()
+        if response.status_code != 200:
+            return None
+        chunks = response.iter_content(STREAM_CHUNK_SIZE)
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        for chunk in chunks:
+            page += chunk
+            if len(page) >= MAX_PAGE_BYTES:
+                truncated = True
+                break
+            if detector is not None and detector.scan(page):
+                # Extract from what we have; the archive gets the whole page once it has arrived
+                content = bytes(page[:detector.end])
+                _start_background_download(response, chunks, page, source["url"], destination_id, destination,
+                                           etag, last_modified)
+                response = None
+                return content
+    finally:
+        if response is not None:
+            response.close()
+    
+    if not page:
+        return None
+    content = bytes(page)
+    archive.put(source["url"], content, destination_id, destination,
+                etag=etag, last_modified=last_modified, truncated=truncated)
+    return content
+
+def _start_background_download(response, chunks, page, url, destination_id, destination, etag, last_modified):
+    """Read the rest of a streamed page on a background thread and archive the whole page"""
+    def finish():
+        truncated = False
+        try:
+            with response:
+                for chunk in chunks:
+                    page.extend(chunk)
+                    if len(page) >= MAX_PAGE_BYTES:
+                        truncated = True
+                        break
+            get_page_archive().put(url, bytes(page), destination_id, destination,
+                                   etag=etag, last_modified=last_modified, truncated=truncated)
+        except Exception as e:
+            # Nothing is archived; the next lookup fetches the page again
+            print(f"Error finishing download of {url}: {e}")
+        finally:
+            with _background_downloads_lock:
+                _background_downloads.discard(threading.current_thread())
+    
+    thread = threading.Thread(target=finish, name=f"download-{destination_id}", daemon=True)
+    with _background_downloads_lock:
+        _background_downloads.add(thread)
+    thread.start()
+
+def finish_background_downloads(timeout=None):
+    """
+    Wait for the pages still being downloaded for the archive
+    
+    Parameters:
+    - timeout: Longest to wait in seconds, or None to wait for all of them
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        with _background_downloads_lock:
+            threads = list(_background_downloads)
+        if not threads:
+            return
+        for thread in threads:
+            thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
+        if deadline is not None and time.monotonic() >= deadline:
+            return
+
+def extract_guide_items(content, source):
+    """
+    Pull attraction, restaurant and activity names out of a guide page
+    
+    Parameters:
+    - content: Raw page body (bytes or str)
+    - source: Source description with the guide sections to read
+    
+    Returns:
+    - Dictionary with lists of attractions, restaurants and activities, and
+      "page_found" telling whether the page had any readable text
+    """
+    found = {"attractions": [], "restaurants": [], "activities": [], "page_found": False}
+    
+    # Prefer the structured XML output so headings come from markup; fall back to plain text
+    started = time.perf_counter()
+    xml = trafilatura.extract(content, output_format="xml")
+    _record_stage("extract", started)
+    started = time.perf_counter()
+    try:
+        text, sections = index_xml_sections(xml) if xml else ("", {})
+    except ET.ParseError:
+        text = trafilatura.extract(content) or ""
+        sections = index_sections(text)
+    if not text:
+        return found
+    found["page_found"] = True
+    
+    attractions_text = section_text(text, sections, source.get("attractions_sections", ["see"]))
+    restaurants_text = section_text(text, sections, source.get("restaurants_sections", ["eat"]))
+    activities_text = section_text(text, sections, source.get("activities_sections", ["do"]))
+    _record_stage("sections", started)
+    
+    # Extract specific information from the sections for each category
+    started = time.perf_counter()
+    if attractions_text:
+        # Extract attraction names - look for names that start with capital letters
+        potential_names = attraction_names.findall(attractions_text)
+        cleaned_names = [name.strip() for name in potential_names if len(name.strip()) > 4]
+        found["attractions"].extend(cleaned_names)
+    
+    if restaurants_text:
+        # Extract restaurant names
+        potential_names = restaurant_names.findall(restaurants_text)
+        # Also look for quoted names that might be restaurants
+        quoted_names = re.findall(r'"([^"]{3,})"', restaurants_text)
+        cleaned_names = [name.strip() for name in potential_names + quoted_names if len(name.strip()) > 4]
+        found["restaurants"].extend(cleaned_names)
+    
+    if activities_text:
+        # Extract activity descriptions
+        potential_activities = activity_phrases.findall(activities_text)
+        # Also look for specific activities
+        specific_activities = activity_names.findall(activities_text)
+        found["activities"].extend([activity.strip() for activity in potential_activities + specific_activities if len(activity.strip()) > 10])
+    _record_stage("entities", started)
+    
+    return found
+
+def _scrape_source(source, destination, destination_id, priority=PRIORITY_INTERACTIVE):
+    """
+    Fetch a single guide page and pull attraction, restaurant and activity names out of it
+    
+    Parameters:
+    - source: Source description with its URL, timeout and the guide sections to read
+    - destination: Name of the destination as given by the user
+    - destination_id: Canonical destination ID
+    - priority: Place in the host's request queue (see rate_limiter)
+    
+    Returns:
+    - Dictionary with lists of attractions, restaurants and activities found on the page,
+      the time the download took in "fetch_seconds", "page_found" telling whether
+      the source returned a readable page at all, "missing" if it has no page for
+      the destination (e.g. a 404), and "rate_limited" if the request never got a
+      turn within the source's timeout
+    """
+    # Wait for this host's turn; the time spent queueing counts against the source timeout
+    if not get_rate_limiter().acquire(urlparse(source["url"]).netloc, priority=priority,
+                                      timeout=source.get("timeout", SOURCE_TIMEOUT)):
+        return {"attractions": [], "restaurants": [], "activities": [], "page_found": False,
+                "rate_limited": True, "fetch_seconds": 0.0}
+    
+    with _host_slot(source["url"]):
+        fetch_started = time.perf_counter()
+        content = _fetch_page(source, destination, destination_id)
+        fetch_seconds = time.perf_counter() - fetch_started
+        _record_stage("fetch", fetch_started)
+    
+    if content:
+        found = extract_guide_items(content, source)
+    else:
+        found = {"attractions": [], "restaurants": [], "activities": [], "page_found": False, "missing": True}
+    found["fetch_seconds"] = fetch_seconds
+    return found
+
+def get_destination_info(destination, stats=None, priority=PRIORITY_INTERACTIVE):
     """
     Fetch real information about a destination using web scraping
     
     Parameters:
     - destination: Name of the destination to search for
+    - stats: Optional dictionary that receives how the lookup was answered
+      ("status": curated, cached, stale, scraped, fallback or failed) and per-source timings.
+      "fallback" means no source could be read and the result is generic filler,
+      which isn't cached. "partial" is set to True when a scraped result is
+      missing some source
+    - priority: Queue priority of any fetches this lookup makes; bulk jobs pass
+      PRIORITY_BULK so interactive lookups go first
     
     Returns:
     - Dictionary with destination details
     """
-    # Dictionary of curated destinations with known specific attractions
-    curated_destinations = {
-        "paris": {
-            "attractions": [
-                "Eiffel Tower", "Louvre Museum", "Notre-Dame Cathedral", 
-                "Arc de Triomphe", "Montmartre", "Sacré-Cœur Basilica",
-                "Musée d'Orsay", "Luxembourg Gardens", "Champs-Élysées",
-                "Centre Pompidou", "Sainte-Chapelle", "Palais Garnier Opera House"
-            ],
-            "restaurants": [
-                "Le Jules Verne", "L'Ambroisie", "Septime", "Le Comptoir du Relais",
-                "Chez L'Ami Jean", "Café de Flore", "Le Cinq", "Bistrot Paul Bert",
-                "Pierre Gagnaire", "Le Chateaubriand", "L'As du Fallafel", "Breizh Café"
-            ],
-            "activities": [
-                "Seine River Cruise", "Shopping at Galeries Lafayette", 
-                "Wine Tasting at La Dernière Goutte", "Walking Tour of Le Marais",
-                "Visit to Père Lachaise Cemetery", "Paris Catacombs Tour",
-                "Picnic at Canal Saint-Martin", "Moulin Rouge Show",
-                "Cooking Class with a French Chef", "Versailles Palace Day Trip"
-            ]
-        },
-        "london": {
-            "attractions": [
-                "Tower of London", "British Museum", "Buckingham Palace", 
-                "London Eye", "Westminster Abbey", "St. Paul's Cathedral",
-                "Natural History Museum", "Tate Modern", "Hyde Park",
-                "Tower Bridge", "The Shard", "Kensington Palace"
-            ],
-            "restaurants": [
-                "The Ledbury", "Dishoom", "Gordon Ramsay Restaurant", 
-                "The Wolseley", "Sketch", "Borough Market Food Stalls",
-                "Duck & Waffle", "St. John", "The Ivy", "Padella",
-                "Ottolenghi", "The Harwood Arms"
-            ],
-            "activities": [
-                "Thames River Cruise", "Changing of the Guard", 
-                "Shopping at Harrods", "Shakespeare's Globe Theatre Tour",
-                "Camden Market Visit", "Jack the Ripper Walking Tour",
-                "Afternoon Tea at The Ritz", "Harry Potter Studio Tour",
-                "Street Art Tour in Shoreditch", "Pub Crawl in Soho"
-            ]
-        },
-        "new york": {
-            "attractions": [
-                "Statue of Liberty", "Empire State Building", "Times Square", 
-                "Central Park", "Metropolitan Museum of Art", "Brooklyn Bridge",
-                "One World Trade Center", "The High Line", "Grand Central Terminal",
-                "Rockefeller Center", "Broadway Theater District", "Fifth Avenue"
-            ],
-            "restaurants": [
-                "Eleven Madison Park", "Katz's Delicatessen", "Le Bernardin", 
-                "Peter Luger Steakhouse", "Balthazar", "Momofuku Ko",
-                "Gramercy Tavern", "The Spotted Pig", "Shake Shack", 
-                "Di Fara Pizza", "Masa", "The Four Seasons"
-            ],
-            "activities": [
-                "Broadway Show", "Helicopter Tour of Manhattan", 
-                "Ferry to Staten Island", "Shopping in SoHo",
-                "Cycling in Central Park", "Sunset Cruise around Manhattan",
-                "Guided Tour of The Met", "Food Tour of Greenwich Village",
-                "Visit to Coney Island", "Hip-Hop Tour of the Bronx"
-            ]
-        },
-        "tokyo": {
-            "attractions": [
-                "Tokyo Skytree", "Senso-ji Temple", "Meiji Shrine", 
-                "Tokyo Imperial Palace", "Shinjuku Gyoen National Garden", 
-                "Shibuya Crossing", "Ueno Park", "Tokyo Tower",
-                "Tsukiji Outer Market", "Roppongi Hills", "Harajuku", "Akihabara"
-            ],
-            "restaurants": [
-                "Sukiyabashi Jiro", "Narisawa", "Ichiran Ramen", 
-                "Uobei Sushi", "Gonpachi Nishi-Azabu", "Kobe Beef Kaiseki 511",
-                "Fukamachi", "Tonkatsu Maisen", "Tempura Kondo", 
-                "Den", "Ukai-tei", "Tsuta Japanese Soba Noodles"
-            ],
-            "activities": [
-                "Sumo Wrestling Tournament", "TeamLab Borderless Digital Art Museum", 
-                "Japanese Tea Ceremony", "Kimono Fitting Experience",
-                "Night Food Tour in Shinjuku", "Karaoke in Shibuya",
-                "Sake Tasting Tour", "Tokyo Bay Cruise",
-                "Robot Restaurant Show", "Day Trip to Mount Fuji"
-            ]
-        },
-        "rome": {
-            "attractions": [
-                "Colosseum", "Vatican City", "Trevi Fountain", 
-                "Roman Forum", "Pantheon", "Spanish Steps",
-                "St. Peter's Basilica", "Sistine Chapel", "Villa Borghese",
-                "Castel Sant'Angelo", "Piazza Navona", "Palatine Hill"
-            ],
-            "restaurants": [
-                "La Pergola", "Roscioli", "Da Enzo al 29", 
-                "Armando al Pantheon", "Pierluigi", "Da Felice",
-                "Pizzarium", "Glass Hostaria", "Antico Arco", 
-                "Cesare al Casaletto", "Trattoria Monti", "Arcangelo"
-            ],
-            "activities": [
-                "Gladiator School", "Pasta Making Class", 
-                "Vespa Tour of Rome", "Vatican Museums Night Tour",
-                "Catacombs of Rome", "Wine Tasting in Frascati",
-                "Underground Rome Tour", "Day Trip to Pompeii",
-                "Photography Walk of Ancient Rome", "Colosseum Underground Tour"
-            ]
-        },
-        "barcelona": {
-            "attractions": [
-                "Sagrada Familia", "Park Güell", "Casa Batlló", 
-                "Gothic Quarter", "La Rambla", "Montjuïc",
-                "Barcelona Cathedral", "Magic Fountain", "Barceloneta Beach",
-                "Picasso Museum", "Camp Nou Stadium", "Palau de la Música Catalana"
-            ],
-            "restaurants": [
-                "Tickets", "Els Quatre Gats", "Disfrutar", 
-                "Cal Pep", "Quimet & Quimet", "Moments",
-                "La Boqueria Market Stalls", "ABaC", "Alkimia", 
-                "Bar Cañete", "Dos Palillos", "Gresca"
-            ],
-            "activities": [
-                "Flamenco Show", "Cooking Class & Market Tour", 
-                "Sailing Trip along the Barcelona Coast", "Montserrat Day Trip",
-                "Bike Tour of Barcelona", "Gaudí Architecture Tour",
-                "Tapas Crawl in El Born", "Wine Tasting Experience",
-                "Catalan Traditions Workshop", "FC Barcelona Match"
-            ]
-        }
-    }
+    # Every lookup below keys on the canonical destination ID
+    destination_id = canonical_destination(destination)
     
     # Try first to match with our curated list
-    for key, data in curated_destinations.items():
-        if key in destination.lower():
-            return data
+    if stats is None:
+        stats = {}
+    stats["sources"] = {}
+    
+    curated = get_curated_destination(destination_id)
+    if curated is not None:
+        stats["status"] = "curated"
+        return curated
+    
+    # Then the persistent cache of previously scraped destinations. Entries past
+    # their TTL are still served right away while a background thread re-scrapes them.
+    cached, stale = get_destination_cache().get_entry(destination_id)
+    if cached is not None:
+        stats["status"] = "stale" if stale else "cached"
+        if stale:
+            _refresh_in_background(destination, destination_id)
+        return cached
+    
+    return _scrape_destination_info(destination, destination_id, stats, priority)
+
+def _refresh_in_background(destination, destination_id):
+    """
+    Re-scrape a stale cache entry on a background thread
+    
+    At most MAX_BACKGROUND_REFRESHES run at once, and the cache's refresh lease
+    makes sure only one thread in one process refreshes a given destination.
+    If no source succeeds the stale entry is kept as it is.
+    """
+    if not _refresh_slots.acquire(blocking=False):
+        return
+    cache = get_destination_cache()
+    if not cache.try_begin_refresh(destination_id, lease=REFRESH_LEASE):
+        _refresh_slots.release()
+        return
+    
+    def refresh():
+        try:
+            stats = {}
+            _scrape_destination_info(destination, destination_id, stats, PRIORITY_BACKGROUND)
+            # When no source succeeded ("fallback") or the scrape raised ("failed"),
+            # nothing was written, so release the lease and keep serving the old entry
+            if stats.get("status") != "scraped":
+                cache.end_refresh(destination_id)
+        except Exception as e:
+            print(f"Error refreshing destination info for {destination}: {e}")
+            cache.end_refresh(destination_id)
+        finally:
+            _refresh_slots.release()
+    
+    threading.Thread(target=refresh, name=f"refresh-{destination_id}", daemon=True).start()
+
+def _build_result(destination, all_attractions, all_restaurants, all_activities):
+    """
+    Turn the names collected for a destination into its info dictionary
+    
+    Duplicates are removed, each category is capped at 15 entries, and thin
+    categories are padded with the catalog's generic entries.
     
+    Returns:
+    - Dictionary with attractions, restaurants, activities and colors
+    """
+    # Process our collected data
+    started = time.perf_counter()
+    attractions = list(set(all_attractions))[:15]  # Remove duplicates and limit
+    restaurants = list(set(all_restaurants))[:15]
+    activities = list(set(all_activities))[:15]
+    _record_stage("dedupe", started)
+    
+    # Use a fallback based on the destination type (city vs natural area)
+    started = time.perf_counter()
+    is_nature = any(x in destination.lower() for x in ["park", "mountain", "forest", "beach", "island", "lake", "river"])
+    fill = get_templates("scrape_fill", "nature" if is_nature else "city")
+    
+    # If we still don't have enough attractions, try a more generic approach
+    if len(attractions) < 5:
+        attractions.extend(render_all(fill["attractions"], destination=destination))
+            
+    # If we don't have enough restaurants
+    if len(restaurants) < 5:
+        restaurants.extend(render_all(fill["restaurants"], destination=destination))
+        
+    # If we don't have enough activities
+    if len(activities) < 5:
+        activities.extend(render_all(fill["activities"], destination=destination))
+    _record_stage("fill", started)
+    
+    # Filter and deduplicate again
+    started = time.perf_counter()
+    attractions = list(set([a for a in attractions if destination.lower() in a.lower() or len(a) > 5]))[:15]
+    restaurants = list(set([r for r in restaurants if destination.lower() in r.lower() or len(r) > 5]))[:15]
+    activities = list(set([act for act in activities if destination.lower() in act.lower() or len(act) > 10]))[:15]
+    _record_stage("dedupe", started)
+    
+    # Create the result dictionary
+    result = {
+        "attractions": attractions,
+        "restaurants": restaurants,
+        "activities": activities,
+        "colors": [[66, 135, 245], [240, 140, 50], [66, 186, 150]]  # Default colors
+    }
+    return result
+
+def _scrape_destination_info(destination, destination_id, stats, priority=PRIORITY_INTERACTIVE):
+    """
+    Scrape destination data from the POI database and the guide sites, and cache it
+    
+    Parameters:
+    - destination: Name of the destination as given by the user
+    - destination_id: Canonical destination ID used as the cache key
+    - stats: Dictionary that receives the lookup status and per-source timings
+    - priority: Queue priority of the page fetches
+    
+    Returns:
+    - Dictionary with destination details
+    """
+    stats.setdefault("sources", {})
     try:
         # Try multiple sources with fallbacks
-        sources = [
-            # WikiVoyage
-            {
-                "url": f"https://en.wikivoyage.org/wiki/{destination.replace(' ', '_')}",
-                "attractions_patterns": [
-                    r'See\s*\[\s*edit\s*\](.*?)(?:Do|Buy|Eat|Drink|Sleep)',
-                    r'Landmarks(.*?)(?:Museums|Parks|Activities)'
-                ],
-                "restaurants_patterns": [
-                    r'Eat\s*\[\s*edit\s*\](.*?)(?:Drink|Sleep|Connect|Go next)',
-                    r'Restaurants(.*?)(?:Cafes|Bars|Hotels)'
-                ],
-                "activities_patterns": [
-                    r'Do\s*\[\s*edit\s*\](.*?)(?:Buy|Eat|Drink|Sleep)',
-                    r'Activities(.*?)(?:Shopping|Dining|Accommodations)'
-                ]
-            },
-            # Wikitravel as second source
-            {
-                "url": f"https://wikitravel.org/en/{destination.replace(' ', '_')}",
-                "attractions_patterns": [
-                    r'See\s*\[edit\](.*?)(?:Do|Buy|Eat|Drink|Sleep)',
-                    r'Attractions(.*?)(?:Activities|Shopping)'
-                ],
-                "restaurants_patterns": [
-                    r'Eat\s*\[edit\](.*?)(?:Drink|Sleep|Stay safe)',
-                    r'Food(.*?)(?:Nightlife|Lodging)'
-                ],
-                "activities_patterns": [
-                    r'Do\s*\[edit\](.*?)(?:Buy|Eat|Drink)',
-                    r'Activities(.*?)(?:Shopping|Dining)'
-                ]
-            }
-        ]
+        sources = _guide_sources(destination)
         
-        # Initialize our collections
-        all_attractions = []
-        all_restaurants = []
-        all_activities = []
+        # Listings loaded from the WikiVoyage dump (poi_database.py) come first;
+        # if they cover every category we don't touch the network at all
+        local_pois = get_pois(destination_id)
+        all_attractions = list(local_pois["attractions"])
+        all_restaurants = list(local_pois["restaurants"])
+        all_activities = list(local_pois["activities"])
+        # Number of sources (the POI database included) that gave us real names
+        succeeded = 1 if any((all_attractions, all_restaurants, all_activities)) else 0
+        if all(len(items) >= MIN_SCRAPED_ITEMS for items in (all_attractions, all_restaurants, all_activities)):
+            sources = []
         
+        # Skip sources that recently failed for this destination or whose circuit is open
+        failure_cache = get_source_failure_cache()
+        available = []
         for source in sources:
-            # Fetch content from the source URL
-            try:
-                content = trafilatura.fetch_url(source["url"])
-                if not content:
-                    continue
-                    
-                text = trafilatura.extract(content)
-                if not text:
-                    continue
+            if failure_cache.get(source["url"]) is not None:
+                stats["sources"][source["url"]] = {"status": "skipped", "reason": "recent_failure", "seconds": 0.0}
+            elif not _source_breaker(source["url"]).allow_request():
+                stats["sources"][source["url"]] = {"status": "skipped", "reason": "circuit_open", "seconds": 0.0}
+            else:
+                available.append(source)
+        sources = available
+        if not sources and not succeeded:
+            # Skipped sources count as failed ones: with all of them skipped there is
+            # nothing but template filler to return, and it isn't cached
+            stats["status"] = "fallback"
+            return _build_result(destination, all_attractions, all_restaurants, all_activities)
+        
+        def record_failure(source, status):
+            _source_breaker(source["url"]).record_failure()
+            failure_cache.set(source["url"], status)
+        
+        # Fetch every source in parallel and merge results as they arrive.
+        # We stop waiting once we have enough of each category, when a source
+        # runs past its own timeout, or when the overall deadline is reached.
+        executor = ThreadPoolExecutor(max_workers=max(1, len(sources)))
+        started = time.monotonic()
+        futures = {executor.submit(_scrape_source, source, destination, destination_id, priority): source for source in sources}
+        pending = set(futures)
+        try:
+            while pending:
+                now = time.monotonic() - started
                 
-                # Extract specific information using the patterns for this source
-                for pattern in source["attractions_patterns"]:
-                    matches = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
-                    if matches:
-                        # Extract attraction names - look for names that start with capital letters
-                        section_text = matches.group(1)
-                        potential_names = re.findall(r'(?:^|\n)[^\n]*?([A-Z][a-zA-Z\s\'\-]{3,}(?:Museum|Palace|Castle|Cathedral|Temple|Church|Square|Park|Garden|Bridge|Tower|Monument|Gallery|Arena|Center|Theatre|Library|Zoo|Aquarium))[^\n]*', section_text)
-                        cleaned_names = [name.strip() for name in potential_names if len(name.strip()) > 4]
-                        all_attractions.extend(cleaned_names)
+                # Give up on sources that exceeded their own timeout
+                for future in [f for f in pending if now >= futures[f].get("timeout", SOURCE_TIMEOUT)]:
+                    print(f"Timed out fetching source {futures[future]['url']}")
+                    stats["sources"][futures[future]["url"]] = {"status": "timeout", "seconds": now}
+                    record_failure(futures[future], "timeout")
+                    pending.discard(future)
                 
-                for pattern in source["restaurants_patterns"]:
-                    matches = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
-                    if matches:
-                        # Extract restaurant names
-                        section_text = matches.group(1)
-                        potential_names = re.findall(r'(?:^|\n)[^\n]*?([A-Z][a-zA-Z\s\'\-]{2,}(?:Restaurant|Café|Bistro|Trattoria|Pizzeria|Brasserie|Steakhouse|Grill|Diner|Eatery))[^\n]*', section_text)
-                        # Also look for quoted names that might be restaurants
-                        quoted_names = re.findall(r'"([^"]{3,})"', section_text)
-                        cleaned_names = [name.strip() for name in potential_names + quoted_names if len(name.strip()) > 4]
-                        all_restaurants.extend(cleaned_names)
+                if not pending or now >= SCRAPE_DEADLINE:
+                    break
                 
-                for pattern in source["activities_patterns"]:
-                    matches = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
-                    if matches:
-                        # Extract activity descriptions
-                        section_text = matches.group(1)
-                        potential_activities = re.findall(r'(?:^|\n)[^\n]*?((?:Tour|Visit|Explore|Experience|Class|Workshop|Cruise|Trip|Hike|Walk)[^\.]{10,}\.)', section_text)
-                        # Also look for specific activities
-                        specific_activities = re.findall(r'(?:^|\n)[^\n]*?([A-Z][a-zA-Z\s\'\-]{5,}(?:Tour|Class|Experience|Festival|Show|Event))[^\n]*', section_text)
-                        all_activities.extend([activity.strip() for activity in potential_activities + specific_activities if len(activity.strip()) > 10])
+                wait_for = min([SCRAPE_DEADLINE - now] + [futures[f].get("timeout", SOURCE_TIMEOUT) - now for f in pending])
+                done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
                 
-            except Exception as e:
-                print(f"Error processing source {source['url']}: {e}")
-                continue
-        
-        # Process our collected data
-        attractions = list(set(all_attractions))[:15]  # Remove duplicates and limit
-        restaurants = list(set(all_restaurants))[:15]
-        activities = list(set(all_activities))[:15]
-        
-        # If we still don't have enough attractions, try a more generic approach
-        if len(attractions) < 5:
-            # Use a fallback based on the destination type (city vs natural area)
-            if any(x in destination.lower() for x in ["park", "mountain", "forest", "beach", "island", "lake", "river"]):
-                attractions.extend([
-                    f"{destination} Viewpoint",
-                    f"{destination} Trail",
-                    f"{destination} Waterfall",
-                    f"Scenic {destination} Overlook",
-                    f"{destination} Visitor Center",
-                    f"{destination} Nature Reserve",
-                    f"{destination} Wildlife Area",
-                    f"Guided Tour of {destination}"
-                ])
-            else:  # City or town
-                attractions.extend([
-                    f"{destination} Museum",
-                    f"{destination} Cathedral",
-                    f"Historic District of {destination}",
-                    f"{destination} Castle",
-                    f"{destination} Art Gallery",
-                    f"Main Square of {destination}",
-                    f"Old Town {destination}",
-                    f"{destination} Botanical Garden",
-                    f"{destination} Parliament Building",
-                    f"{destination} City Hall",
-                    f"{destination} University",
-                    f"Cultural Center of {destination}"
-                ])
+                for future in done:
+                    try:
+                        found = future.result()
+                    except Exception as e:
+                        print(f"Error processing source {futures[future]['url']}: {e}")
+                        stats["sources"][futures[future]["url"]] = {"status": "error", "seconds": time.monotonic() - started}
+                        record_failure(futures[future], "error")
+                        continue
+                    if found.get("rate_limited"):
+                        # Says nothing about the source's health, so don't count it as a failure
+                        stats["sources"][futures[future]["url"]] = {"status": "rate_limited", "seconds": time.monotonic() - started}
+                        continue
+                    if found.get("missing"):
+                        # No article for this destination; says nothing about the host's health,
+                        # so only this (source, destination) pair is skipped for a while
+                        _source_breaker(futures[future]["url"]).record_success()
+                        stats["sources"][futures[future]["url"]] = {"status": "missing", "seconds": found["fetch_seconds"]}
+                        failure_cache.set(futures[future]["url"], "missing")
+                        continue
+                    if not found["page_found"]:
+                        # Junk we couldn't extract anything from
+                        stats["sources"][futures[future]["url"]] = {"status": "empty", "seconds": found["fetch_seconds"]}
+                        record_failure(futures[future], "empty")
+                        continue
+                    _source_breaker(futures[future]["url"]).record_success()
+                    stats["sources"][futures[future]["url"]] = {"status": "ok", "seconds": found["fetch_seconds"]}
+                    succeeded += 1
+                    all_attractions.extend(found["attractions"])
+                    all_restaurants.extend(found["restaurants"])
+                    all_activities.extend(found["activities"])
                 
-        # If we don't have enough restaurants
-        if len(restaurants) < 5:
-            restaurants.extend([
-                f"The {destination} Kitchen",
-                f"Café Central {destination}",
-                f"{destination} Fine Dining",
-                f"Traditional {destination} Restaurant",
-                f"Local Cuisine at {destination} Market",
-                f"{destination} Street Food Festival",
-                f"Gourmet {destination} Experience",
-                f"Authentic {destination} Eatery",
-                f"{destination} Seafood Restaurant",
-                f"{destination} Steakhouse",
-                f"Farm-to-Table in {destination}",
-                f"Family Restaurant in {destination}"
-            ])
-            
-        # If we don't have enough activities
-        if len(activities) < 5:
-            # Use more specific activities based on the destination type
-            if any(x in destination.lower() for x in ["park", "mountain", "forest", "beach", "island", "lake", "river"]):
-                activities.extend([
-                    f"Hiking in {destination}",
-                    f"{destination} Guided Nature Walk",
-                    f"Wildlife Watching in {destination}",
-                    f"Photography Tour of {destination}",
-                    f"Camping in {destination}",
-                    f"{destination} Water Sports",
-                    f"Fishing at {destination}",
-                    f"Bird Watching in {destination}",
-                    f"Sunset Viewing at {destination}",
-                    f"{destination} Adventure Tour"
-                ])
-            else:  # City or town
-                activities.extend([
-                    f"Walking Tour of {destination}",
-                    f"{destination} Bike Tour",
-                    f"Food Tour in {destination}",
-                    f"Private Guide in {destination}",
-                    f"{destination} Cultural Experience",
-                    f"Shopping in {destination}",
-                    f"{destination} Nightlife Tour",
-                    f"Cooking Class in {destination}",
-                    f"{destination} Wine Tasting",
-                    f"Historical Tour of {destination}",
-                    f"Photography Walk in {destination}",
-                    f"Local Craft Workshop in {destination}"
-                ])
-        
-        # Filter and deduplicate again
-        attractions = list(set([a for a in attractions if destination.lower() in a.lower() or len(a) > 5]))[:15]
-        restaurants = list(set([r for r in restaurants if destination.lower() in r.lower() or len(r) > 5]))[:15]
-        activities = list(set([act for act in activities if destination.lower() in act.lower() or len(act) > 10]))[:15]
-        
-        # Create the result dictionary
-        result = {
-            "attractions": attractions,
-            "restaurants": restaurants,
-            "activities": activities,
-            "colors": [[66, 135, 245], [240, 140, 50], [66, 186, 150]]  # Default colors
-        }
+                # Return early once the fastest sources gave us enough to work with
+                if all(len(set(items)) >= MIN_SCRAPED_ITEMS for items in (all_attractions, all_restaurants, all_activities)):
+                    break
+        finally:
+            # Don't block on slow sources; their threads finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
         
+        result = _build_result(destination, all_attractions, all_restaurants, all_activities)
+        if not succeeded:
+            # Every source failed, so the result is nothing but template filler;
+            # caching it would hide the real data for the whole TTL
+            stats["status"] = "fallback"
+            return result
+        # A source that didn't answer this time may well answer next time
+        partial = any(source["status"] != "ok" for source in stats["sources"].values())
+        get_destination_cache().set(destination_id, result, ttl=DESTINATION_CACHE_PARTIAL_TTL if partial else None)
+        stats["status"] = "scraped"
+        stats["partial"] = partial
         return result
         
     except Exception as e:
         print(f"Error scraping destination info: {e}")
+        stats["status"] = "failed"
         
         # Return more specific fallback data even in case of error
-        city_attractions = [
-            f"{destination} National Museum", 
-            f"Historic {destination} Cathedral",
-            f"{destination} Castle",
-            f"Old Town {destination}",
-            f"{destination} Art Gallery",
-            f"{destination} Heritage Site",
-            f"{destination} Royal Palace",
-            f"Ancient {destination} Ruins",
-            f"{destination} Historic District",
-            f"{destination} Botanical Gardens",
-            f"{destination} Public Library",
-            f"{destination} Opera House"
-        ]
-        
-        city_restaurants = [
-            f"The {destination} Gourmet Restaurant",
-            f"Café {destination} Central",
-            f"{destination} Traditional Bistro",
-            f"Authentic Cuisine of {destination}",
-            f"{destination} Fine Dining Experience",
-            f"Local {destination} Street Food Market",
-            f"{destination} Waterfront Restaurant",
-            f"Historic {destination} Tavern",
-            f"{destination} Fusion Kitchen",
-            f"Family Restaurant in {destination}",
-            f"{destination} International Cuisine",
-            f"Farm-to-Table at {destination}"
-        ]
-        
-        city_activities = [
-            f"Walking Tour of Historic {destination}",
-            f"Guided {destination} Museum Tour",
-            f"{destination} Cultural Performance",
-            f"Local Craft Workshop in {destination}",
-            f"Cooking Class with {destination} Chef",
-            f"{destination} Wine Tasting Experience",
-            f"Photography Tour of {destination} Landmarks",
-            f"Scenic {destination} Boat Tour",
-            f"Shopping in {destination} Markets",
-            f"Bicycle Tour around {destination}",
-            f"Evening {destination} Ghost Tour",
-            f"{destination} Food Tasting Experience"
-        ]
-        
-        nature_attractions = [
-            f"{destination} Scenic Viewpoint",
-            f"{destination} Waterfall",
-            f"{destination} National Park",
-            f"{destination} Nature Reserve",
-            f"{destination} Mountain Peak",
-            f"{destination} Lake",
-            f"{destination} Canyon",
-            f"{destination} Wildlife Sanctuary",
-            f"Scenic {destination} Valley",
-            f"{destination} Forest Trail",
-            f"{destination} Hot Springs",
-            f"{destination} Beach"
-        ]
-        
-        nature_restaurants = [
-            f"{destination} Mountain Lodge Restaurant",
-            f"Lakeside Dining at {destination}",
-            f"{destination} Forest Café",
-            f"Scenic {destination} Restaurant",
-            f"{destination} Organic Eatery",
-            f"Farm Restaurant near {destination}",
-            f"{destination} Picnic Area",
-            f"Local Cuisine at {destination} Village",
-            f"{destination} Visitor Center Café",
-            f"Traditional Food at {destination}",
-            f"{destination} Wilderness Lodge Restaurant",
-            f"Outdoor Dining in {destination}"
-        ]
-        
-        nature_activities = [
-            f"Hiking in {destination}",
-            f"{destination} Guided Nature Walk",
-            f"Wildlife Watching in {destination}",
-            f"{destination} Photography Tour",
-            f"Bird Watching in {destination}",
-            f"{destination} Camping Experience",
-            f"Kayaking at {destination}",
-            f"Fishing in {destination}",
-            f"{destination} Rock Climbing",
-            f"Mountain Biking in {destination}",
-            f"{destination} Stargazing Tour",
-            f"Sunset Viewing at {destination}"
-        ]
-        
         # Determine if it's likely a nature destination or a city
         is_nature = any(word in destination.lower() for word in [
             "park", "mountain", "forest", "lake", "river", "beach", "island", 
             "valley", "canyon", "hills", "national", "reserve", "wilderness", 
             "springs", "falls", "woods", "ocean", "sea", "coast"
         ])
+        fallback = get_templates("fallback", "nature" if is_nature else "city")
         
         return {
-            "attractions": random.sample(nature_attractions if is_nature else city_attractions, min(10, len(nature_attractions if is_nature else city_attractions))),
-            "restaurants": random.sample(nature_restaurants if is_nature else city_restaurants, min(10, len(nature_restaurants if is_nature else city_restaurants))),
-            "activities": random.sample(nature_activities if is_nature else city_activities, min(10, len(nature_activities if is_nature else city_activities))),
+            "attractions": render_sample(fallback["attractions"], 10, destination=destination),
+            "restaurants": render_sample(fallback["restaurants"], 10, destination=destination),
+            "activities": render_sample(fallback["activities"], 10, destination=destination),
             "colors": [[66, 135, 245], [240, 140, 50], [66, 186, 150]]  # Default colors
         }
 
@@ -464,348 +677,237 @@ def get_specific_activities(destination, preferences):
     """
     result = {}
     
-    # Curated preference-based activities for popular destinations
-    curated_preferences = {
-        "paris": {
-            "Nature": [
-                "Picnic in Luxembourg Gardens", 
-                "Stroll through Jardin des Tuileries", 
-                "Day trip to Versailles Gardens",
-                "Explore Parc des Buttes-Chaumont", 
-                "Boat ride on Lake at Bois de Boulogne", 
-                "Bird watching at Jardin des Plantes"
-            ],
-            "History": [
-                "Tour of Notre-Dame Cathedral", 
-                "Visit the Louvre Museum", 
-                "Explore the Palace of Versailles",
-                "Walking tour of Latin Quarter", 
-                "Visit Musée Carnavalet (Paris History Museum)", 
-                "Explore the Conciergerie and Sainte-Chapelle"
-            ],
-            "Food": [
-                "Pastry and Chocolate Tour in Saint-Germain", 
-                "French Wine Tasting Experience", 
-                "Cooking Class with a Parisian Chef",
-                "Food Tour of Montmartre", 
-                "Visit to Rue Mouffetard Market", 
-                "Cheese Tasting at a Fromagerie"
-            ],
-            "Culture": [
-                "Evening at the Paris Opera", 
-                "Visit Centre Pompidou", 
-                "Explore Musée d'Orsay",
-                "Walking Tour of Le Marais Art Galleries", 
-                "Visit Musée Rodin", 
-                "Attend a classical concert at Sainte-Chapelle"
-            ],
-            "Shopping": [
-                "Shopping at Galeries Lafayette", 
-                "Browse boutiques in Le Marais", 
-                "Visit to Saint-Ouen Flea Market",
-                "Shopping on Champs-Élysées", 
-                "Explore Village Saint-Paul for antiques", 
-                "Designer shopping on Avenue Montaigne"
-            ],
-            "Relaxation": [
-                "Spa Day at Thermal Baths", 
-                "Seine River Cruise", 
-                "Relax in Place des Vosges",
-                "Afternoon Tea at Angelina", 
-                "Garden Meditation at Musée de la Vie Romantique", 
-                "Hammam experience at a Parisian spa"
-            ]
-        },
-        "london": {
-            "Nature": [
-                "Explore Kew Gardens", 
-                "Rowboat at Hyde Park", 
-                "Visit Richmond Park to see deer",
-                "Hampstead Heath Walking Tour", 
-                "Kyoto Garden in Holland Park", 
-                "Bird watching at London Wetland Centre"
-            ],
-            "History": [
-                "Tower of London Tour", 
-                "Churchill War Rooms", 
-                "British Museum Guided Tour",
-                "Westminster Abbey Visit", 
-                "Hampton Court Palace Day Trip", 
-                "Walking Tour of Roman London"
-            ],
-            "Food": [
-                "Borough Market Food Tour", 
-                "Afternoon Tea at The Ritz", 
-                "East End Curry Tour on Brick Lane",
-                "Cooking Class with Celebrity Chef", 
-                "Traditional Pub Food Crawl", 
-                "Maltby Street Market Tasting Tour"
-            ],
-            "Culture": [
-                "Theatre Show in West End", 
-                "Tate Modern Guided Tour", 
-                "Street Art Tour in Shoreditch",
-                "Royal Opera House Performance", 
-                "Victoria and Albert Museum Visit", 
-                "Shakespeare's Globe Theatre Experience"
-            ],
-            "Shopping": [
-                "Shopping at Harrods", 
-                "Explore Covent Garden Markets", 
-                "Antique hunting on Portobello Road",
-                "Designer shopping on Bond Street", 
-                "Visit Camden Market", 
-                "Browse Fortnum & Mason Food Hall"
-            ],
-            "Relaxation": [
-                "Spa Day at ESPA Life", 
-                "Thames River Cruise", 
-                "Meditation session at Buddhist Centre",
-                "Visit Hampstead Pergola and Hill Gardens", 
-                "Turkish Bath at Ironmonger Row Baths", 
-                "Rooftop Yoga with City Views"
-            ]
-        },
-        "new york": {
-            "Nature": [
-                "Rowboat in Central Park", 
-                "Brooklyn Botanic Garden Tour", 
-                "High Line Park Walking Tour",
-                "Bird watching in Central Park Ramble", 
-                "New York Harbor Kayaking", 
-                "Sunset at Brooklyn Bridge Park"
-            ],
-            "History": [
-                "Ellis Island and Statue of Liberty Tour", 
-                "Tenement Museum Visit", 
-                "Metropolitan Museum of Art Tour",
-                "9/11 Memorial and Museum", 
-                "Walking Tour of Historic Harlem", 
-                "Theodore Roosevelt Birthplace"
-            ],
-            "Food": [
-                "Greenwich Village Food Tour", 
-                "Pizza Tour of Brooklyn", 
-                "Chinatown Dim Sum Experience",
-                "Culinary Walking Tour of the Lower East Side", 
-                "Chelsea Market Food Crawl", 
-                "New York Bagel Making Class"
-            ],
-            "Culture": [
-                "Broadway Show Experience", 
-                "MoMA Guided Tour", 
-                "Metropolitan Opera at Lincoln Center",
-                "Harlem Gospel Tour", 
-                "Chelsea Art Gallery Crawl", 
-                "Live Jazz in the Village"
-            ],
-            "Shopping": [
-                "Fifth Avenue Shopping Spree", 
-                "SoHo Boutique Tour", 
-                "Brooklyn Flea Market",
-                "Vintage Shopping in East Village", 
-                "Macy's Herald Square Visit", 
-                "Designer Outlets at Woodbury Common"
-            ],
-            "Relaxation": [
-                "Spa Day at Mandarin Oriental", 
-                "Sunset Sailing on Hudson River", 
-                "Meditation in the Cloisters",
-                "Russian and Turkish Baths Experience", 
-                "Sunrise Yoga in Bryant Park", 
-                "Float Therapy in Manhattan"
-            ]
-        }
-    }
-    
-    # Map of preference to specific activities (for destinations not in our curated list)
-    preference_activities = {
-        "Nature": [
-            f"Explore {destination} Botanical Gardens",
-            f"Day Trip to Natural Parks near {destination}",
-            f"Hiking in {destination} Mountains",
-            f"Wildlife Watching in {destination}",
-            f"Bird Watching Tour in {destination}",
-            f"{destination} River Cruise",
-            f"Picnic in {destination} Park",
-            f"Kayaking in {destination} Waterways",
-            f"Cycling Tour through {destination} Countryside",
-            f"Sunset Viewing at {destination} Scenic Point",
-            f"Tree Top Walk in {destination} Forest",
-            f"Visit {destination} Waterfall"
-        ],
-        "History": [
-            f"{destination} Historical Walking Tour", 
-            f"Visit {destination} Cathedral",
-            f"Explore {destination} Castle",
-            f"Ancient Ruins of {destination}",
-            f"{destination} Archaeological Museum Tour",
-            f"Medieval {destination} Experience",
-            f"Historical Landmarks Tour in {destination}",
-            f"{destination} History Museum",
-            f"Visit {destination} War Memorial",
-            f"Ancient {destination} Walking Tour",
-            f"Historic Churches of {destination}",
-            f"{destination} Heritage Site Visit"
-        ],
-        "Food": [
-            f"{destination} Food Tour",
-            f"Cooking Class with a Local {destination} Chef",
-            f"{destination} Street Food Experience",
-            f"Wine Tasting in {destination}",
-            f"Visit {destination} Food Market",
-            f"Traditional {destination} Cuisine Cooking Class",
-            f"Craft Beer Tour in {destination}",
-            f"{destination} Chocolatier Workshop",
-            f"Farm-to-Table Experience in {destination}",
-            f"Local Food Tasting in {destination}",
-            f"Food and History Tour of {destination}",
-            f"{destination} Culinary Workshop"
-        ],
-        "Culture": [
-            f"{destination} Art Museum Tour",
-            f"Traditional Music Performance in {destination}",
-            f"Cultural Walking Tour of {destination}",
-            f"Local Crafts Workshop in {destination}",
-            f"{destination} Theater Performance",
-            f"Art Gallery Tour in {destination}",
-            f"Cultural Festival in {destination}",
-            f"Photography Tour of {destination}",
-            f"Traditional Dance Show in {destination}",
-            f"{destination} Literary Tour",
-            f"Meet Local Artists in {destination}",
-            f"{destination} Architecture Tour"
-        ],
-        "Adventure": [
-            f"Zip-lining Adventure in {destination}",
-            f"Rock Climbing in {destination}",
-            f"White Water Rafting near {destination}",
-            f"Paragliding over {destination}",
-            f"Mountain Biking in {destination}",
-            f"{destination} Adventure Park",
-            f"Bungee Jumping in {destination}",
-            f"Canyoning Experience near {destination}",
-            f"Hot Air Balloon Ride over {destination}",
-            f"ATV Off-road Adventure in {destination}",
-            f"Skydiving in {destination}",
-            f"Caving Expedition near {destination}"
-        ],
-        "Relaxation": [
-            f"Spa Day at {destination} Wellness Center",
-            f"Yoga Class in {destination}",
-            f"Meditation Retreat in {destination}",
-            f"{destination} Hot Springs Visit",
-            f"Massage Treatment in {destination}",
-            f"Thermal Bath Experience in {destination}",
-            f"Beachside Relaxation in {destination}",
-            f"Garden Meditation in {destination}",
-            f"Lakeside Yoga in {destination}",
-            f"Forest Bathing in {destination}",
-            f"Sunset Cruise in {destination}",
-            f"Wellness Retreat Day in {destination}"
-        ],
-        "Shopping": [
-            f"Shopping Tour of {destination} Boutiques",
-            f"{destination} Market Experience",
-            f"Artisan Shopping in {destination}",
-            f"Vintage Shopping in {destination}",
-            f"{destination} Shopping District Tour",
-            f"Designer Shopping in {destination}",
-            f"Antique Hunting in {destination}",
-            f"Local Crafts Shopping in {destination}",
-            f"{destination} Souvenir Shopping",
-            f"Fashion District Tour in {destination}",
-            f"Shopping Mall Experience in {destination}",
-            f"Hidden Shops of {destination} Tour"
-        ],
-        "Nightlife": [
-            f"Bar Hopping Tour in {destination}",
-            f"{destination} Rooftop Bar Experience",
-            f"Live Music Venue in {destination}",
-            f"Nightclub Experience in {destination}",
-            f"Evening Cocktail Tour in {destination}",
-            f"Jazz Night in {destination}",
-            f"Local Brewery Tour in {destination}",
-            f"Wine Bar Tour in {destination}",
-            f"Comedy Club Night in {destination}",
-            f"Pub Crawl in {destination}",
-            f"Evening River Cruise in {destination}",
-            f"Night Food Tour in {destination}"
-        ],
-        "Family": [
-            f"{destination} Zoo Visit",
-            f"Family-friendly Museum in {destination}",
-            f"{destination} Aquarium Tour",
-            f"Theme Park near {destination}",
-            f"Interactive Science Museum in {destination}",
-            f"Family Cooking Class in {destination}",
-            f"Children's Theater in {destination}",
-            f"Family Bike Tour of {destination}",
-            f"Kid-friendly Walking Tour of {destination}",
-            f"{destination} Puppet Show",
-            f"Family Adventure Park in {destination}",
-            f"Historical Re-enactment for Kids in {destination}"
-        ],
-        "Photography": [
-            f"{destination} Photography Walking Tour",
-            f"Sunrise Photography in {destination}",
-            f"Urban Photography Tour of {destination}",
-            f"Landscape Photography in {destination}",
-            f"Portrait Photography Class in {destination}",
-            f"Night Photography Tour of {destination}",
-            f"Photo Tour of {destination} Hidden Spots",
-            f"Architecture Photography in {destination}",
-            f"{destination} Wildlife Photography",
-            f"Street Photography Workshop in {destination}",
-            f"Photography at {destination} Historical Sites",
-            f"Photo Safari in {destination}"
-        ],
-        "Educational": [
-            f"{destination} University Tour",
-            f"Science Museum Visit in {destination}",
-            f"Historical Lecture Tour in {destination}",
-            f"Educational Workshop in {destination}",
-            f"Language Exchange in {destination}",
-            f"Local Craft Learning in {destination}",
-            f"Cooking School in {destination}",
-            f"Historical Re-enactment in {destination}",
-            f"Literary Tour of {destination}",
-            f"Archaeological Workshop in {destination}",
-            f"Wine Education Class in {destination}",
-            f"Cultural Immersion Class in {destination}"
-        ]
-    }
-    
-    # Check if we have curated activities for this destination
-    destination_key = None
-    for key in curated_preferences:
-        if key in destination.lower():
-            destination_key = key
-            break
+    # Curated activities are keyed by destination ID; other places use the catalog's templates
+    curated_preferences = get_curated_preferences(canonical_destination(destination)) or {}
+    preference_activities = get_templates("preference_activities") or {}
     
     # Add activities for each preference
     for pref in preferences:
         # If we have curated activities for this destination and preference
-        if destination_key and pref in curated_preferences[destination_key]:
-            # Use curated activities first
-            curated = curated_preferences[destination_key][pref].copy()
-            random.shuffle(curated)
-            result[pref] = curated[:7]  # Take up to 7 activities
+        if pref in curated_preferences:
+            # Use curated activities first, up to 7 in random order
+            curated = curated_preferences[pref]
+            result[pref] = random.sample(curated, min(7, len(curated)))
         elif pref in preference_activities:
-            # Use general activities
-            activities = preference_activities[pref].copy()
-            random.shuffle(activities)
-            result[pref] = activities[:7]  # Take up to 7 activities
+            # Use general activities, formatting only the 7 that were picked
+            result[pref] = render_sample(preference_activities[pref], 7, destination=destination)
         else:
             # For any preference not in our predefined lists, create some generic ones
-            result[pref] = [
-                f"{pref} Experience in {destination}",
-                f"{destination} {pref} Tour",
-                f"Best {pref} Activities in {destination}",
-                f"Local {pref} in {destination}",
-                f"{destination}'s Premier {pref} Attractions",
-                f"{pref}-focused Day in {destination}",
-                f"Authentic {pref} in {destination}"
-            ]
-    
-    return result
\ No newline at end of file
+            result[pref] = render_all(get_templates("generic_preference_activities"), destination=destination, pref=pref)
+    
+    return result
+
+def get_destination_info_many(destinations, concurrency=4, progress=None):
+    """
+    Look up many destinations at once, e.g. to warm the cache before a launch
+    
+    Lookups run with at most `concurrency` destinations in flight, and every
+    fetch still goes through the per-host politeness limits (HOST_CONCURRENCY and
+    the shared HOST_RATE token bucket) at PRIORITY_BULK, behind interactive lookups.
+    
+    Parameters:
+    - destinations: Iterable of destination names
+    - concurrency: Number of destinations looked up in parallel
+    - progress: Optional callback called as progress(done, total, destination, status)
+      after each lookup finishes
+    
+    Returns:
+    - Tuple of (results, report): results maps each destination to its data, and
+      report summarizes hits, misses, failures and per-source latency
+    """
+    # Several spellings of the same place only need one lookup
+    unique = {}
+    for destination in destinations:
+        destination = destination.strip()
+        if destination and canonical_destination(destination) not in unique:
+            unique[canonical_destination(destination)] = destination
+    names = list(unique.values())
+    
+    results = {}
+    statuses = {}
+    latencies = {}
+    started = time.monotonic()
+    
+    def lookup(destination):
+        stats = {}
+        info = get_destination_info(destination, stats=stats, priority=PRIORITY_BULK)
+        return destination, info, stats
+    
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = [executor.submit(lookup, destination) for destination in names]
+        for done, future in enumerate(as_completed(futures), start=1):
+            destination, info, stats = future.result()
+            status = stats.get("status", "failed")
+            results[destination] = info
+            statuses[destination] = status
+            for url, source in stats.get("sources", {}).items():
+                host = latencies.setdefault(urlparse(url).netloc, {"seconds": [], "errors": 0, "timeouts": 0, "skipped": 0})
+                if source["status"] == "skipped":
+                    # Skipped sources were never contacted, so they have no latency
+                    host["skipped"] += 1
+                    continue
+                host["seconds"].append(source["seconds"])
+                if source["status"] in ("error", "empty"):
+                    host["errors"] += 1
+                elif source["status"] == "timeout":
+                    host["timeouts"] += 1
+            if progress:
+                progress(done, len(names), destination, status)
+    
+    per_source = {}
+    for host, data in latencies.items():
+        seconds = sorted(data["seconds"]) or [0.0]
+        per_source[host] = {
+            "requests": len(data["seconds"]),
+            "errors": data["errors"],
+            "timeouts": data["timeouts"],
+            "skipped": data["skipped"],
+            "mean_seconds": sum(seconds) / len(seconds),
+            "p50_seconds": seconds[len(seconds) // 2],
+            "p95_seconds": seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))],
+            "max_seconds": seconds[-1]
+        }
+    
+    status_values = list(statuses.values())
+    report = {
+        "total": len(names),
+        "hits": status_values.count("curated") + status_values.count("cached") + status_values.count("stale"),
+        "misses": status_values.count("scraped"),
+        # A fallback means every source failed and only template filler came back
+        "failed": status_values.count("failed") + status_values.count("fallback"),
+        "seconds": time.monotonic() - started,
+        "per_source": per_source,
+        "source_health": get_source_health(),
+        "statuses": statuses
+    }
+    return results, report
+
+def _reextract_page(task):
+    """Process-pool worker: run the current extraction over one archived page"""
+    path, codec, source = task
+    try:
+        return extract_guide_items(read_body(path, codec), source)
+    except Exception as e:
+        print(f"Error re-extracting {source['url']}: {e}")
+        return None
+
+def reextract_archive(workers=None, progress=None):
+    """
+    Rebuild cached destination data from the raw-page archive without touching the network
+    
+    Every archived page is run through the current extraction code in a process
+    pool, and each destination's cache entry is rebuilt from its pages plus the
+    POI database, exactly as a fresh scrape would. Destinations with a page cut
+    off at MAX_PAGE_BYTES are left alone, since sections the current extraction
+    reads may be missing from it; scrape those again instead.
+    
+    Parameters:
+    - workers: Number of worker processes (defaults to the CPU count)
+    - progress: Optional callback called as progress(done, total, destination)
+      after each destination is rebuilt
+    
+    Returns:
+    - Dictionary with the number of pages, destinations, skipped destinations
+      and failed pages, and the elapsed seconds
+    """
+    started = time.monotonic()
+    archive = get_page_archive()
+    pages = archive.pages()
+    truncated = {page["destination_id"] for page in pages if page["truncated"]}
+    pages = [page for page in pages if page["destination_id"] not in truncated]
+    
+    tasks = []
+    for page in pages:
+        # Read each page with the section settings its source uses today
+        sources = {source["url"]: source for source in _guide_sources(page["destination"])}
+        source = sources.get(page["url"], {"url": page["url"]})
+        tasks.append((archive.blob_path(page["digest"], page["codec"]), page["codec"], source))
+    
+    collected = {}
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for page, found in zip(pages, pool.map(_reextract_page, tasks, chunksize=8)):
+            names = collected.setdefault(page["destination_id"], {
+                "destination": page["destination"], "attractions": [], "restaurants": [], "activities": []
+            })
+            if found is None:
+                failed += 1
+                continue
+            for category in ("attractions", "restaurants", "activities"):
+                names[category].extend(found[category])
+    
+    cache = get_destination_cache()
+    for done, (destination_id, names) in enumerate(collected.items(), start=1):
+        local_pois = get_pois(destination_id)
+        result = _build_result(
+            names["destination"],
+            list(local_pois["attractions"]) + names["attractions"],
+            list(local_pois["restaurants"]) + names["restaurants"],
+            list(local_pois["activities"]) + names["activities"]
+        )
+        cache.set(destination_id, result)
+        if progress:
+            progress(done, len(collected), names["destination"])
+    
+    return {
+        "pages": len(pages),
+        "destinations": len(collected),
+        "skipped_destinations": len(truncated),
+        "failed_pages": failed,
+        "seconds": time.monotonic() - started
+    }
+
+def main():
+    """Warm the destination cache from a text file with one destination per line, or rebuild it from the page archive"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Pre-populate the destination cache")
+    parser.add_argument("destinations_file", nargs="?", help="Text file with one destination per line")
+    parser.add_argument("--concurrency", type=int, default=4, help="Destinations looked up in parallel")
+    parser.add_argument("--report", help="Write the summary report as JSON to this file")
+    parser.add_argument("--reextract", action="store_true",
+                        help="Rebuild every cached destination from archived pages instead of fetching")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for --reextract")
+    args = parser.parse_args()
+    
+    if args.reextract:
+        print(f"♻️ Re-extracting {get_page_archive().stats()['urls']} archived pages")
+        report = reextract_archive(workers=args.workers,
+                                   progress=lambda done, total, destination: print(f"[{done}/{total}] {destination}"))
+        print(f"\n✅ {report['destinations']} destinations rebuilt from {report['pages']} pages "
+              f"in {report['seconds']:.1f}s, {report['failed_pages']} pages failed")
+        if report["skipped_destinations"]:
+            print(f"   {report['skipped_destinations']} destinations skipped because their archived pages "
+                  f"are incomplete and need a fresh scrape")
+        if args.report:
+            with open(args.report, "w") as f:
+                json.dump(report, f, indent=2)
+        return 0 if report["failed_pages"] == 0 else 1
+    if not args.destinations_file:
+        parser.error("destinations_file is required unless --reextract is given")
+    
+    with open(args.destinations_file, encoding="utf-8") as f:
+        destinations = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    
+    def show_progress(done, total, destination, status):
+        print(f"[{done}/{total}] {destination}: {status}")
+    
+    print(f"🔥 Warming cache for {len(destinations)} destinations (concurrency {args.concurrency})")
+    _, report = get_destination_info_many(destinations, concurrency=args.concurrency, progress=show_progress)
+    # Let the archive get the rest of the pages that were streamed
+    finish_background_downloads()
+    
+    print(f"\n✅ {report['total']} destinations in {report['seconds']:.1f}s: "
+          f"{report['hits']} hits, {report['misses']} misses, {report['failed']} failed")
+    for host, source in report["per_source"].items():
+        print(f"   {host}: {source['requests']} requests, mean {source['mean_seconds']:.2f}s, "
+              f"p95 {source['p95_seconds']:.2f}s, {source['errors']} errors, {source['timeouts']} timeouts, "
+              f"{source['skipped']} skipped (circuit {report['source_health'].get(host, {}).get('state', 'closed')})")
+    
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0 if report["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
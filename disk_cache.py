@@ -0,0 +1,197 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Directory where persistent caches live (next to data/images, data/videos, ...)
+CACHE_DIR = os.path.join("data", "cache")
+
+
+class DiskCache:
+    """
+    Persistent key/value cache backed by a single SQLite file.
+
+    The file is shared by every process and session on the machine, so a
+    value stored by one Streamlit worker is visible to all the others and
+    survives restarts. Entries expire after `ttl` seconds and the table is
+    trimmed back to `max_entries` by evicting the least recently used rows.
+    Expired entries can still be read with get_entry until they are `max_stale`
+    seconds past their TTL, so callers can serve them while refreshing.
+
+    Parameters:
+    - path: Location of the SQLite file
+    - ttl: Time-to-live of an entry in seconds (None means never expire)
+    - max_entries: Maximum number of entries kept before LRU eviction
+    - max_stale: How long past the TTL an entry may still be served as stale
+    """
+
+    def __init__(self, path, ttl=None, max_entries=10000, max_stale=0):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_stale = max_stale
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL,
+                    refreshing_until REAL NOT NULL DEFAULT 0
+                )
+            """)
+            # Cache files written before refresh leases existed lack the column
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(entries)")]
+            if "refreshing_until" not in columns:
+                conn.execute("ALTER TABLE entries ADD COLUMN refreshing_until REAL NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+            conn.execute("INSERT OR IGNORE INTO counters VALUES ('hits', 0)")
+            conn.execute("INSERT OR IGNORE INTO counters VALUES ('misses', 0)")
+            conn.execute("INSERT OR IGNORE INTO counters VALUES ('stale_hits', 0)")
+
+    def _connect(self):
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            # WAL lets readers in other processes proceed while one process writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _is_expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key):
+        """
+        Look up a cached value
+
+        Returns:
+        - The stored value, or None if the key is missing or expired
+        """
+        value, _ = self.get_entry(key, allow_stale=False)
+        return value
+
+    def get_entry(self, key, allow_stale=True):
+        """
+        Look up a cached value, optionally accepting one past its TTL
+
+        Returns:
+        - Tuple of (value, is_stale); value is None if the key is missing, or
+          expired beyond what allow_stale and max_stale permit
+        """
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+        stale = row is not None and self._is_expired(row[1], now)
+        with conn:
+            if row is None or (stale and (not allow_stale or now - row[1] > self.ttl + self.max_stale)):
+                conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'misses'")
+                return None, False
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            counter = "stale_hits" if stale else "hits"
+            conn.execute("UPDATE counters SET value = value + 1 WHERE name = ?", (counter,))
+        return json.loads(row[0]), stale
+
+    def try_begin_refresh(self, key, lease=60):
+        """
+        Claim the right to refresh an entry
+
+        Only one caller across all processes wins until the lease runs out or
+        the entry is written again with set().
+
+        Returns:
+        - True if this caller should refresh the entry
+        """
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE entries SET refreshing_until = ? WHERE key = ? AND refreshing_until < ?",
+                (now + lease, key, now)
+            )
+        return cursor.rowcount == 1
+
+    def end_refresh(self, key):
+        """Release a refresh claim without writing a new value (e.g. after a failed refresh)"""
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE entries SET refreshing_until = 0 WHERE key = ?", (key,))
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a JSON-serializable value, evicting old entries if over the size cap
+
+        Parameters:
+        - key: Cache key
+        - value: Value to store
+        - ttl: Optional time-to-live shorter than the cache's own, e.g. for a
+          value that should be refreshed soon; the entry is recorded as older
+          so it turns stale after `ttl` seconds
+        """
+        conn = self._connect()
+        now = time.time()
+        created = now
+        if ttl is not None and self.ttl is not None and ttl < self.ttl:
+            created = now - (self.ttl - ttl)
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, created, accessed, refreshing_until) VALUES (?, ?, ?, ?, 0)",
+                (key, json.dumps(value), created, now)
+            )
+            count = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM entries WHERE key IN "
+                    "(SELECT key FROM entries ORDER BY accessed ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+
+    def delete(self, key):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        """Remove every entry and reset the counters"""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute("UPDATE counters SET value = 0")
+
+    def stats(self):
+        """
+        Report cache usage
+
+        Returns:
+        - Dictionary with hits, stale_hits, misses, hit_rate and the current number of entries
+        """
+        conn = self._connect()
+        counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        served = counters.get("hits", 0) + counters.get("stale_hits", 0)
+        lookups = served + counters.get("misses", 0)
+        return {
+            "hits": counters.get("hits", 0),
+            "stale_hits": counters.get("stale_hits", 0),
+            "misses": counters.get("misses", 0),
+            "hit_rate": served / lookups if lookups else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl
+        }
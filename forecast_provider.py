@@ -0,0 +1,317 @@
+"""
+Adapter for an external daily weather forecast API.
+
+The API is queried in the Open-Meteo format (GET with latitude, longitude,
+daily=temperature_2m_max,temperature_2m_min,precipitation_sum and
+forecast_days), and is off unless FORECAST_API_URL is set, e.g. to
+https://api.open-meteo.com/v1/forecast.
+
+Every request asks for the whole forecast horizon at a location, whatever
+trip dates the user picked, and the answer is cached for FORECAST_CACHE_TTL
+seconds. Concurrent requests for the same location share one in-flight call.
+So the upstream sees about one request per destination per TTL, however many
+sessions are planning a trip there.
+
+For tests and benchmarks, a local stand-in serves deterministic forecasts
+derived from the climate normals:
+
+    python forecast_provider.py serve --port 8765 --latency 0.2
+    FORECAST_API_URL=http://127.0.0.1:8765/v1/forecast streamlit run main.py
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import requests
+
+from circuit_breaker import CircuitBreaker
+from climatology import describe
+from gazetteer import locate
+from memory_cache import MemoryCache
+from single_flight import SingleFlight
+
+FORECAST_API_URL = os.environ.get("FORECAST_API_URL", "")
+FORECAST_TIMEOUT = float(os.environ.get("FORECAST_TIMEOUT", 5))
+FORECAST_CACHE_TTL = int(os.environ.get("FORECAST_CACHE_TTL", 10 * 60))
+# Days ahead the provider forecasts (Open-Meteo goes up to 16)
+FORECAST_DAYS = int(os.environ.get("FORECAST_DAYS", 16))
+
+_DAILY_FIELDS = "temperature_2m_max,temperature_2m_min,precipitation_sum"
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+class ForecastProvider:
+    """
+    Client for a daily forecast API with a short-TTL cache and request coalescing
+
+    Parameters:
+    - base_url: Forecast endpoint
+    - timeout: Seconds to wait for the API
+    - ttl: Seconds a fetched forecast is reused
+    - days: Forecast horizon requested for every location
+    """
+
+    def __init__(self, base_url, timeout=FORECAST_TIMEOUT, ttl=FORECAST_CACHE_TTL, days=FORECAST_DAYS):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.days = days
+        self.cache = MemoryCache(max_entries=5000, ttl=ttl)
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._upstream_calls = 0
+        self._errors = 0
+
+    def _key(self, latitude, longitude, today):
+        # Rounded to about 1 km so spellings of the same place share an entry
+        return f"{latitude:.2f},{longitude:.2f}|{today.isoformat()}"
+
+    def _fetch(self, key, latitude, longitude):
+        """Call the API for one location unless another caller stored it while we queued"""
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        if not self.breaker.allow_request():
+            raise RuntimeError("Forecast provider is failing; not calling it for now")
+
+        with self._lock:
+            self._upstream_calls += 1
+        params = {
+            "latitude": f"{latitude:.2f}",
+            "longitude": f"{longitude:.2f}",
+            "daily": _DAILY_FIELDS,
+            "forecast_days": self.days,
+            "timezone": "auto"
+        }
+        try:
+            response = requests.get(self.base_url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            daily = response.json()["daily"]
+            forecast = {
+                "time": list(daily["time"]),
+                "tmax": list(daily["temperature_2m_max"]),
+                "tmin": list(daily["temperature_2m_min"]),
+                "prcp": list(daily["precipitation_sum"])
+            }
+        except (requests.RequestException, ValueError, KeyError, TypeError):
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        self.cache.set(key, forecast)
+        return forecast
+
+    def get_forecast(self, latitude, longitude, today=None):
+        """
+        Daily forecast for the whole horizon at a location
+
+        Parameters:
+        - latitude, longitude: Location in degrees
+        - today: Day the horizon starts (defaults to today); part of the cache key
+
+        Returns:
+        - Dictionary with lists "time" (YYYY-MM-DD), "tmax", "tmin" (°C) and "prcp" (mm)
+
+        Raises:
+        - requests.RequestException, ValueError or RuntimeError if the forecast can't be fetched
+        """
+        with self._lock:
+            self._requests += 1
+        key = self._key(latitude, longitude, today or date.today())
+        forecast = self.cache.get(key)
+        if forecast is not None:
+            return forecast
+        try:
+            return self._flights.do(key, lambda: self._fetch(key, latitude, longitude))
+        except Exception:
+            with self._lock:
+                self._errors += 1
+            raise
+
+    def trip_forecast(self, latitude, longitude, dates):
+        """
+        Forecast values for each trip day, from one horizon-wide request
+
+        Returns:
+        - Tuple of (covered, tmax, tmin, prcp): a boolean array marking the days
+          the forecast covers and float arrays with NaN for the other days
+        """
+        forecast = self.get_forecast(latitude, longitude)
+        positions = {day: index for index, day in enumerate(forecast["time"])}
+        rows = np.array([positions.get(day.isoformat(), -1) for day in dates], dtype=np.int64)
+        values = {}
+        for field in ("tmax", "tmin", "prcp"):
+            # Missing values come back as null from the API
+            column = np.array([np.nan if value is None else value for value in forecast[field]] + [np.nan], dtype=np.float64)
+            values[field] = column[rows]
+        covered = (rows >= 0) & ~np.isnan(values["tmax"]) & ~np.isnan(values["tmin"])
+        return covered, values["tmax"], values["tmin"], np.nan_to_num(values["prcp"])
+
+    def stats(self):
+        """
+        Returns:
+        - Dictionary with requests received, upstream calls made, requests
+          that shared an in-flight call, errors, the cache stats and the circuit state
+        """
+        with self._lock:
+            stats = {"requests": self._requests, "upstream_calls": self._upstream_calls, "errors": self._errors}
+        stats["coalesced"] = self._flights.stats()["shared"]
+        stats["cache"] = self.cache.stats()
+        stats["circuit"] = self.breaker.state
+        return stats
+
+
+def get_forecast_provider():
+    """Return the shared forecast provider, or None if FORECAST_API_URL isn't set"""
+    global _provider
+    if not FORECAST_API_URL:
+        return None
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = ForecastProvider(FORECAST_API_URL)
+    return _provider
+
+
+def forecast_weather(destination, dates):
+    """
+    Weather from the forecast provider for the trip days within its horizon
+
+    Parameters:
+    - destination: Destination as typed by the user
+    - dates: Trip dates
+
+    Returns:
+    - Tuple of (covered, descriptions, temperatures, icons) where covered marks
+      the days the forecast answered for; None if there is no provider, the
+      destination can't be located or the forecast can't be fetched
+    """
+    provider = get_forecast_provider()
+    if provider is None or not len(dates):
+        return None
+    location = locate(destination)
+    if location is None:
+        return None
+    try:
+        covered, highs, lows, rain = provider.trip_forecast(location[0], location[1], dates)
+    except Exception as e:
+        print(f"Error getting forecast for {destination}: {e}")
+        return None
+    if not covered.any():
+        return None
+    return (covered,) + describe(highs[covered], lows[covered], rain[covered])
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class StandInForecastServer:
+    """
+    Local stand-in for the forecast API, answering from the climate normals
+
+    Parameters:
+    - port: Port to listen on (0 picks a free one)
+    - latency: Seconds each response is delayed, to make coalescing visible
+    """
+
+    def __init__(self, port=0, latency=0.0):
+        from climatology import get_normals
+
+        normals = get_normals()
+        counter = {"requests": 0}
+        counter_lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                try:
+                    latitude = float(query["latitude"][0])
+                    longitude = float(query["longitude"][0])
+                    days = int(query.get("forecast_days", ["7"])[0])
+                except (KeyError, ValueError):
+                    self.send_error(400, "latitude and longitude are required")
+                    return
+                with counter_lock:
+                    counter["requests"] += 1
+                if latency:
+                    time.sleep(latency)
+
+                dates = [date.today() + timedelta(days=offset) for offset in range(days)]
+                row, _ = normals.nearest(latitude, longitude)
+                if row is None:
+                    highs = lows = rain = np.zeros(days)
+                else:
+                    highs, lows, rain = normals.daily(row, dates)
+                body = {
+                    "latitude": latitude,
+                    "longitude": longitude,
+                    "daily": {
+                        "time": [day.isoformat() for day in dates],
+                        "temperature_2m_max": np.round(highs, 1).tolist(),
+                        "temperature_2m_min": np.round(lows, 1).tolist(),
+                        "precipitation_sum": np.round(rain, 1).tolist()
+                    }
+                }
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._counter = counter
+        self._server = _QuietHTTPServer(("127.0.0.1", port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1/forecast"
+
+    @property
+    def requests(self):
+        """Number of forecast requests answered so far"""
+        return self._counter["requests"]
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    """Run the local stand-in forecast server"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local stand-in for the weather forecast API")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="Serve forecasts derived from the climate normals")
+    serve.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    serve.add_argument("--latency", type=float, default=0.0, help="Seconds to delay each response")
+    args = parser.parse_args()
+
+    server = StandInForecastServer(args.port, args.latency)
+    print(f"🌦️ Serving stand-in forecasts at {server.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"{server.requests} requests answered")
+    except KeyboardInterrupt:
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
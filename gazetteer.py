@@ -0,0 +1,199 @@
+"""
+Coordinates for destinations and a nearest-point index over climate stations.
+
+places/gazetteer.csv lists cities and countries with their latitude and
+longitude. A destination is located by its canonical ID, or by its trailing
+country ("Somewhere, Norway") if the city itself isn't listed. Coordinates give
+the hemisphere, and so the season for a date, and let climatology.py use the
+nearest station for cities that have no normals of their own.
+
+The nearest-point search uses scipy's cKDTree when scipy is installed and a
+vectorized NumPy scan otherwise; both answer in microseconds for a few
+thousand stations.
+"""
+
+import csv
+import os
+import threading
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+from destination_names import canonical_destination
+
+GAZETTEER_FILE = os.environ.get(
+    "GAZETTEER_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "places", "gazetteer.csv")
+)
+
+EARTH_RADIUS_KM = 6371.0
+
+# Season of each month (January first) north of the equator; the south is six months apart
+_NORTHERN_SEASONS = ["Winter", "Winter", "Spring", "Spring", "Spring", "Summer",
+                     "Summer", "Summer", "Fall", "Fall", "Fall", "Winter"]
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def _unit_vectors(latitudes, longitudes):
+    """Points on the unit sphere, so straight-line distance orders places like great-circle distance"""
+    latitudes = np.radians(np.asarray(latitudes, dtype=np.float64))
+    longitudes = np.radians(np.asarray(longitudes, dtype=np.float64))
+    return np.stack([
+        np.cos(latitudes) * np.cos(longitudes),
+        np.cos(latitudes) * np.sin(longitudes),
+        np.sin(latitudes)
+    ], axis=-1)
+
+
+def hemisphere(latitude):
+    return "south" if latitude < 0 else "north"
+
+
+def season_for(month, latitude=None):
+    """
+    Season of a month at a latitude
+
+    Parameters:
+    - month: Month number (1-12)
+    - latitude: Latitude in degrees; None is treated as the northern hemisphere
+
+    Returns:
+    - "Spring", "Summer", "Fall" or "Winter"
+    """
+    if latitude is not None and latitude < 0:
+        month = (month + 5) % 12 + 1
+    return _NORTHERN_SEASONS[month - 1]
+
+
+class NearestIndex:
+    """
+    Find the closest of a fixed set of points on the globe
+
+    Parameters:
+    - latitudes, longitudes: Coordinates of the points in degrees
+    """
+
+    def __init__(self, latitudes, longitudes):
+        self.points = _unit_vectors(latitudes, longitudes).reshape(-1, 3)
+        self._tree = cKDTree(self.points) if cKDTree is not None and len(self.points) else None
+
+    def __len__(self):
+        return len(self.points)
+
+    def nearest(self, latitude, longitude):
+        """
+        Returns:
+        - Tuple of (index of the closest point, great-circle distance in km),
+          or (None, inf) if the index is empty
+        """
+        if not len(self.points):
+            return None, float("inf")
+        point = _unit_vectors(latitude, longitude)
+        if self._tree is not None:
+            chord, index = self._tree.query(point)
+        else:
+            dots = self.points @ point
+            index = int(dots.argmax())
+            chord = np.sqrt(max(0.0, 2.0 - 2.0 * dots[index]))
+        return int(index), float(2 * EARTH_RADIUS_KM * np.arcsin(min(1.0, chord / 2)))
+
+
+class Gazetteer:
+    """
+    Coordinates of known cities and countries
+
+    Parameters:
+    - names: Place names
+    - countries: Country of each place (the name itself for a country)
+    - latitudes, longitudes: Coordinates in degrees
+    """
+
+    def __init__(self, names, countries, latitudes, longitudes):
+        self.names = list(names)
+        self.countries = list(countries)
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self._rows = {}
+        for row, name in enumerate(self.names):
+            # The first entry wins, so a city listed before an alias of it keeps its own coordinates
+            self._rows.setdefault(canonical_destination(name), row)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def load(cls, path=GAZETTEER_FILE):
+        """Read a gazetteer CSV with name, country, latitude and longitude columns"""
+        names, countries, latitudes, longitudes = [], [], [], []
+        with open(path, newline="", encoding="utf-8") as f:
+            for record in csv.DictReader(f):
+                try:
+                    latitude = float(record["latitude"])
+                    longitude = float(record["longitude"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                names.append(record["name"])
+                countries.append(record.get("country") or "")
+                latitudes.append(latitude)
+                longitudes.append(longitude)
+        return cls(names, countries, latitudes, longitudes)
+
+    def locate(self, destination):
+        """
+        Coordinates of a destination, from the whole name, then the part before
+        the first comma ("Austin" in "Austin, Texas"), then its trailing country
+
+        Returns:
+        - Tuple of (latitude, longitude) in degrees, or None if the place is unknown
+        """
+        row = self._rows.get(canonical_destination(destination))
+        if row is None:
+            parts = [part for part in destination.split(",") if part.strip()]
+            if len(parts) > 1:
+                row = self._rows.get(canonical_destination(parts[0]))
+            if row is None and len(parts) > 1:
+                row = self._rows.get(canonical_destination(parts[-1]))
+        if row is None:
+            return None
+        return float(self.latitudes[row]), float(self.longitudes[row])
+
+
+def get_gazetteer():
+    """Return the bundled gazetteer, loading it on first use (empty if the file can't be read)"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                try:
+                    _gazetteer = Gazetteer.load(GAZETTEER_FILE)
+                except OSError as e:
+                    print(f"Error loading gazetteer from {GAZETTEER_FILE}: {e}")
+                    _gazetteer = Gazetteer([], [], [], [])
+    return _gazetteer
+
+
+def locate(destination):
+    """Coordinates (latitude, longitude) of a destination, or None if it isn't in the gazetteer"""
+    return get_gazetteer().locate(destination)
+
+
+def destination_season(destination, date):
+    """
+    Season at a destination on a date, taking its hemisphere into account
+
+    Destinations missing from the gazetteer are treated as northern.
+
+    Parameters:
+    - destination: Destination as typed by the user
+    - date: Date (or datetime) to get the season for
+
+    Returns:
+    - "Spring", "Summer", "Fall" or "Winter"
+    """
+    location = locate(destination) if destination else None
+    return season_for(date.month, location[0] if location else None)
@@ -0,0 +1,101 @@
+import re
+from bisect import bisect_right
+
+# Suffix keywords that end a place name in each guide section
+ATTRACTION_KEYWORDS = ["Museum", "Palace", "Castle", "Cathedral", "Temple", "Church", "Square", "Park", "Garden",
+                       "Bridge", "Tower", "Monument", "Gallery", "Arena", "Center", "Theatre", "Library", "Zoo", "Aquarium"]
+RESTAURANT_KEYWORDS = ["Restaurant", "Café", "Bistro", "Trattoria", "Pizzeria", "Brasserie", "Steakhouse", "Grill",
+                       "Diner", "Eatery"]
+ACTIVITY_NAME_KEYWORDS = ["Tour", "Class", "Experience", "Festival", "Show", "Event"]
+# Verbs that start an activity description ("Visit the markets on a Saturday.")
+ACTIVITY_PHRASE_KEYWORDS = ["Tour", "Visit", "Explore", "Experience", "Class", "Workshop", "Cruise", "Trip", "Hike", "Walk"]
+
+# Characters allowed inside a name, same as [a-zA-Z\s'\-] in the original patterns
+_NAME_RUN = re.compile(r"[a-zA-Z\s'\-]*")
+_UPPERCASE = re.compile(r"[A-Z]")
+
+
+def _keyword_scanner(keywords):
+    # The lookahead reports every occurrence, including overlapping ones, in one left-to-right pass
+    return re.compile("(?=(" + "|".join(re.escape(keyword) for keyword in keywords) + "))")
+
+
+class SuffixNameExtractor:
+    """
+    Find capitalized names that end in one of a set of keywords
+
+    Produces the same results as
+    re.findall(r'(?:^|\\n)[^\\n]*?([A-Z][a-zA-Z\\s\\'\\-]{N,}(?:kw1|kw2|...))[^\\n]*', text)
+    without the backtracking: keyword hits are located in one linear scan, and
+    each line only checks the first capital of each name-character run against
+    the last keyword hit inside that run.
+
+    Parameters:
+    - keywords: Suffixes that end a name, e.g. ["Museum", "Palace"]
+    - min_body: Minimum number of characters between the capital letter and the keyword
+    """
+
+    def __init__(self, keywords, min_body=3):
+        self.keywords = list(keywords)
+        self.min_body = min_body
+        self._scanner = _keyword_scanner(self.keywords)
+
+    def findall(self, text):
+        hits = []
+        hit_ends = []
+        for match in self._scanner.finditer(text):
+            hits.append(match.start())
+            hit_ends.append(match.start() + len(match.group(1)))
+        if not hits:
+            return []
+
+        names = []
+        line_start = 0
+        while line_start <= len(text):
+            # No keyword left that could close a name starting on this line
+            if hits[-1] < line_start + 1 + self.min_body:
+                break
+            line_end = text.find("\n", line_start)
+            if line_end == -1:
+                line_end = len(text)
+
+            match_end = None
+            # The leftmost capital of each name-character run is the only candidate in that run
+            position = line_start
+            while position < line_end:
+                capital = _UPPERCASE.search(text, position, line_end)
+                if capital is None:
+                    break
+                start = capital.start()
+                run_end = _NAME_RUN.match(text, start).end()
+
+                # The name extends to the last keyword that still starts inside the run
+                hit_index = bisect_right(hits, run_end) - 1
+                if hit_index >= 0 and hits[hit_index] >= start + 1 + self.min_body:
+                    names.append(text[start:hit_ends[hit_index]])
+                    match_end = hit_ends[hit_index]
+                    break
+                position = run_end
+
+            if match_end is None:
+                if line_end == len(text):
+                    break
+                line_start = line_end + 1
+            else:
+                # The rest of the line is consumed by the match
+                next_newline = text.find("\n", match_end)
+                if next_newline == -1:
+                    break
+                line_start = next_newline + 1
+        return names
+
+
+# Extractors are compiled once and shared by every scrape
+attraction_names = SuffixNameExtractor(ATTRACTION_KEYWORDS, min_body=3)
+restaurant_names = SuffixNameExtractor(RESTAURANT_KEYWORDS, min_body=2)
+activity_names = SuffixNameExtractor(ACTIVITY_NAME_KEYWORDS, min_body=5)
+# Activity sentences start at the keyword and stop at the first period, so the
+# regex engine already matches them in one forward scan without backtracking
+activity_phrases = re.compile(
+    r'(?:^|\n)[^\n]*?((?:' + "|".join(ACTIVITY_PHRASE_KEYWORDS) + r')[^\.]{10,}\.)'
+)
@@ -0,0 +1,203 @@
+import html
+import re
+import xml.etree.ElementTree as ET
+
+# Known travel-guide headings mapped to the section they belong to.
+# Synonyms used by WikiVoyage, Wikitravel and similar guides share a section.
+SECTION_HEADINGS = {
+    "see": "see", "sights": "see", "attractions": "see", "landmarks": "see",
+    "do": "do", "activities": "do", "things to do": "do",
+    "buy": "buy", "shopping": "buy",
+    "eat": "eat", "food": "eat", "restaurants": "eat", "dining": "eat",
+    "drink": "drink", "nightlife": "drink", "bars": "drink", "cafes": "drink",
+    "sleep": "sleep", "lodging": "sleep", "accommodation": "sleep", "accommodations": "sleep", "hotels": "sleep",
+    # Other top-level guide sections; they only mark where the sections above end
+    "understand": None, "get in": None, "get around": None, "talk": None, "learn": None,
+    "work": None, "connect": None, "stay safe": None, "stay healthy": None, "respect": None,
+    "cope": None, "go next": None, "districts": None, "regions": None, "cities": None
+}
+
+# Block-level elements of trafilatura's XML output that carry text
+_XML_BLOCK_TAGS = {"head", "p", "item", "cell", "quote", "code"}
+
+_EDIT_SUFFIX = re.compile(r'\s*\[\s*edit\s*\]\s*$', re.IGNORECASE)
+
+# Complete <h1>..<h6> elements in raw HTML, and any tag inside them
+_HTML_HEADING = re.compile(rb'<h([1-6])\b[^>]*>(.*?)</h\1\s*>', re.IGNORECASE | re.DOTALL)
+_HTML_TAG = re.compile(r'<[^>]*>')
+# A heading element longer than this is not a heading we care about
+_MAX_HEADING_BYTES = 4096
+
+
+def _heading_section(line):
+    """
+    Map a heading line to its section
+
+    Returns:
+    - Tuple of (is_known_heading, section) where section is None for headings
+      that only terminate the previous section
+    """
+    name = _EDIT_SUFFIX.sub("", line.strip().lstrip("#").strip()).lower()
+    if name in SECTION_HEADINGS:
+        return True, SECTION_HEADINGS[name]
+    return False, None
+
+
+def index_sections(text):
+    """
+    Build a section offset table for plain extracted text in a single pass
+
+    A line is treated as a heading when it matches one of SECTION_HEADINGS
+    (optionally followed by "[edit]"). Each section runs from the end of its
+    heading line to the start of the next known heading.
+
+    Parameters:
+    - text: Plain text as returned by trafilatura.extract
+
+    Returns:
+    - Dictionary mapping section name to a list of (start, end) offsets into text
+    """
+    sections = {}
+    current = None
+    offset = 0
+
+    for line in text.splitlines(keepends=True):
+        # Headings are short, so skip the lookup for ordinary paragraphs
+        is_heading, section = _heading_section(line) if len(line) < 40 else (False, None)
+        if is_heading:
+            if current is not None:
+                sections[current[0]].append((current[1], offset))
+            current = (section, offset + len(line)) if section else None
+            if section:
+                sections.setdefault(section, [])
+        offset += len(line)
+
+    if current is not None:
+        sections[current[0]].append((current[1], offset))
+    return sections
+
+
+def index_xml_sections(xml):
+    """
+    Build a section offset table from trafilatura's XML output
+
+    Headings come from <head> elements, so a section ends at the next heading
+    of the same or a higher level even when that heading isn't a known name.
+
+    Parameters:
+    - xml: XML document as returned by trafilatura.extract(..., output_format="xml")
+
+    Returns:
+    - Tuple of (text, sections) where text is the document flattened to one
+      block per line and sections maps section names to (start, end) offsets
+    """
+    root = ET.fromstring(xml)
+    parts = []
+    sections = {}
+    # Stack of open sections as (section, level, start offset)
+    open_sections = []
+    offset = 0
+
+    def close_sections(level, at):
+        while open_sections and open_sections[-1][1] >= level:
+            section, _, start = open_sections.pop()
+            if section:
+                sections.setdefault(section, []).append((start, at))
+
+    def walk(element):
+        nonlocal offset
+        if element.tag not in _XML_BLOCK_TAGS:
+            for child in element:
+                walk(child)
+            return
+
+        block = " ".join("".join(element.itertext()).split())
+        if element.tag == "head":
+            rend = element.get("rend", "h2")
+            level = int(rend[1:]) if rend[1:].isdigit() else 2
+            close_sections(level, offset)
+            _, section = _heading_section(block)
+            open_sections.append((section, level, offset + len(block) + 1))
+        parts.append(block + "\n")
+        offset += len(block) + 1
+
+    walk(root)
+    close_sections(0, offset)
+    return "".join(parts), sections
+
+
+def section_text(text, sections, names):
+    """
+    Slice the text of one or more sections out of an indexed document
+
+    Parameters:
+    - text: The indexed text
+    - sections: Offset table from index_sections or index_xml_sections
+    - names: Section names to collect, e.g. ["see"]
+
+    Returns:
+    - The section contents joined by newlines (empty string if none were found)
+    """
+    spans = sorted(span for name in names for span in sections.get(name, []))
+
+    # Nested headings (e.g. "Landmarks" under "See") produce overlapping spans
+    merged = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return "\n".join(text[start:end] for start, end in merged)
+
+
+class SectionStreamDetector:
+    """
+    Watch raw HTML as it downloads and tell when the wanted guide sections are complete
+
+    A section is complete once the next heading of the same or a higher level
+    starts. When every wanted section is complete the rest of the page isn't
+    needed, so the caller can stop reading and keep page[:end].
+
+    Parameters:
+    - sections: Section names to wait for, e.g. ["see", "eat", "do"]
+    """
+
+    def __init__(self, sections):
+        self.wanted = set(sections)
+        self.end = None
+        self._scan_from = 0
+        self._open = {}
+        self._complete = set()
+
+    def scan(self, page):
+        """
+        Look at the part of the page that arrived since the last call
+
+        Parameters:
+        - page: Everything downloaded so far (bytes or bytearray that only grows)
+
+        Returns:
+        - True once every wanted section is complete
+        """
+        if self.end is not None:
+            return True
+
+        for match in _HTML_HEADING.finditer(page, self._scan_from):
+            self._scan_from = match.end()
+            level = int(match.group(1))
+            text = html.unescape(_HTML_TAG.sub("", match.group(2).decode("utf-8", "replace")))
+            _, section = _heading_section(" ".join(text.split()))
+
+            for name, open_level in list(self._open.items()):
+                if level <= open_level:
+                    del self._open[name]
+                    self._complete.add(name)
+            if self._complete >= self.wanted:
+                self.end = match.start()
+                return True
+            if section in self.wanted and section not in self._complete:
+                self._open.setdefault(section, level)
+
+        # Only the unfinished tail can still hold the start of a heading
+        self._scan_from = max(self._scan_from, len(page) - _MAX_HEADING_BYTES)
+        return False
@@ -0,0 +1,837 @@
+"""
+Local inference worker shared by every session of the app.
+
+Text generation (itinerary text, weather JSON, image captions) runs in a
+separate worker process instead of inside Streamlit's script threads. Sessions
+submit prompts over a local socket. The worker collects the requests of all
+sessions into batches of up to INFERENCE_MAX_BATCH prompts, waiting at most
+INFERENCE_MAX_WAIT_MS for a batch to fill, runs one generate call per batch
+(one per token budget if the requests in it ask for different ones) and
+sends each result back to the session that asked for it. Sessions that
+stream a prompt get its text piece by piece while the batch is generating.
+
+Start the worker, then point the app at it:
+
+    python inference_worker.py serve --port 8766
+    INFERENCE_WORKER_ADDRESS=127.0.0.1:8766 streamlit run main.py
+
+The worker loads the model named by LLM_MODEL_NAME (see model_registry). For
+CPU-only tests, `--model stub` answers every task with deterministic text in
+the expected format instead:
+
+    python inference_worker.py serve --port 8766 --model stub
+
+Without INFERENCE_WORKER_ADDRESS, generation runs in the app process on the
+model loaded there, as before. Either way, completions already in the prompt
+cache (see prompt_cache) are returned without running the model.
+
+Messages on the socket are pickled, so only clients that know the worker's
+key may connect. The key is INFERENCE_WORKER_AUTHKEY if set; otherwise the
+worker generates a random one into INFERENCE_WORKER_AUTHKEY_FILE (readable by
+its owner only), where app processes on the same machine pick it up. A worker
+listening on anything but a loopback address needs INFERENCE_WORKER_AUTHKEY.
+"""
+
+import ipaddress
+import itertools
+import os
+import queue
+import re
+import secrets
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from circuit_breaker import OPEN, CircuitBreaker
+from disk_cache import CACHE_DIR
+from prompt_cache import get_prompt_cache, prompt_cache_key
+
+INFERENCE_WORKER_ADDRESS = os.environ.get("INFERENCE_WORKER_ADDRESS", "")
+INFERENCE_WORKER_AUTHKEY = os.environ.get("INFERENCE_WORKER_AUTHKEY", "").encode("utf-8")
+INFERENCE_WORKER_AUTHKEY_FILE = os.environ.get("INFERENCE_WORKER_AUTHKEY_FILE", os.path.join(CACHE_DIR, "inference_worker.key"))
+INFERENCE_MAX_BATCH = int(os.environ.get("INFERENCE_MAX_BATCH", 8))
+INFERENCE_MAX_WAIT_MS = float(os.environ.get("INFERENCE_MAX_WAIT_MS", 25))
+# Seconds a session waits for its result before falling back
+INFERENCE_TIMEOUT = float(os.environ.get("INFERENCE_TIMEOUT", 60))
+
+# Tasks the app submits; the stub model answers each in its expected format
+WEATHER = "weather"
+ITINERARY = "itinerary"
+CAPTION = "caption"
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def parse_address(address):
+    """Turn "host:port" (or just a port) into a (host, port) tuple"""
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def is_loopback(host):
+    """True if a host name or address only accepts connections from this machine"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def get_authkey(create=False):
+    """
+    Shared secret between the worker and its clients
+
+    Parameters:
+    - create: Generate a random key into INFERENCE_WORKER_AUTHKEY_FILE if there
+      is none yet, or the file is empty (the worker does this when it starts)
+
+    Returns:
+    - INFERENCE_WORKER_AUTHKEY if set, else the key in INFERENCE_WORKER_AUTHKEY_FILE,
+      or None if there is no key
+    """
+    if INFERENCE_WORKER_AUTHKEY:
+        return INFERENCE_WORKER_AUTHKEY
+    key = _read_authkey_file()
+    if key is None and create:
+        directory = os.path.dirname(INFERENCE_WORKER_AUTHKEY_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # The key is written in full under a temporary name and then moved into
+        # place, so nobody ever reads an empty or half-written key file
+        temporary = f"{INFERENCE_WORKER_AUTHKEY_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+        fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+            try:
+                os.link(temporary, INFERENCE_WORKER_AUTHKEY_FILE)
+            except FileExistsError:
+                # Another worker got there first; use its key unless the file is empty
+                if _read_authkey_file() is None:
+                    os.replace(temporary, INFERENCE_WORKER_AUTHKEY_FILE)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        key = _read_authkey_file()
+    return key
+
+
+def _read_authkey_file():
+    """The key stored in INFERENCE_WORKER_AUTHKEY_FILE, or None if the file is missing or empty"""
+    try:
+        with open(INFERENCE_WORKER_AUTHKEY_FILE, encoding="utf-8") as f:
+            key = f.read().strip()
+    except OSError:
+        return None
+    return key.encode("utf-8") or None
+
+
+def model_id(model):
+    """Name of a Hugging Face model as it was loaded, e.g. gpt2"""
+    return getattr(getattr(model, "config", None), "_name_or_path", None) or type(model).__name__
+
+
+def sampling_parameters(model):
+    """Sampling settings a model generates with by default, part of the prompt cache key"""
+    config = getattr(model, "generation_config", None)
+    return {name: getattr(config, name, None) for name in ("do_sample", "temperature", "top_p", "top_k", "num_beams")}
+
+
+class StubModel:
+    """
+    Deterministic stand-in for the language model, for CPU-only tests
+
+    Answers weather prompts with a JSON array of the requested length, itinerary
+    prompts with a day-by-day plan and caption prompts with one sentence, all
+    derived from a checksum of the prompt so the same prompt always gets the
+    same text.
+
+    Parameters:
+    - latency: Seconds each generate call takes, whatever the batch size,
+      to make the effect of batching visible; when streaming, the lines of the
+      answers come out evenly over that time
+    """
+
+    name = "stub"
+    parameters = {}
+
+    _WEATHER = [
+        ("Sunny and clear", "18-25°C (64-77°F)", "☀️"),
+        ("Partly cloudy", "15-21°C (59-70°F)", "⛅"),
+        ("Light rain", "12-17°C (54-63°F)", "🌧️"),
+        ("Overcast", "10-15°C (50-59°F)", "☁️")
+    ]
+    _THEMES = ["Arrival & Welcome", "Cultural Immersion", "Local Experience", "Discovery Day", "Relaxation Day"]
+    _MORNINGS = ["Old Town Walking Tour", "Local Market Breakfast", "Museum Visit", "Sunrise Viewpoint"]
+    _AFTERNOONS = ["Historic Quarter Exploration", "Food Tasting Tour", "Park and Gardens Stroll", "Shopping for Local Crafts"]
+    _EVENINGS = ["Dinner at a Local Restaurant", "Sunset Cruise", "Live Music Night", "Night Market Visit"]
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def generate(self, tasks, prompts, max_new_tokens, on_text=None):
+        answers = [self._answer(task, prompt) for task, prompt in zip(tasks, prompts)]
+        if on_text is None:
+            if self.latency:
+                time.sleep(self.latency)
+            return answers
+        lines = [answer.splitlines(keepends=True) for answer in answers]
+        steps = max(len(answer_lines) for answer_lines in lines)
+        for step in range(steps):
+            if self.latency:
+                time.sleep(self.latency / steps)
+            for index, answer_lines in enumerate(lines):
+                if step < len(answer_lines):
+                    on_text(index, answer_lines[step])
+        return answers
+
+    def _answer(self, task, prompt):
+        seed = zlib.crc32(prompt.encode("utf-8"))
+        if task == WEATHER:
+            match = re.search(r"exactly (\d+) objects", prompt)
+            count = int(match.group(1)) if match else 1
+            days = [self._WEATHER[(seed + index) % len(self._WEATHER)] for index in range(count)]
+            return "[" + ", ".join(
+                f'{{"weather_description": "{description}", "temperature_range": "{temperature}", "weather_icon": "{icon}"}}'
+                for description, temperature, icon in days
+            ) + "]"
+        if task == ITINERARY:
+            match = re.search(r"(\d+)-day", prompt)
+            count = int(match.group(1)) if match else 1
+            lines = []
+            for day in range(count):
+                pick = seed + day
+                lines.append(f"Day {day + 1}: {self._THEMES[pick % len(self._THEMES)]}")
+                lines.append(f"Morning: {self._MORNINGS[pick % len(self._MORNINGS)]} - Start the day exploring on foot.")
+                lines.append(f"Afternoon: {self._AFTERNOONS[pick % len(self._AFTERNOONS)]} - Take in the local character.")
+                lines.append(f"Evening: {self._EVENINGS[pick % len(self._EVENINGS)]} - End the day with local flavours.")
+            return "\n".join(lines)
+        match = re.search(r"image of '(.+?)' in '(.+?)'", prompt)
+        subject = f"{match.group(1)} in {match.group(2)}" if match else "the destination"
+        return f"Scenic view of {subject}, with warm light, local architecture and lively streets."
+
+
+class _TextStreamer:
+    """
+    Streamer for model.generate that reports new text for every row of a batch
+
+    generate() hands the streamer the prompts first, then the next token of
+    every row at each step. The tokens of each row are decoded as they come
+    and on_text(row, text) is called with whatever text they added.
+    """
+
+    def __init__(self, tokenizer, on_text):
+        self.tokenizer = tokenizer
+        self.on_text = on_text
+        self.tokens = None
+        self.sent = None
+
+    def put(self, value):
+        if self.tokens is None:
+            # The first call carries the prompts, which aren't part of the answer
+            self.tokens = [[] for _ in range(value.shape[0])]
+            self.sent = [""] * value.shape[0]
+            return
+        for row, tokens in enumerate(value.reshape(len(self.tokens), -1).tolist()):
+            self.tokens[row].extend(tokens)
+            text = self.tokenizer.decode(self.tokens[row], skip_special_tokens=True)
+            # Wait for the rest of a character split across tokens
+            if text.endswith("\ufffd") or len(text) <= len(self.sent[row]) or not text.startswith(self.sent[row]):
+                continue
+            self.on_text(row, text[len(self.sent[row]):])
+            self.sent[row] = text
+
+    def end(self):
+        pass
+
+
+class LanguageModel:
+    """
+    Batched generation with a Hugging Face causal language model
+
+    The model and tokenizer may be shared through the model registry, so
+    neither is changed; prompts are padded here rather than by the tokenizer.
+
+    Parameters:
+    - model, tokenizer: Loaded model and its tokenizer
+    """
+
+    def __init__(self, model, tokenizer):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.name = model_id(model)
+        self.parameters = sampling_parameters(model)
+        self.pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+
+    def _encode(self, prompts):
+        """Token IDs and attention mask of the prompts, padded on the left so generation continues right after each"""
+        import torch
+
+        rows = [self.tokenizer(prompt)["input_ids"] for prompt in prompts]
+        width = max(len(row) for row in rows)
+        input_ids = torch.full((len(rows), width), self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(rows), width), dtype=torch.long)
+        for index, row in enumerate(rows):
+            if row:
+                input_ids[index, width - len(row):] = torch.tensor(row, dtype=torch.long)
+                attention_mask[index, width - len(row):] = 1
+        return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+    def generate(self, tasks, prompts, max_new_tokens, on_text=None):
+        inputs = self._encode(prompts)
+        streamer = _TextStreamer(self.tokenizer, on_text) if on_text is not None else None
+        output = self.model.generate(**inputs, max_new_tokens=max_new_tokens,
+                                     pad_token_id=self.pad_token_id, streamer=streamer)
+        prompt_length = inputs["input_ids"].shape[1]
+        return [self.tokenizer.decode(row[prompt_length:], skip_special_tokens=True) for row in output]
+
+
+def load_backend(name, stub_latency=0.0):
+    """
+    Model the worker generates with
+
+    Parameters:
+    - name: "stub" for the deterministic stub, or a name registered in the model registry
+    - stub_latency: Seconds per generate call of the stub
+
+    Returns:
+    - Object with generate(tasks, prompts, max_new_tokens, on_text=None) returning
+      one text per prompt, and calling on_text(index, text) with each piece of
+      text as it is produced if given
+    """
+    if name == "stub":
+        return StubModel(stub_latency)
+    from model_registry import get_model
+
+    model, tokenizer = get_model(name)
+    if model is None or tokenizer is None:
+        raise RuntimeError(f"Model {name!r} isn't available; set LLM_MODEL_NAME or use --model stub")
+    return LanguageModel(model, tokenizer)
+
+
+class _Connection:
+    """A session process connected to the worker; sends from the batch thread are serialized"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    def send(self, message):
+        with self.lock:
+            try:
+                self.conn.send(message)
+            except (OSError, EOFError):
+                # The session process went away; its results have nowhere to go
+                pass
+
+
+class InferenceWorker:
+    """
+    Serve generation requests from any number of clients in dynamic batches
+
+    Parameters:
+    - backend: Model with generate(tasks, prompts, max_new_tokens, on_text) (see load_backend)
+    - address: (host, port) to listen on; port 0 picks a free one
+    - max_batch: Most prompts run in one generate call
+    - max_wait_ms: Longest a request waits for others to join its batch
+    - authkey: Shared secret clients must present (defaults to get_authkey(create=True));
+      the worker refuses to start without one
+    - cache: Prompt cache (see prompt_cache) answering repeated prompts without
+      running the model; None to always generate
+    """
+
+    def __init__(self, backend, address=("127.0.0.1", 0), max_batch=INFERENCE_MAX_BATCH,
+                 max_wait_ms=INFERENCE_MAX_WAIT_MS, authkey=None, cache=None):
+        self.backend = backend
+        self.cache = cache
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        authkey = authkey or get_authkey(create=True)
+        if not authkey:
+            # Without a key anyone could connect and have the worker unpickle what they send
+            raise RuntimeError("No inference worker key; set INFERENCE_WORKER_AUTHKEY or INFERENCE_WORKER_AUTHKEY_FILE")
+        self._listener = Listener(address, authkey=authkey)
+        self._queue = queue.Queue()
+        self._closed = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._errors = 0
+        self._cache_hits = 0
+        self._batch_sizes = {}
+        self._generate_seconds = 0.0
+        self._threads = []
+
+    @property
+    def address(self):
+        return self._listener.address
+
+    def start(self):
+        """Accept connections and run batches in background threads"""
+        for target in (self._accept_loop, self._batch_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def _accept_loop(self):
+        while not self._closed.is_set():
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                if self._closed.is_set():
+                    return
+                # A client that failed authentication; keep serving the others
+                continue
+            threading.Thread(target=self._receive_loop, args=(_Connection(conn),), daemon=True).start()
+
+    def _receive_loop(self, connection):
+        """Queue the requests arriving on one connection"""
+        while not self._closed.is_set():
+            try:
+                message = connection.conn.recv()
+            except (OSError, EOFError):
+                connection.conn.close()
+                return
+            if message.get("op") == "stats":
+                connection.send({"id": message["id"], "result": self.stats()})
+                continue
+            with self._stats_lock:
+                self._requests += 1
+            if self.cache is not None:
+                text = self.cache.get(self._cache_key(message["prompt"], message.get("max_new_tokens", 256)))
+                if text is not None:
+                    with self._stats_lock:
+                        self._cache_hits += 1
+                    connection.send({"id": message["id"], "result": text})
+                    continue
+            self._queue.put((connection, message))
+
+    def _cache_key(self, prompt, max_new_tokens):
+        parameters = dict(getattr(self.backend, "parameters", {}), max_new_tokens=max_new_tokens)
+        return prompt_cache_key(getattr(self.backend, "name", ""), prompt, parameters)
+
+    def _next_batch(self):
+        """Block for the first request, then gather others until the batch is full or the wait is over"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return [item for item in batch if item is not None]
+
+    def _batch_loop(self):
+        while not self._closed.is_set():
+            batch = self._next_batch()
+            # One generate call per token budget, so no request gets more tokens than it asked for
+            groups = {}
+            for connection, message in batch:
+                groups.setdefault(message.get("max_new_tokens", 256), []).append((connection, message))
+            for max_new_tokens, group in groups.items():
+                self._run_batch(group, max_new_tokens)
+
+    def _run_batch(self, batch, max_new_tokens):
+        """Generate the answers to a batch of requests with the same token budget and send them back"""
+        # Sessions asking the same thing at the same time share one generation
+        unique = {}
+        for _, message in batch:
+            unique.setdefault((message.get("task", ""), message["prompt"]), len(unique))
+        tasks = [task for task, _ in unique]
+        prompts = [prompt for _, prompt in unique]
+
+        # Requests that stream get each piece of their text as it is generated
+        listeners = {}
+        for connection, message in batch:
+            if message.get("stream"):
+                listeners.setdefault(unique[(message.get("task", ""), message["prompt"])], []).append(
+                    (connection, message["id"])
+                )
+        on_text = None
+        if listeners:
+            def on_text(index, text):
+                for connection, request_id in listeners.get(index, ()):
+                    connection.send({"id": request_id, "chunk": text})
+
+        started = time.perf_counter()
+        try:
+            texts = self.backend.generate(tasks, prompts, max_new_tokens, on_text)
+            error = None
+        except Exception as e:
+            print(f"Error generating a batch of {len(prompts)}: {e}")
+            texts = [None] * len(prompts)
+            error = str(e)
+        if error is None and self.cache is not None:
+            # Stored under the parameters the text was actually generated with
+            for (_, prompt), index in unique.items():
+                try:
+                    self.cache.set(self._cache_key(prompt, max_new_tokens), texts[index])
+                except Exception as e:
+                    print(f"Error caching a completion: {e}")
+        with self._stats_lock:
+            self._batches += 1
+            self._batch_sizes[len(prompts)] = self._batch_sizes.get(len(prompts), 0) + 1
+            self._generate_seconds += time.perf_counter() - started
+            if error is not None:
+                self._errors += len(batch)
+        for connection, message in batch:
+            if error is not None:
+                connection.send({"id": message["id"], "error": error})
+                continue
+            text = texts[unique[(message.get("task", ""), message["prompt"])]]
+            connection.send({"id": message["id"], "result": text})
+
+    def stats(self):
+        """
+        Returns:
+        - Dictionary with requests received, requests answered from the prompt
+          cache, batches run, mean batch size (distinct prompts per generate
+          call), a histogram of batch sizes, failed requests, requests still
+          queued, the seconds spent generating and the prompt cache stats
+        """
+        with self._stats_lock:
+            stats = {
+                "model": getattr(self.backend, "name", type(self.backend).__name__),
+                "requests": self._requests,
+                "cache_hits": self._cache_hits,
+                "batches": self._batches,
+                "mean_batch_size": round(sum(size * count for size, count in self._batch_sizes.items()) / self._batches, 2)
+                if self._batches else 0,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "errors": self._errors,
+                "queued": self._queue.qsize(),
+                "generate_seconds": round(self._generate_seconds, 3),
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000
+            }
+        stats["prompt_cache"] = self.cache.stats() if self.cache is not None else None
+        return stats
+
+    def close(self):
+        self._closed.set()
+        # Wake the batch thread so it sees the flag
+        self._queue.put(None)
+        self._listener.close()
+
+
+class InferenceClient:
+    """
+    Connection from an app process to the inference worker
+
+    One connection is shared by every session of the process. Results come
+    back asynchronously and are matched to their request by id, so many
+    sessions can have prompts in flight at once. A request is waited on
+    either through a Future (submit) or piece by piece through a queue (stream).
+
+    Parameters:
+    - address: (host, port) of the worker
+    - authkey: Shared secret of the worker (defaults to get_authkey(), read when connecting)
+    - timeout: Seconds generate() waits for a result
+    """
+
+    def __init__(self, address, authkey=None, timeout=INFERENCE_TIMEOUT):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pending = {}
+        self._ids = itertools.count()
+
+    def _connection(self):
+        """Return the open connection, connecting (and starting its reader) if needed; call with the lock held"""
+        if self._conn is None:
+            if not self.breaker.allow_request():
+                raise ConnectionError("Inference worker is unreachable; not retrying for now")
+            authkey = self.authkey or get_authkey()
+            if authkey is None:
+                self.breaker.record_failure()
+                raise ConnectionError("No inference worker key; set INFERENCE_WORKER_AUTHKEY or start the worker first")
+            try:
+                conn = Client(self.address, authkey=authkey)
+            except (OSError, EOFError, AuthenticationError) as e:
+                self.breaker.record_failure()
+                raise ConnectionError(f"Can't reach the inference worker at {self.address}: {e}")
+            self.breaker.record_success()
+            self._conn = conn
+            threading.Thread(target=self._receive_loop, args=(conn,), daemon=True).start()
+        return self._conn
+
+    def _receive_loop(self, conn):
+        while True:
+            try:
+                message = conn.recv()
+            except (OSError, EOFError):
+                break
+            with self._lock:
+                if "chunk" in message:
+                    waiter = self._pending.get(message["id"])
+                else:
+                    waiter = self._pending.pop(message["id"], None)
+            if waiter is None:
+                continue
+            if isinstance(waiter, queue.Queue):
+                if "chunk" in message:
+                    waiter.put(("chunk", message["chunk"]))
+                elif "error" in message:
+                    waiter.put(("error", RuntimeError(message["error"])))
+                else:
+                    waiter.put(("done", message["result"]))
+            elif "error" in message:
+                waiter.set_exception(RuntimeError(message["error"]))
+            elif "result" in message:
+                waiter.set_result(message["result"])
+        # Connection lost: fail whatever is still waiting so sessions can fall back
+        with self._lock:
+            if self._conn is conn:
+                self._conn = None
+            pending = list(self._pending.values())
+            self._pending.clear()
+        error = ConnectionError("Lost the connection to the inference worker")
+        for waiter in pending:
+            if isinstance(waiter, queue.Queue):
+                waiter.put(("error", error))
+            elif not waiter.done():
+                waiter.set_exception(error)
+
+    def _send(self, message, waiter=None):
+        """Send a request; its answer goes to waiter (a queue), or to the Future returned"""
+        if waiter is None:
+            waiter = Future()
+        with self._lock:
+            conn = self._connection()
+            message["id"] = next(self._ids)
+            self._pending[message["id"]] = waiter
+            try:
+                conn.send(message)
+            except (OSError, EOFError) as e:
+                self._pending.pop(message["id"], None)
+                self._conn = None
+                raise ConnectionError(f"Lost the connection to the inference worker: {e}")
+        return waiter
+
+    def available(self):
+        """False while recent failures to reach the worker keep the client from trying again"""
+        return self.breaker.state != OPEN
+
+    def submit(self, task, prompt, max_new_tokens=256):
+        """
+        Queue a prompt with the worker without waiting for it
+
+        Parameters:
+        - task: What the text is for (WEATHER, ITINERARY or CAPTION)
+        - prompt: Prompt text
+        - max_new_tokens: Most tokens to generate
+
+        Returns:
+        - concurrent.futures.Future resolving to the generated text
+
+        Raises:
+        - ConnectionError if the worker can't be reached
+        """
+        return self._send({"op": "generate", "task": task, "prompt": prompt, "max_new_tokens": max_new_tokens})
+
+    def generate(self, task, prompt, max_new_tokens=256):
+        """Submit a prompt and wait up to the client timeout for its text"""
+        return self.submit(task, prompt, max_new_tokens).result(timeout=self.timeout)
+
+    def stream(self, task, prompt, max_new_tokens=256):
+        """
+        Submit a prompt and yield its text piece by piece as the worker generates it
+
+        Raises:
+        - ConnectionError, TimeoutError or RuntimeError if the worker fails to answer
+        """
+        pieces = queue.Queue()
+        self._send({"op": "generate", "task": task, "prompt": prompt, "max_new_tokens": max_new_tokens, "stream": True},
+                   pieces)
+        received = ""
+        while True:
+            try:
+                kind, value = pieces.get(timeout=self.timeout)
+            except queue.Empty:
+                raise TimeoutError("The inference worker stopped answering")
+            if kind == "chunk":
+                received += value
+                yield value
+            elif kind == "error":
+                raise value
+            else:
+                # A prompt answered from the cache comes back whole, without pieces
+                if value.startswith(received) and len(value) > len(received):
+                    yield value[len(received):]
+                return
+
+    def stats(self):
+        """Batching stats reported by the worker"""
+        return self._send({"op": "stats"}).result(timeout=self.timeout)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def get_inference_client():
+    """Return the shared client of the inference worker, or None if INFERENCE_WORKER_ADDRESS isn't set"""
+    global _client
+    if not INFERENCE_WORKER_ADDRESS:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = InferenceClient(parse_address(INFERENCE_WORKER_ADDRESS))
+    return _client
+
+
+def _local_cache_key(model, prompt, max_new_tokens):
+    return prompt_cache_key(model_id(model), prompt, dict(sampling_parameters(model), max_new_tokens=max_new_tokens))
+
+
+def generate_text(task, prompt, max_new_tokens=256, model=None, tokenizer=None):
+    """
+    Generate text for a prompt on the inference worker, or on a model loaded in this process
+
+    Parameters:
+    - task: What the text is for (WEATHER, ITINERARY or CAPTION)
+    - prompt: Prompt text
+    - max_new_tokens: Most tokens to generate
+    - model, tokenizer: Model to use when no worker is configured
+
+    Returns:
+    - The generated text, or None if there is neither a worker nor a model
+
+    Raises:
+    - ConnectionError, TimeoutError or RuntimeError if the worker fails to answer
+    """
+    client = get_inference_client()
+    if client is not None:
+        # The worker checks the prompt cache itself
+        return client.generate(task, prompt, max_new_tokens)
+    if model is None or tokenizer is None:
+        return None
+
+    cache = get_prompt_cache()
+    if cache is not None:
+        key = _local_cache_key(model, prompt, max_new_tokens)
+        text = cache.get(key)
+        if text is not None:
+            return text
+    inputs = tokenizer(prompt, return_tensors="pt")
+    output = model.generate(**inputs, max_new_tokens=max_new_tokens)
+    text = tokenizer.decode(output[0][inputs["input_ids"].shape[1]:], skip_special_tokens=True)
+    if cache is not None:
+        cache.set(key, text)
+    return text
+
+
+def stream_text(task, prompt, max_new_tokens=256, model=None, tokenizer=None):
+    """
+    Like generate_text, but yield the text piece by piece as it is generated
+
+    Yields nothing if there is neither a worker nor a model. A completion found
+    in the prompt cache comes out in one piece.
+
+    Raises:
+    - ConnectionError, TimeoutError or RuntimeError if generation fails
+    """
+    client = get_inference_client()
+    if client is not None:
+        yield from client.stream(task, prompt, max_new_tokens)
+        return
+    if model is None or tokenizer is None:
+        return
+
+    cache = get_prompt_cache()
+    key = _local_cache_key(model, prompt, max_new_tokens)
+    if cache is not None:
+        text = cache.get(key)
+        if text is not None:
+            yield text
+            return
+
+    # Generate in a thread and hand the pieces over as the streamer reports them
+    pieces = queue.Queue()
+
+    def run():
+        try:
+            text = LanguageModel(model, tokenizer).generate(
+                [task], [prompt], max_new_tokens, lambda index, piece: pieces.put(("chunk", piece))
+            )[0]
+        except Exception as e:
+            pieces.put(("error", e))
+            return
+        if cache is not None:
+            cache.set(key, text)
+        pieces.put(("done", text))
+
+    threading.Thread(target=run, daemon=True).start()
+    while True:
+        kind, value = pieces.get()
+        if kind == "chunk":
+            yield value
+        elif kind == "error":
+            raise value
+        else:
+            return
+
+
+def main():
+    """Run the inference worker"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local inference worker with dynamic batching")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="Serve generation requests from the app")
+    serve.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    serve.add_argument("--port", type=int, default=8766, help="Port to listen on")
+    serve.add_argument("--model", default="llm", help='Registered model to serve, or "stub" for CPU-only tests')
+    serve.add_argument("--max-batch", type=int, default=INFERENCE_MAX_BATCH, help="Most prompts per generate call")
+    serve.add_argument("--max-wait-ms", type=float, default=INFERENCE_MAX_WAIT_MS,
+                       help="Longest a request waits for a batch to fill")
+    serve.add_argument("--stub-latency", type=float, default=0.0, help="Seconds per generate call of the stub model")
+    serve.add_argument("--no-cache", action="store_true", help="Always run the model, even for prompts in the prompt cache")
+    args = parser.parse_args()
+
+    if not is_loopback(args.host) and not INFERENCE_WORKER_AUTHKEY:
+        print(f"Refusing to listen on {args.host} without INFERENCE_WORKER_AUTHKEY; "
+              f"anyone who can reach the port could run code in the worker")
+        return 1
+    try:
+        backend = load_backend(args.model, args.stub_latency)
+    except Exception as e:
+        print(f"Error loading model {args.model}: {e}")
+        return 1
+    cache = None if args.no_cache else get_prompt_cache()
+    try:
+        worker = InferenceWorker(backend, (args.host, args.port), args.max_batch, args.max_wait_ms, cache=cache).start()
+    except (OSError, RuntimeError) as e:
+        print(f"Error starting the inference worker: {e}")
+        return 1
+    host, port = worker.address
+    print(f"🧠 Serving {getattr(backend, 'name', args.model)} at {host}:{port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(60)
+            stats = worker.stats()
+            print(f"{stats['requests']} requests, {stats['cache_hits']} from the prompt cache, "
+                  f"{stats['batches']} batches with mean size {stats['mean_batch_size']}")
+    except KeyboardInterrupt:
+        worker.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
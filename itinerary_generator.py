@@ -0,0 +1,180 @@
+"""
+Model-written day-by-day itineraries.
+
+The model is asked for a plain-text plan, one line per part of the day:
+
+    Day 1: Arrival & Welcome
+    Morning: Title - Description
+    Afternoon: Title - Description
+    Evening: Title - Description
+
+which is parsed into the daily_plan structure the itinerary page renders.
+The text is parsed as it streams in, so each day can be shown as soon as the
+model has written it rather than when the whole plan is done.
+"""
+
+import itertools
+import re
+
+from inference_worker import ITINERARY, stream_text
+
+PERIODS = ("morning", "afternoon", "evening")
+
+# Tokens allowed per day of the trip
+TOKENS_PER_DAY = 160
+
+_DAY_LINE = re.compile(r"^\W*day\s+(\d+)\s*[:.\-–]\s*(.*)$", re.IGNORECASE)
+_PERIOD_LINE = re.compile(r"^\W*(morning|afternoon|evening)\W*\s*[:\-–]\s*(.*)$", re.IGNORECASE)
+_ACTIVITY_SEPARATOR = re.compile(r"\s+[-–—]\s+")
+
+
+def build_itinerary_prompt(destination, days, budget, purpose=None, weather=None):
+    """
+    Prompt asking the model for the whole trip
+
+    Parameters:
+    - destination: Destination as typed by the user
+    - days: Number of days of the trip
+    - budget: Budget level
+    - purpose: Optional trip purpose
+    - weather: Optional weather records (from WeatherRange.records) for the trip days
+
+    Returns:
+    - Prompt text
+    """
+    lines = [f"Plan a {days}-day trip to {destination} for a traveller on a {budget.lower()} budget."]
+    if purpose:
+        lines.append(f"The purpose of the trip is {purpose.lower()}.")
+    if weather:
+        forecast = "; ".join(
+            f"day {index + 1}: {day['weather']}, {day['temperature']}" for index, day in enumerate(weather[:days])
+        )
+        lines.append(f"Expected weather - {forecast}. Plan indoor activities for rainy days.")
+    lines.append(f"""Name real places. For each of the {days} days write exactly four lines in this format:
+Day N: Short theme for the day
+Morning: Activity title - One sentence description
+Afternoon: Activity title - One sentence description
+Evening: Activity title - One sentence description
+""")
+    return "\n".join(lines)
+
+
+def _split_activity(text):
+    """Split "Title - Description" into its parts; a line without a separator is all title"""
+    parts = _ACTIVITY_SEPARATOR.split(text, maxsplit=1)
+    return {"title": parts[0].strip(), "description": parts[1].strip() if len(parts) > 1 else ""}
+
+
+class ItineraryParser:
+    """
+    Parse a model-written plan into daily_plan entries as its text arrives
+
+    Lines that don't match the format are ignored, so chatter around the plan
+    doesn't matter. A day is complete once its morning, afternoon and evening
+    lines have all arrived.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._day = None
+
+    def feed(self, text):
+        """
+        Add the next piece of text
+
+        Returns:
+        - List of the days it completed, each a dictionary with day, day_name,
+          morning, afternoon and evening (each part of the day a dictionary
+          with title and description)
+        """
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        return self._parse_lines(lines)
+
+    def close(self):
+        """Parse whatever is left once the text has ended; returns the days it completed"""
+        lines = [self._buffer]
+        self._buffer = ""
+        return self._parse_lines(lines)
+
+    def _parse_lines(self, lines):
+        completed = []
+        for line in lines:
+            line = line.strip().replace("**", "")
+            match = _DAY_LINE.match(line)
+            if match:
+                self._day = {"day": int(match.group(1)), "day_name": match.group(2).strip() or f"Day {match.group(1)}"}
+                continue
+            match = _PERIOD_LINE.match(line)
+            if match and self._day is not None:
+                self._day[match.group(1).lower()] = _split_activity(match.group(2).strip())
+                if all(period in self._day for period in PERIODS):
+                    completed.append(self._day)
+                    self._day = None
+        return completed
+
+
+def parse_itinerary(text):
+    """
+    Parse a complete model-written plan
+
+    Returns:
+    - List of the complete days in it (see ItineraryParser.feed)
+    """
+    parser = ItineraryParser()
+    return parser.feed(text) + parser.close()
+
+
+def stream_itinerary(destination, days, budget, purpose=None, weather=None, model=None, tokenizer=None):
+    """
+    Have the language model write the itinerary and yield each day as soon as it is written
+
+    Generation runs on the inference worker if one is configured. If it fails
+    part way, the error is printed and the days written so far are all that is
+    yielded.
+
+    Parameters:
+    - destination, days, budget, purpose, weather: As for build_itinerary_prompt
+    - model, tokenizer: Model to use when no inference worker is configured
+
+    Yields:
+    - daily_plan entries numbered from 1, at most `days` of them; none if
+      there is no model
+    """
+    if days < 1:
+        return
+    prompt = build_itinerary_prompt(destination, days, budget, purpose, weather)
+    parser = ItineraryParser()
+    written = 0
+    try:
+        pieces = stream_text(ITINERARY, prompt, TOKENS_PER_DAY * days, model, tokenizer)
+        for piece in itertools.chain(pieces, [None]):
+            for day in parser.feed(piece) if piece is not None else parser.close():
+                written += 1
+                day["day"] = written
+                yield day
+                if written == days:
+                    return
+    except Exception as e:
+        print(f"Error generating the itinerary: {e}")
+
+
+def generate_itinerary(destination, days, budget, purpose=None, weather=None, model=None, tokenizer=None):
+    """
+    Have the language model write the whole itinerary, on the inference worker if one is configured
+
+    Parameters:
+    - destination, days, budget, purpose, weather: As for build_itinerary_prompt
+    - model, tokenizer: Model to use when no inference worker is configured
+
+    Returns:
+    - List of daily_plan entries, one per day, or None if there is no model or
+      its answer doesn't cover every part of every day
+    """
+    plan = list(stream_itinerary(destination, days, budget, purpose, weather, model, tokenizer))
+    if not plan:
+        return None
+    if len(plan) < days:
+        print(f"Model itinerary for {destination} is incomplete ({len(plan)} of {days} days)")
+        return None
+    return plan
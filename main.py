@@ -5,6 +5,9 @@ import pandas as pd
 import random
 from datetime import datetime, timedelta
 
+from inference_worker import get_inference_client
+from model_registry import FAILED, LOADED, get_model, get_registry, start_warm_up
+
 # Set page configuration
 st.set_page_config(
     page_title="AI Travel Magic - Itinerary & Trip Trailer Generator",
@@ -12,6 +15,11 @@ st.set_page_config(
     layout="wide"
 )
 
+# Start loading the models in the background; no page waits for them. The
+# inference worker has its own models, so none are loaded here when it is used
+if get_inference_client() is None:
+    start_warm_up()
+
 # App styling
 st.markdown("""
 <style>
@@ -120,22 +128,10 @@ if 'cinematic_trailer' not in st.session_state:
     st.session_state.cinematic_trailer = None
 if 'video_path' not in st.session_state:
     st.session_state.video_path = None
-if 'llm_model' not in st.session_state:
-    st.session_state.llm_model = None
-if 'llm_tokenizer' not in st.session_state:
-    st.session_state.llm_tokenizer = None
-if 'weather_model' not in st.session_state:
-    st.session_state.weather_model = None
-if 'weather_tokenizer' not in st.session_state:
-    st.session_state.weather_tokenizer = None
-if 'llm_loading_attempted' not in st.session_state:
-    st.session_state.llm_loading_attempted = False
 if 'weather_model_loaded' not in st.session_state:
     st.session_state.weather_model_loaded = False
 if 'destination_details' not in st.session_state:
     st.session_state.destination_details = {}
-if 'weather_cache' not in st.session_state:
-    st.session_state.weather_cache = {}
 if 'start_date' not in st.session_state:
     st.session_state.start_date = datetime.now().date()
 if 'end_date' not in st.session_state:
@@ -152,11 +148,6 @@ if 'preferences' not in st.session_state:
 if 'season' not in st.session_state:
     st.session_state.season = "Summer"
 
-# Simplified mock LLM model function
-def load_llm_model():
-    st.warning("Using simplified text generation. Actual AI model is not available.")
-    return None, None
-
 # Welcome page content
 st.title("✈️ AI Travel Magic")
 st.markdown("### Your personal travel itinerary & trip trailer generator")
@@ -196,12 +187,13 @@ st.markdown("""
 5. **Create trip trailer** - Generate a visual preview of your adventure
 """)
 
-# Load models in background if not already attempted
-if not st.session_state.llm_loading_attempted:
-    st.session_state.llm_loading_attempted = True
-    with st.spinner("Setting up AI models (this may take a moment)..."):
-        st.session_state.llm_model, st.session_state.llm_tokenizer = load_llm_model()
-        st.session_state.weather_model, st.session_state.weather_tokenizer = load_llm_model()  # Reusing same model
+# Report the background model loading without waiting for it
+if get_inference_client() is None:
+    llm_state = get_registry().status()["llm"]["state"]
+    if llm_state not in (LOADED, FAILED):
+        st.info("Setting up AI models in the background. Until they're ready, simplified text generation is used; see Settings for progress.")
+    elif llm_state == FAILED or get_model("llm", wait=False)[0] is None:
+        st.warning("Using simplified text generation. Actual AI model is not available.")
 
 # CTA Button
 st.markdown("### Ready to plan your adventure?")
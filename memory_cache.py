@@ -0,0 +1,138 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def _sizeof(value):
+    """Approximate memory used by a value made of strings, numbers, tuples, lists and dictionaries"""
+    size = sys.getsizeof(value)
+    if isinstance(value, (tuple, list)):
+        size += sum(_sizeof(item) for item in value)
+    elif isinstance(value, dict):
+        size += sum(_sizeof(key) + _sizeof(item) for key, item in value.items())
+    return size
+
+
+class MemoryCache:
+    """
+    Bounded in-process LRU cache shared by every session of a Streamlit server
+
+    Entries expire after `ttl` seconds. The least recently used entries are
+    evicted once there are more than `max_entries` of them or their estimated
+    size passes `max_bytes`. With a `backing` DiskCache, misses are looked up
+    there and writes go to both, so other processes and restarts see the values
+    too; values read back from disk come out of JSON, so tuples become lists.
+
+    Parameters:
+    - max_entries: Maximum number of entries kept in memory
+    - max_bytes: Maximum estimated memory used by keys and values
+    - ttl: Time-to-live of an entry in seconds (None means never expire)
+    - backing: Optional DiskCache used as a second level
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=16 * 1024 * 1024, ttl=None, backing=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.backing = backing
+        self._lock = threading.Lock()
+        # key -> (value, created, size), oldest access first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _store(self, key, value, created):
+        """Insert an entry and evict from the old end until back under both caps; caller holds the lock"""
+        if key in self._entries:
+            self._remove(key)
+        size = _sizeof(key) + _sizeof(value)
+        self._entries[key] = (value, created, size)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self._evictions += 1
+
+    def get(self, key):
+        """
+        Look up a cached value
+
+        Returns:
+        - The stored value, or None if the key is missing or expired
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self.ttl is None or now - entry[1] <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry[0]
+                self._remove(key)
+                self._expirations += 1
+
+        value = self.backing.get(key) if self.backing is not None else None
+        with self._lock:
+            if value is None:
+                self._misses += 1
+                return None
+            self._disk_hits += 1
+            # The disk copy may be older than the TTL says, but it is within the disk cache's own TTL
+            self._store(key, value, now)
+        return value
+
+    def set(self, key, value):
+        """Store a value (JSON-serializable if there is a backing cache)"""
+        with self._lock:
+            self._store(key, value, time.time())
+        if self.backing is not None:
+            self.backing.set(key, value)
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+        if self.backing is not None:
+            self.backing.delete(key)
+
+    def clear(self):
+        """Remove every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._hits = self._disk_hits = self._misses = self._evictions = self._expirations = 0
+        if self.backing is not None:
+            self.backing.clear()
+
+    def stats(self):
+        """
+        Report cache usage
+
+        Returns:
+        - Dictionary with hits, disk_hits, misses, hit_rate, evictions,
+          expirations, entries, bytes and the configured limits
+        """
+        with self._lock:
+            served = self._hits + self._disk_hits
+            lookups = served + self._misses
+            return {
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": served / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl
+            }
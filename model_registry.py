@@ -0,0 +1,330 @@
+"""
+Process-wide registry of the language models used by the app.
+
+Streamlit runs every browser session in the same server process, so a model
+loaded into st.session_state would be loaded again for every visitor. Models
+are registered here by name instead. Each one is loaded once per process,
+lazily on first use, and the same object is handed to every session, which
+must treat it as read-only (inference only, no fine-tuning or state changes).
+
+Set LLM_MODEL_NAME to a Hugging Face model ID to load a real model (this
+needs the transformers package); without it the app uses its simplified
+text generation.
+
+Loading a real model can take minutes, so start_warm_up() loads the models
+in a background thread as soon as the server handles its first request.
+Pages ask for a model with get_model(name, wait=False) and use the simplified
+generation until it is ready, instead of making the user wait.
+"""
+
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+LLM_MODEL_NAME = os.environ.get("LLM_MODEL_NAME", "")
+
+NOT_LOADED = "not_loaded"
+LOADING = "loading"
+LOADED = "loaded"
+FAILED = "failed"
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def resident_memory():
+    """
+    Resident memory of this process in bytes
+
+    Read from /proc on Linux; elsewhere falls back to the peak resident size
+    reported by getrusage, and to None where neither is available (Windows).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS reports bytes, Linux and the BSDs kilobytes
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _parameter_bytes(model):
+    """Memory held by a PyTorch model's parameters, or None for other objects"""
+    parameters = getattr(model, "parameters", None)
+    if parameters is None:
+        return None
+    try:
+        return sum(parameter.numel() * parameter.element_size() for parameter in parameters())
+    except (AttributeError, TypeError):
+        return None
+
+
+class _Entry:
+    __slots__ = ("loader", "shares", "lock", "state", "value", "error", "load_seconds", "memory_bytes",
+                 "started_at", "loaded_at")
+
+    def __init__(self, loader, shares):
+        self.loader = loader
+        self.shares = shares
+        self.lock = threading.Lock()
+        self.state = NOT_LOADED
+        self.value = None
+        self.error = None
+        self.load_seconds = None
+        self.memory_bytes = None
+        self.started_at = None
+        self.loaded_at = None
+
+
+class ModelRegistry:
+    """
+    Load each registered model once per process and share it between sessions
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._warm_up = None
+
+    def register(self, name, loader=None, shares=None):
+        """
+        Register a model under a name without loading it
+
+        Parameters:
+        - name: Name the model is looked up by, e.g. "llm"
+        - loader: Callable taking no arguments that loads and returns the model
+          (for language models, a (model, tokenizer) tuple)
+        - shares: Instead of a loader, the name of another registered model to
+          hand out under this name too (its memory is counted once)
+        """
+        if shares is not None:
+            loader = lambda: self._get_shared(shares)
+        with self._lock:
+            self._entries[name] = _Entry(loader, shares)
+
+    def _get_shared(self, name):
+        # Loader of an entry registered with shares=name: a failed target fails
+        # the sharing entry too, instead of handing out None as if loaded
+        value = self.get(name)
+        entry = self._entry(name)
+        if entry.state == FAILED:
+            raise RuntimeError(f"{name} failed to load: {entry.error}")
+        return value
+
+    def _entry(self, name):
+        with self._lock:
+            if name not in self._entries:
+                raise KeyError(f"No model registered as {name!r}")
+            return self._entries[name]
+
+    def get(self, name):
+        """
+        Return a model, loading it first if no session has used it yet
+
+        Concurrent first calls wait for a single load. A load that failed is
+        not retried until reload() is called.
+
+        Returns:
+        - Whatever the loader returned, or None if loading failed
+        """
+        entry = self._entry(name)
+        if entry.state == LOADED:
+            return entry.value
+        with entry.lock:
+            if entry.state in (LOADED, FAILED):
+                return entry.value
+            entry.state = LOADING
+            entry.started_at = time.time()
+            memory_before = resident_memory()
+            started = time.perf_counter()
+            try:
+                value = entry.loader()
+            except Exception as e:
+                print(f"Error loading model {name}: {e}")
+                entry.error = str(e)
+                entry.state = FAILED
+                return None
+            entry.load_seconds = time.perf_counter() - started
+            models = value if isinstance(value, tuple) else (value,)
+            parameter_bytes = [_parameter_bytes(model) for model in models]
+            if entry.shares is not None:
+                entry.memory_bytes = 0
+            elif any(size is not None for size in parameter_bytes):
+                entry.memory_bytes = sum(size for size in parameter_bytes if size is not None)
+            elif memory_before is not None:
+                entry.memory_bytes = max(0, resident_memory() - memory_before)
+            for model in models:
+                # Shared between sessions: inference mode only
+                if hasattr(model, "eval"):
+                    model.eval()
+            entry.value = value
+            entry.loaded_at = time.time()
+            entry.state = LOADED
+            return value
+
+    def is_loaded(self, name):
+        return self._entry(name).state == LOADED
+
+    def peek(self, name):
+        """Return a model if it is already loaded, or None, without ever waiting for a load"""
+        entry = self._entry(name)
+        return entry.value if entry.state == LOADED else None
+
+    def warm_up(self, names=None):
+        """
+        Load models in a background thread, one after the other
+
+        Only the first call starts a thread; later calls return the same one.
+
+        Parameters:
+        - names: Names to load, in order (defaults to every registered model)
+
+        Returns:
+        - The warm-up thread
+        """
+        with self._lock:
+            if self._warm_up is not None:
+                return self._warm_up["thread"]
+            if names is None:
+                names = list(self._entries)
+            thread = threading.Thread(target=self._run_warm_up, name="model-warm-up", daemon=True)
+            self._warm_up = {"thread": thread, "names": list(names), "started_at": time.time(), "finished_at": None}
+        thread.start()
+        return thread
+
+    def _run_warm_up(self):
+        for name in self._warm_up["names"]:
+            self.get(name)
+        self._warm_up["finished_at"] = time.time()
+
+    def warm_up_status(self):
+        """
+        Report the background warm-up
+
+        Returns:
+        - Dictionary with started (False until warm_up is called), the names
+          being warmed up, how many of them are loaded (or failed), the seconds
+          since it started (or that it took) and finished
+        """
+        warm_up = self._warm_up
+        if warm_up is None:
+            return {"started": False, "names": [], "done": 0, "seconds": None, "finished": False}
+        entries = [self._entry(name) for name in warm_up["names"]]
+        finished_at = warm_up["finished_at"]
+        return {
+            "started": True,
+            "names": warm_up["names"],
+            "done": sum(entry.state in (LOADED, FAILED) for entry in entries),
+            "seconds": (finished_at or time.time()) - warm_up["started_at"],
+            "finished": finished_at is not None
+        }
+
+    def reload(self, name):
+        """Drop a model (loaded or failed), and the entries sharing it, so the next get() loads it again"""
+        entry = self._entry(name)
+        with self._lock:
+            sharing = [other for other in self._entries.values() if other.shares == name]
+        for entry in [entry] + sharing:
+            with entry.lock:
+                entry.state = NOT_LOADED
+                entry.value = None
+                entry.error = None
+                entry.load_seconds = None
+                entry.memory_bytes = None
+                entry.started_at = None
+                entry.loaded_at = None
+
+    def status(self):
+        """
+        Report every registered model
+
+        Returns:
+        - Dictionary mapping name to its state, load_seconds, memory_bytes
+          (parameter memory, or the growth in resident memory while loading),
+          started_at, loaded_at, shares and error, plus "process_memory_bytes"
+          for the whole process (None where it can't be measured)
+        """
+        with self._lock:
+            entries = dict(self._entries)
+        report = {
+            name: {
+                "state": entry.state,
+                "load_seconds": entry.load_seconds,
+                "memory_bytes": entry.memory_bytes,
+                "started_at": entry.started_at,
+                "loaded_at": entry.loaded_at,
+                "shares": entry.shares,
+                "error": entry.error
+            }
+            for name, entry in entries.items()
+        }
+        report["process_memory_bytes"] = resident_memory()
+        return report
+
+
+def load_llm_model():
+    """
+    Load the text generation model named by LLM_MODEL_NAME
+
+    Returns:
+    - Tuple of (model, tokenizer), or (None, None) when no model is configured
+      and the app uses its simplified text generation
+    """
+    if not LLM_MODEL_NAME:
+        return None, None
+    try:
+        # Imported here rather than at module level so the first page render
+        # doesn't pay for it
+        import transformers
+    except ImportError:
+        raise RuntimeError("LLM_MODEL_NAME is set but the transformers package isn't installed")
+    tokenizer = transformers.AutoTokenizer.from_pretrained(LLM_MODEL_NAME)
+    model = transformers.AutoModelForCausalLM.from_pretrained(LLM_MODEL_NAME)
+    return model, tokenizer
+
+
+def get_registry():
+    """Return the process-wide model registry with the app's models registered"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                registry = ModelRegistry()
+                registry.register("llm", load_llm_model)
+                # Weather prediction reuses the text generation model
+                registry.register("weather", shares="llm")
+                _registry = registry
+    return _registry
+
+
+def start_warm_up():
+    """Start loading the app's models in the background (only the first call does anything)"""
+    get_registry().warm_up(["llm", "weather"])
+
+
+def get_model(name, wait=True):
+    """
+    Shared (model, tokenizer) for a registered model name
+
+    Parameters:
+    - name: Registered model name
+    - wait: If False, don't wait for a model that is still loading; the
+      background warm-up is started if it hasn't been
+
+    Returns:
+    - Tuple of (model, tokenizer); (None, None) if the model isn't available (yet)
+    """
+    registry = get_registry()
+    if not wait:
+        start_warm_up()
+        return registry.peek(name) or (None, None)
+    return registry.get(name) or (None, None)
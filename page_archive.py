@@ -0,0 +1,182 @@
+"""
+Archive of raw guide pages fetched by destination_scraper.
+
+Every page body is stored once, compressed, under the SHA-256 of its bytes.
+A small SQLite index maps each URL to its current body together with the
+ETag and Last-Modified headers the server sent, so refreshes can use
+conditional GETs and extraction patterns can be replayed offline with
+
+    python destination_scraper.py --reextract --workers 8
+
+Bodies are compressed with zstd when the zstandard package is installed and
+with gzip otherwise. The codec is recorded per body, so an archive written
+with one stays readable after switching to the other.
+"""
+
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_DIR = os.environ.get("PAGE_ARCHIVE_DIR", os.path.join("data", "page_archive"))
+
+
+def _compress(data):
+    if zstandard is not None:
+        return "zst", zstandard.ZstdCompressor(level=10).compress(data)
+    return "gz", gzip.compress(data, compresslevel=6)
+
+
+def _decompress(codec, blob):
+    if codec == "zst":
+        if zstandard is None:
+            raise RuntimeError("Page was archived with zstd but the zstandard package isn't installed")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return gzip.decompress(blob)
+
+
+def read_body(path, codec):
+    """Read and decompress one archived body; usable from worker processes without an index connection"""
+    with open(path, "rb") as f:
+        return _decompress(codec, f.read())
+
+
+class PageArchive:
+    """
+    Content-addressed store of raw page bodies with per-URL fetch metadata
+
+    Parameters:
+    - directory: Folder holding the index and the compressed bodies
+    """
+
+    def __init__(self, directory=ARCHIVE_DIR):
+        self.directory = directory
+        self._local = threading.local()
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    destination_id TEXT NOT NULL,
+                    destination TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    codec TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched REAL NOT NULL,
+                    truncated INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            # Archives written before streaming fetches existed lack the column
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(pages)")]
+            if "truncated" not in columns:
+                conn.execute("ALTER TABLE pages ADD COLUMN truncated INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS pages_digest ON pages (digest)")
+
+    def _connect(self):
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"), timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def blob_path(self, digest, codec):
+        return os.path.join(self.directory, "objects", digest[:2], f"{digest}.{codec}")
+
+    def get(self, url):
+        """
+        Look up what is archived for a URL
+
+        Returns:
+        - Dictionary with destination_id, destination, digest, codec, etag,
+          last_modified, fetched and truncated, or None if the URL was never archived
+        """
+        row = self._connect().execute("SELECT * FROM pages WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def read(self, page):
+        """Return the raw body of an archived page (a record from get or pages)"""
+        return read_body(self.blob_path(page["digest"], page["codec"]), page["codec"])
+
+    def put(self, url, data, destination_id, destination, etag=None, last_modified=None, truncated=False):
+        """
+        Archive a freshly fetched page body
+
+        Identical bodies are stored once however many URLs point to them, and a
+        body that no URL refers to any more is deleted. `truncated` marks a body
+        whose download was stopped at the size limit.
+
+        Returns:
+        - The SHA-256 digest the body is stored under
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        previous = self.get(url)
+        if previous is not None and previous["digest"] == digest:
+            codec = previous["codec"]
+        else:
+            codec, blob = _compress(data)
+            path = self.blob_path(digest, codec)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Write to a temporary name first so readers never see half a file
+                temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(temporary, "wb") as f:
+                    f.write(blob)
+                os.replace(temporary, path)
+
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, destination_id, destination, digest, codec, etag, last_modified, fetched, truncated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, destination_id, destination, digest, codec, etag, last_modified, time.time(), int(truncated))
+            )
+            orphaned = previous is not None and previous["digest"] != digest and conn.execute(
+                "SELECT 1 FROM pages WHERE digest = ? LIMIT 1", (previous["digest"],)
+            ).fetchone() is None
+        if orphaned:
+            try:
+                os.remove(self.blob_path(previous["digest"], previous["codec"]))
+            except OSError:
+                pass
+        return digest
+
+    def touch(self, url):
+        """Record that the server confirmed the archived body is still current (HTTP 304)"""
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE pages SET fetched = ? WHERE url = ?", (time.time(), url))
+
+    def pages(self):
+        """Return the records of every archived URL"""
+        return [dict(row) for row in self._connect().execute("SELECT * FROM pages ORDER BY destination_id, url")]
+
+    def stats(self):
+        """
+        Returns:
+        - Dictionary with the number of URLs, distinct bodies and compressed bytes on disk
+        """
+        conn = self._connect()
+        urls = conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+        blobs = conn.execute("SELECT DISTINCT digest, codec FROM pages").fetchall()
+        size = 0
+        for digest, codec in blobs:
+            try:
+                size += os.path.getsize(self.blob_path(digest, codec))
+            except OSError:
+                pass
+        return {"urls": urls, "bodies": len(blobs), "bytes": size}
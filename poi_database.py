@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Local database of points of interest loaded from a WikiVoyage XML dump.
+
+get_destination_info reads listings from here before it touches the network.
+Load or refresh the table with:
+
+    python poi_database.py enwikivoyage-latest-pages-articles.xml.bz2
+    python poi_database.py enwikivoyage-latest-pages-articles-multistream.xml.bz2 \
+        --index enwikivoyage-latest-pages-articles-multistream-index.txt.bz2 --workers 8
+
+The dump is decompressed and parsed as a stream, so memory use stays flat no
+matter how big the dump is. Listings are parsed in a process pool. Multistream
+dumps with an index file are split by stream, and each worker decompresses its
+own chunks.
+"""
+
+import argparse
+import bz2
+import io
+import os
+import re
+import sqlite3
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from destination_names import canonical_destination
+
+POI_DB_PATH = os.environ.get("POI_DB_PATH", os.path.join("data", "poi.sqlite3"))
+
+# Listing template types mapped to the categories get_destination_info returns
+LISTING_CATEGORIES = {
+    "see": "attractions",
+    "do": "activities",
+    "eat": "restaurants"
+}
+# Section headings that hold each category when listings are written as plain bullets
+SECTION_CATEGORIES = {
+    "see": "attractions",
+    "do": "activities",
+    "eat": "restaurants"
+}
+
+_SECTION_HEADING = re.compile(r'^(={2,})\s*([^=]+?)\s*\1\s*$', re.MULTILINE)
+_BOLD_BULLET = re.compile(r"^\*+\s*'''(.+?)'''", re.MULTILINE)
+_TEMPLATE_BRACES = re.compile(r'\{\{|\}\}')
+_TEMPLATE_TOKENS = re.compile(r'\{\{|\}\}|\[\[|\]\]|\|')
+_WIKI_LINK = re.compile(r'\[\[(?:[^|\]]*\|)?([^\]]*)\]\]')
+
+# How many pages are sent to a worker at once, and how many batches may be in flight
+BATCH_PAGES = 200
+MAX_PENDING_BATCHES = 4
+
+
+def connect(path=POI_DB_PATH):
+    """Open the POI database, creating the table and indexes if needed"""
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pois (
+                destination TEXT NOT NULL,
+                title TEXT NOT NULL,
+                category TEXT NOT NULL,
+                name TEXT NOT NULL,
+                description TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS pois_destination ON pois (destination, category)")
+    return conn
+
+
+def get_pois(destination_key, limit=15, path=POI_DB_PATH):
+    """
+    Look up the listings stored for a destination
+
+    Parameters:
+    - destination_key: Destination ID from canonical_destination
+    - limit: Maximum number of names per category
+
+    Returns:
+    - Dictionary mapping attractions/restaurants/activities to lists of names
+      (empty if the database doesn't exist or has nothing for this destination)
+    """
+    result = {"attractions": [], "restaurants": [], "activities": []}
+    if not os.path.exists(path):
+        return result
+
+    try:
+        conn = sqlite3.connect(path, timeout=10)
+        try:
+            for category in result:
+                rows = conn.execute(
+                    "SELECT name FROM pois WHERE destination = ? AND category = ? LIMIT ?",
+                    (destination_key, category, limit)
+                ).fetchall()
+                result[category] = [row[0] for row in rows]
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Error reading POI database: {e}")
+    return result
+
+
+def _split_template(body):
+    """Split template parameters on top-level pipes, ignoring pipes inside nested templates and links"""
+    parts = []
+    depth = 0
+    last = 0
+    for token in _TEMPLATE_TOKENS.finditer(body):
+        value = token.group()
+        if value in ("{{", "[["):
+            depth += 1
+        elif value in ("}}", "]]"):
+            depth = max(depth - 1, 0)
+        elif depth == 0:
+            parts.append(body[last:token.start()])
+            last = token.end()
+    parts.append(body[last:])
+    return parts
+
+
+def _iter_templates(wikitext):
+    """Yield the body of every top-level {{...}} template in the text"""
+    depth = 0
+    start = 0
+    for token in _TEMPLATE_BRACES.finditer(wikitext):
+        if token.group() == "{{":
+            if depth == 0:
+                start = token.end()
+            depth += 1
+        elif depth:
+            depth -= 1
+            if depth == 0:
+                yield wikitext[start:token.start()]
+
+
+def _plain(value):
+    """Strip wiki links and markup from a parameter value"""
+    value = _WIKI_LINK.sub(r'\1', value)
+    return " ".join(value.replace("'''", "").replace("''", "").split())
+
+
+def extract_listings(wikitext):
+    """
+    Extract See/Do/Eat listings from the wikitext of one article
+
+    Handles the listing templates ({{see|name=...}}, {{listing|type=eat|...}})
+    as well as bold bullet points under == See ==, == Do == and == Eat ==.
+
+    Returns:
+    - List of (category, name, description) tuples
+    """
+    listings = []
+    seen = set()
+
+    for template in _iter_templates(wikitext):
+        parts = _split_template(template)
+        kind = parts[0].strip().lower()
+        params = {}
+        for part in parts[1:]:
+            key, sep, value = part.partition("=")
+            if sep:
+                params[key.strip().lower()] = value.strip()
+        if kind == "listing":
+            kind = params.get("type", "").strip().lower()
+        category = LISTING_CATEGORIES.get(kind)
+        name = _plain(params.get("name", ""))
+        if category and name and (category, name) not in seen:
+            seen.add((category, name))
+            listings.append((category, name, _plain(params.get("content", params.get("description", "")))[:500]))
+
+    # Older articles list places as bullets with a bold name
+    headings = list(_SECTION_HEADING.finditer(wikitext))
+    for index, heading in enumerate(headings):
+        category = SECTION_CATEGORIES.get(heading.group(2).strip().lower())
+        if not category:
+            continue
+        level = len(heading.group(1))
+        end = len(wikitext)
+        for following in headings[index + 1:]:
+            if len(following.group(1)) <= level:
+                end = following.start()
+                break
+        for bullet in _BOLD_BULLET.finditer(wikitext, heading.end(), end):
+            name = _plain(bullet.group(1))
+            if name and (category, name) not in seen:
+                seen.add((category, name))
+                listings.append((category, name, ""))
+
+    return listings
+
+
+def _parse_pages(pages):
+    """Worker: turn a batch of (title, wikitext) pairs into POI rows"""
+    rows = []
+    for title, wikitext in pages:
+        destination = canonical_destination(title)
+        for category, name, description in extract_listings(wikitext):
+            rows.append((destination, title, category, name, description))
+    return rows
+
+
+def _pages_from_elements(events):
+    """
+    Yield (title, wikitext) for every main-namespace, non-redirect page in an iterparse stream
+
+    The stream must report "start" and "end" events; the first start event
+    gives the root element, which is emptied after every page.
+    """
+    title = ns = text = None
+    redirect = False
+    root = None
+    for event, element in events:
+        if event == "start":
+            if root is None:
+                root = element
+            continue
+        tag = element.tag.rsplit("}", 1)[-1]
+        if tag == "title":
+            title = element.text
+        elif tag == "ns":
+            ns = element.text
+        elif tag == "redirect":
+            redirect = True
+        elif tag == "text":
+            text = element.text
+        elif tag == "page":
+            if ns == "0" and not redirect and title and text:
+                yield title, text
+            title = ns = text = None
+            redirect = False
+            # Drop the finished page, and the root's reference to it, so memory
+            # doesn't grow with the dump
+            element.clear()
+            root.clear()
+
+
+def _parse_streams(dump_path, ranges):
+    """Worker: decompress a run of multistream chunks and parse the pages in them"""
+    pages = []
+    with open(dump_path, "rb") as f:
+        for offset, length in ranges:
+            f.seek(offset)
+            data = f.read(length) if length else f.read()
+            xml = bz2.BZ2Decompressor().decompress(data).decode("utf-8")
+            # The first and last streams carry the <mediawiki>/<siteinfo> wrapper; keep only the pages
+            start = xml.find("<page>")
+            end = xml.rfind("</page>")
+            if start == -1 or end == -1:
+                continue
+            fragment = "<pages>" + xml[start:end + len("</page>")] + "</pages>"
+            events = ET.iterparse(io.BytesIO(fragment.encode("utf-8")), events=("start", "end"))
+            pages.extend(_pages_from_elements(events))
+    return _parse_pages(pages)
+
+
+def _read_stream_offsets(index_path):
+    """Return the sorted, distinct stream offsets listed in a multistream index file"""
+    offsets = set()
+    with bz2.open(index_path, "rt", encoding="utf-8") as f:
+        for line in f:
+            offset = line.split(":", 1)[0]
+            if offset.isdigit():
+                offsets.add(int(offset))
+    return sorted(offsets)
+
+
+def _single_stream_batches(dump_path):
+    """Yield batches of pages read sequentially from a (possibly bz2-compressed) dump"""
+    opener = bz2.open if dump_path.endswith(".bz2") else open
+    with opener(dump_path, "rb") as f:
+        batch = []
+        for page in _pages_from_elements(ET.iterparse(f, events=("start", "end"))):
+            batch.append(page)
+            if len(batch) >= BATCH_PAGES:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def ingest(dump_path, index_path=None, workers=None, db_path=POI_DB_PATH):
+    """
+    Load every See/Do/Eat listing in a WikiVoyage dump into the POI table
+
+    Parameters:
+    - dump_path: Path to pages-articles(.xml|.xml.bz2) or the multistream variant
+    - index_path: Multistream index file; enables parallel decompression by stream
+    - workers: Number of worker processes (defaults to the CPU count)
+    - db_path: Where to write the POI database
+
+    Returns:
+    - Dictionary with the number of articles, listings and seconds taken
+    """
+    started = time.time()
+    workers = workers or os.cpu_count() or 1
+    # Build into a fresh file and swap it in at the end so readers never see a half-loaded table
+    build_path = db_path + ".building"
+    for leftover in (build_path, build_path + "-wal", build_path + "-shm"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    conn = connect(build_path)
+
+    stats = {"batches": 0, "listings": 0}
+
+    def store(rows):
+        with conn:
+            conn.executemany(
+                "INSERT INTO pois (destination, title, category, name, description) VALUES (?, ?, ?, ?, ?)", rows
+            )
+        stats["batches"] += 1
+        stats["listings"] += len(rows)
+        if stats["batches"] % 20 == 0:
+            print(f"  {stats['listings']} listings after {time.time() - started:.0f}s")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if index_path:
+            offsets = _read_stream_offsets(index_path)
+            ranges = [(offset, (offsets[i + 1] - offset) if i + 1 < len(offsets) else 0)
+                      for i, offset in enumerate(offsets)]
+            # Each multistream chunk holds 100 pages; group a couple per task
+            chunks = (ranges[i:i + max(1, BATCH_PAGES // 100)] for i in range(0, len(ranges), max(1, BATCH_PAGES // 100)))
+            tasks = ((_parse_streams, dump_path, chunk) for chunk in chunks)
+        else:
+            tasks = ((_parse_pages, batch) for batch in _single_stream_batches(dump_path))
+
+        # Keep only a few batches in flight so the reader can't race ahead of the workers
+        pending = set()
+        for task in tasks:
+            pending.add(pool.submit(*task))
+            if len(pending) >= MAX_PENDING_BATCHES * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    store(future.result())
+        for future in pending:
+            store(future.result())
+
+    articles = conn.execute("SELECT COUNT(DISTINCT destination) FROM pois").fetchone()[0]
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.close()
+    os.replace(build_path, db_path)
+    return {"articles": articles, "listings": stats["listings"], "seconds": time.time() - started}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load WikiVoyage See/Do/Eat listings into the local POI database")
+    parser.add_argument("dump", help="WikiVoyage pages-articles XML dump (.xml or .xml.bz2)")
+    parser.add_argument("--index", help="Multistream index file (enables parallel decompression)")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--db", default=POI_DB_PATH, help=f"Output database (default: {POI_DB_PATH})")
+    args = parser.parse_args()
+
+    print(f"📥 Loading listings from {args.dump}")
+    result = ingest(args.dump, index_path=args.index, workers=args.workers, db_path=args.db)
+    print(f"✅ {result['listings']} listings for {result['articles']} destinations in {result['seconds']:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""
+Persistent cache of language model completions.
+
+The same prompts come back all the time: the weather prompt for a popular
+destination and dates, the caption prompt for a well-known sight, the
+itinerary prompt for a common trip. Completions are stored on disk keyed by
+a hash of the model ID, the prompt and the generation parameters, so a
+repeated prompt skips inference entirely, across sessions and restarts.
+Set PROMPT_CACHE=0 to always run the model.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from disk_cache import DiskCache, CACHE_DIR
+
+PROMPT_CACHE = os.environ.get("PROMPT_CACHE", "1") == "1"
+PROMPT_CACHE_FILE = os.environ.get("PROMPT_CACHE_FILE", os.path.join(CACHE_DIR, "prompts.sqlite3"))
+PROMPT_CACHE_MAX_ENTRIES = int(os.environ.get("PROMPT_CACHE_MAX_ENTRIES", 20000))
+PROMPT_CACHE_TTL = int(os.environ.get("PROMPT_CACHE_TTL", 30 * 24 * 3600))
+
+_prompt_cache = None
+_prompt_cache_lock = threading.Lock()
+
+
+def prompt_cache_key(model_id, prompt, parameters):
+    """
+    Content hash identifying a completion
+
+    Parameters:
+    - model_id: Name of the model that generates the completion
+    - prompt: Prompt text
+    - parameters: Dictionary of generation parameters (max_new_tokens, sampling settings)
+
+    Returns:
+    - Hex digest to use as the cache key
+    """
+    content = json.dumps([model_id, prompt, parameters], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def get_prompt_cache():
+    """Return the shared prompt cache, or None if PROMPT_CACHE is off"""
+    global _prompt_cache
+    if not PROMPT_CACHE:
+        return None
+    if _prompt_cache is None:
+        with _prompt_cache_lock:
+            if _prompt_cache is None:
+                _prompt_cache = DiskCache(PROMPT_CACHE_FILE, ttl=PROMPT_CACHE_TTL, max_entries=PROMPT_CACHE_MAX_ENTRIES)
+    return _prompt_cache
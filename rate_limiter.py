@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import threading
+import time
+
+# Lower numbers are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+PRIORITY_BULK = 20
+
+# A waiter that hasn't polled for this long belongs to a dead process and is dropped
+_STALE_WAITER_SECONDS = 10
+# Upper bound on how long a waiter sleeps between polls
+_MAX_POLL_SECONDS = 0.25
+
+
+class HostRateLimiter:
+    """
+    Token-bucket rate limiter per host, shared by every process on the machine
+
+    Each host has a bucket that refills at `rate` tokens per second up to
+    `burst`; a request takes one token. Buckets and the queue of waiting
+    requests live in one SQLite file, so Streamlit workers and cache-warming
+    jobs running at the same time share the same budget. Waiters for a host
+    are served strictly by priority, then in arrival order, so an interactive
+    lookup goes ahead of queued bulk requests.
+
+    Parameters:
+    - path: Location of the SQLite file
+    - rate: Default requests per second allowed to each host
+    - burst: Default bucket size (requests that may go out back to back)
+    - host_rates: Optional dictionary of host -> (rate, burst) overrides
+    """
+
+    def __init__(self, path, rate=1.0, burst=3, host_rates=None):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self.host_rates = dict(host_rates or {})
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS buckets (
+                    host TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS waiters (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    host TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    seen REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS waiters_order ON waiters (host, priority, id)")
+
+    def _connect(self):
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Transactions are managed by hand so the bucket update can hold a write lock
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _limits(self, host):
+        return self.host_rates.get(host, (self.rate, self.burst))
+
+    def _try_take(self, conn, host, ticket, now):
+        """
+        Take a token if this ticket is first in line for the host
+
+        Returns:
+        - Seconds to wait before trying again, or 0 if the token was taken
+        """
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("UPDATE waiters SET seen = ? WHERE id = ?", (now, ticket))
+            conn.execute("DELETE FROM waiters WHERE seen < ?", (now - _STALE_WAITER_SECONDS,))
+            head = conn.execute(
+                "SELECT id FROM waiters WHERE host = ? ORDER BY priority, id LIMIT 1", (host,)
+            ).fetchone()
+            if head is None or head[0] != ticket:
+                conn.execute("COMMIT")
+                return _MAX_POLL_SECONDS / 5
+
+            rate, burst = self._limits(host)
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE host = ?", (host,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            if tokens >= 1:
+                conn.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (host, tokens - 1, now))
+                conn.execute("DELETE FROM waiters WHERE id = ?", (ticket,))
+                conn.execute("COMMIT")
+                return 0
+            conn.execute("COMMIT")
+            return (1 - tokens) / rate
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def acquire(self, host, priority=PRIORITY_INTERACTIVE, timeout=None):
+        """
+        Wait for permission to send one request to a host
+
+        Parameters:
+        - host: Host name, e.g. "en.wikivoyage.org"
+        - priority: PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND or PRIORITY_BULK
+        - timeout: Maximum seconds to wait (None waits as long as it takes)
+
+        Returns:
+        - True if the request may go ahead, False if the timeout ran out first
+        """
+        conn = self._connect()
+        started = time.monotonic()
+        with conn:
+            ticket = conn.execute(
+                "INSERT INTO waiters (host, priority, seen) VALUES (?, ?, ?)", (host, priority, time.time())
+            ).lastrowid
+
+        try:
+            while True:
+                wait_for = self._try_take(conn, host, ticket, time.time())
+                if wait_for == 0:
+                    ticket = None
+                    return True
+                if timeout is not None:
+                    remaining = timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        return False
+                    wait_for = min(wait_for, remaining)
+                time.sleep(min(wait_for, _MAX_POLL_SECONDS))
+        finally:
+            if ticket is not None:
+                with conn:
+                    conn.execute("DELETE FROM waiters WHERE id = ?", (ticket,))
+
+    def queue_depth(self, host):
+        """Number of requests currently waiting for a host, across all processes"""
+        return self._connect().execute("SELECT COUNT(*) FROM waiters WHERE host = ?", (host,)).fetchone()[0]
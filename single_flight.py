@@ -0,0 +1,79 @@
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one
+
+    While a call for a key is running, other callers asking for the same key
+    wait for it and get its result (or its exception) instead of starting
+    their own. Once it finishes, the next call for the key runs again, so
+    this only deduplicates work that is in flight; caching is up to the caller.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._executed = 0
+        self._shared = 0
+
+    def do(self, key, function):
+        """
+        Run function() for a key, or wait for the call already running for it
+
+        Parameters:
+        - key: Hashable key identifying the work
+        - function: Callable taking no arguments
+
+        Returns:
+        - The function's return value, shared by every caller that joined the call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._executed += 1
+            else:
+                call.waiters += 1
+                self._shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        """Number of keys with a call running right now"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        """
+        Returns:
+        - Dictionary with the number of calls executed and of callers that shared another's call
+        """
+        with self._lock:
+            return {"executed": self._executed, "shared": self._shared, "in_flight": len(self._calls)}
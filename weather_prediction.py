@@ -0,0 +1,327 @@
+import json
+import os
+import re
+import threading
+import zlib
+from datetime import timedelta
+
+import numpy as np
+
+from climatology import day_of_year, estimate_weather as estimate_from_normals
+from destination_names import canonical_destination
+from disk_cache import DiskCache, CACHE_DIR
+from forecast_provider import forecast_weather
+from gazetteer import destination_season, locate, season_for
+from inference_worker import WEATHER, generate_text, get_inference_client
+from memory_cache import MemoryCache
+from station_history import estimate_weather as estimate_from_history
+
+# Predicted days are shared by every session of the server, so a popular
+# destination and date is only computed once. Set WEATHER_CACHE_DISK=1 to also
+# keep them on disk, shared between processes and kept across restarts.
+WEATHER_CACHE_MAX_ENTRIES = int(os.environ.get("WEATHER_CACHE_MAX_ENTRIES", 50000))
+WEATHER_CACHE_MAX_BYTES = int(os.environ.get("WEATHER_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+WEATHER_CACHE_TTL = int(os.environ.get("WEATHER_CACHE_TTL", 24 * 3600))
+WEATHER_CACHE_DISK = os.environ.get("WEATHER_CACHE_DISK", "0") == "1"
+
+# Weather by season as (description, temperature range, icon) for destinations without climate normals
+SEASON_WEATHER = {
+    "Spring": [
+        ("Mild and sunny", "15-22°C (59-72°F)", "⛅"),
+        ("Light showers", "12-18°C (54-64°F)", "🌧️"),
+        ("Partly cloudy", "14-20°C (57-68°F)", "☁️")
+    ],
+    "Summer": [
+        ("Hot and sunny", "25-32°C (77-90°F)", "☀️"),
+        ("Warm with clouds", "22-28°C (72-82°F)", "⛅"),
+        ("Afternoon thunderstorm", "23-30°C (73-86°F)", "⛈️")
+    ],
+    "Fall": [
+        ("Cool and breezy", "12-18°C (54-64°F)", "⛅"),
+        ("Misty morning", "10-16°C (50-61°F)", "🌫️"),
+        ("Partly cloudy", "13-20°C (55-68°F)", "☁️")
+    ],
+    "Winter": [
+        ("Cold and clear", "2-8°C (36-46°F)", "☀️"),
+        ("Light snow", "-2-5°C (28-41°F)", "❄️"),
+        ("Overcast", "0-6°C (32-43°F)", "☁️")
+    ]
+}
+
+# Destinations with extreme weather get their own table for one season
+EXTREME_WEATHER = [
+    (("Iceland", "Norway"), "Winter", [
+        ("Very cold", "-10-0°C (14-32°F)", "❄️"),
+        ("Snow showers", "-15--5°C (5-23°F)", "❄️"),
+        ("Northern lights", "-12--2°C (10-28°F)", "☀️")
+    ]),
+    (("Dubai", "Egypt"), "Summer", [
+        ("Extremely hot", "35-45°C (95-113°F)", "☀️"),
+        ("Hot and dry", "33-42°C (91-108°F)", "☀️"),
+        ("Hot and hazy", "34-43°C (93-109°F)", "☀️")
+    ])
+]
+
+_JSON_ARRAY = re.compile(r'\[.*\]', re.DOTALL)
+
+_weather_cache = None
+_weather_cache_lock = threading.Lock()
+
+
+class WeatherRange:
+    """
+    Weather for consecutive trip days, stored column-wise in NumPy arrays
+
+    Iterating yields (date, weather_description, temperature_range, weather_icon)
+    for each day, and records() gives the dictionaries the itinerary page uses.
+
+    Parameters:
+    - start: First day of the range; the other days follow one day apart
+    - descriptions, temperatures, icons: One entry per day
+    - estimated: True if any day was estimated from climate data instead of predicted by the model
+    """
+
+    def __init__(self, start, descriptions, temperatures, icons, estimated=False):
+        self.start = start
+        self.descriptions = np.asarray(descriptions, dtype=object)
+        self.temperatures = np.asarray(temperatures, dtype=object)
+        self.icons = np.asarray(icons, dtype=object)
+        self.estimated = estimated
+
+    def __len__(self):
+        return len(self.descriptions)
+
+    def date(self, index):
+        return self.start + timedelta(days=index)
+
+    def __getitem__(self, index):
+        return self.descriptions[index], self.temperatures[index], self.icons[index]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield (self.date(index),) + self[index]
+
+    def records(self):
+        """Return one dictionary per day with date, day_name, weather, temperature and icon"""
+        return [
+            {
+                "date": date.strftime("%Y-%m-%d"),
+                "day_name": date.strftime("%A"),
+                "weather": description,
+                "temperature": temperature,
+                "icon": icon
+            }
+            for date, description, temperature, icon in self
+        ]
+
+
+def get_weather_cache():
+    """Return the process-wide cache of predicted days, keyed by weather_cache_key"""
+    global _weather_cache
+    if _weather_cache is None:
+        with _weather_cache_lock:
+            if _weather_cache is None:
+                backing = None
+                if WEATHER_CACHE_DISK:
+                    backing = DiskCache(
+                        os.path.join(CACHE_DIR, "weather.sqlite3"),
+                        ttl=WEATHER_CACHE_TTL,
+                        max_entries=WEATHER_CACHE_MAX_ENTRIES
+                    )
+                _weather_cache = MemoryCache(
+                    max_entries=WEATHER_CACHE_MAX_ENTRIES,
+                    max_bytes=WEATHER_CACHE_MAX_BYTES,
+                    ttl=WEATHER_CACHE_TTL,
+                    backing=backing
+                )
+    return _weather_cache
+
+
+def weather_cache_key(destination, date, season):
+    return f"{canonical_destination(destination)}_{date.strftime('%Y-%m-%d')}_{season}"
+
+
+def season_table(destination, season):
+    """Weather options for a destination in a season, with extreme-weather overrides applied"""
+    for places, extreme_season, table in EXTREME_WEATHER:
+        if season == extreme_season and any(place in destination for place in places):
+            return table
+    return SEASON_WEATHER.get(season, SEASON_WEATHER["Spring"])
+
+
+def build_range_prompt(destination, dates, season):
+    """One prompt asking the model for every day of the trip at once"""
+    days = ", ".join(date.strftime("%B %d") for date in dates)
+    return f"""Predict the most likely weather for {destination} during {season} season on each of these days: {days}.
+Return the response as a valid JSON array with exactly {len(dates)} objects, one per day in the same order, each in this exact format:
+{{
+  "weather_description": "Short 2-3 word description (e.g., 'Sunny and clear', 'Light rain', 'Partly cloudy')",
+  "temperature_range": "Temperature range in both Celsius and Fahrenheit (e.g., '18-24°C (64-75°F)')",
+  "weather_icon": "One of: ☀️ (sunny), ⛅ (partly cloudy), ☁️ (cloudy), 🌧️ (rainy), ⛈️ (thunderstorm), ❄️ (snow), 🌫️ (foggy)"
+}}
+"""
+
+
+def _predict_with_model(destination, dates, season, model, tokenizer):
+    """
+    Ask the language model for the whole range in a single generate call, on
+    the inference worker if one is configured
+
+    Returns:
+    - List of (description, temperature range, icon) tuples, one per date, or
+      None if there is no model to ask
+    """
+    prompt = build_range_prompt(destination, dates, season)
+    text = generate_text(WEATHER, prompt, 80 * len(dates), model, tokenizer)
+    if text is None:
+        return None
+
+    match = _JSON_ARRAY.search(text)
+    if not match:
+        raise ValueError("Model response has no JSON array")
+    days = json.loads(match.group(0))
+    if len(days) != len(dates):
+        raise ValueError(f"Model returned {len(days)} days instead of {len(dates)}")
+    return [(day["weather_description"], day["temperature_range"], day["weather_icon"]) for day in days]
+
+
+def _estimate(destination, dates, season):
+    """
+    Estimate the weather without a model: from the forecast provider for days
+    within its horizon, and from the climate for the others
+
+    Returns:
+    - Three object arrays: descriptions, temperature ranges and icons
+    """
+    forecast = forecast_weather(destination, dates)
+    if forecast is None:
+        return _estimate_from_climate(destination, dates, season)
+
+    covered = forecast[0]
+    columns = [np.empty(len(dates), dtype=object) for _ in range(3)]
+    for column, values in zip(columns, forecast[1:]):
+        column[covered] = values
+    if not covered.all():
+        rest = np.flatnonzero(~covered)
+        for column, values in zip(columns, _estimate_from_climate(destination, [dates[index] for index in rest], season)):
+            column[rest] = values
+    return columns
+
+
+def _estimate_from_climate(destination, dates, season):
+    """
+    Typical weather for the dates: from the nearest station's daily history
+    when one has been ingested, else from the climate normals, else from the
+    season table
+
+    Returns:
+    - Three object arrays: descriptions, temperature ranges and icons
+    """
+    estimate = estimate_from_history(destination, dates)
+    if estimate is None:
+        estimate = estimate_from_normals(destination, dates)
+    if estimate is not None:
+        return estimate
+
+    # Where the gazetteer knows the hemisphere, each day gets the season it really falls in
+    location = locate(destination)
+    if location is not None:
+        seasons = np.array([season_for(date.month, location[0]) for date in dates], dtype=object)
+    else:
+        seasons = np.full(len(dates), season, dtype=object)
+
+    # Walk through the season table by day so the same trip always gets the same weather
+    seed = zlib.crc32(canonical_destination(destination).encode("utf-8"))
+    offsets = day_of_year(dates).astype(np.int64) + seed
+    columns = [np.empty(len(dates), dtype=object) for _ in range(3)]
+    for name in set(seasons.tolist()):
+        days = seasons == name
+        table = season_table(destination, name)
+        picks = offsets[days] % len(table)
+        for column, values in zip(columns, zip(*table)):
+            column[days] = np.array(values, dtype=object)[picks]
+    return columns
+
+
+def predict_weather_range(destination, start, end, season, model=None, tokenizer=None, cache=None):
+    """
+    Predict the weather for every day of a trip in one pass
+
+    Days already in the cache are reused; all the others are computed together,
+    with one model call when the inference worker or a model is available, or
+    otherwise one forecast request for the days within the provider's horizon
+    and one vectorized lookup in the station history or climate normals for the rest.
+
+    Parameters:
+    - destination: Destination as typed by the user
+    - start: First day of the trip (date)
+    - end: Day the trip ends; days run from start up to but not including end
+    - season: Season selected for the trip ("Spring", "Summer", "Fall" or "Winter"),
+      or None for the season at the destination when the trip starts
+    - model, tokenizer: Optional language model used for the prediction when
+      no inference worker is configured
+    - cache: Cache of per-day results with get and set (a MemoryCache, DiskCache or
+      dictionary); defaults to the process-wide cache from get_weather_cache.
+      Days that were estimated are reused only while there is still no model to ask
+
+    Returns:
+    - WeatherRange with one entry per day
+    """
+    if season is None:
+        season = destination_season(destination, start)
+    count = max(0, (end - start).days)
+    dates = [start + timedelta(days=index) for index in range(count)]
+    keys = [weather_cache_key(destination, date, season) for date in dates]
+    if cache is None:
+        cache = get_weather_cache()
+    store = cache.__setitem__ if isinstance(cache, dict) else cache.set
+
+    # Days estimated while no model was available (e.g. still warming up, or the
+    # worker unreachable) are predicted again once one is
+    client = get_inference_client()
+    can_predict = (client is not None and client.available()) or (model is not None and tokenizer is not None)
+    descriptions = np.empty(count, dtype=object)
+    temperatures = np.empty(count, dtype=object)
+    icons = np.empty(count, dtype=object)
+    missing = []
+    estimated = False
+    for index, key in enumerate(keys):
+        cached = cache.get(key)
+        # Entries are (description, temperature, icon, estimated); anything else is from an older version
+        if cached is not None and len(cached) == 4 and not (can_predict and cached[3]):
+            descriptions[index], temperatures[index], icons[index], was_estimated = cached
+            estimated = estimated or was_estimated
+        else:
+            missing.append(index)
+
+    if missing:
+        missing = np.array(missing)
+        predicted = None
+        if can_predict:
+            try:
+                predicted = _predict_with_model(destination, [dates[index] for index in missing], season, model, tokenizer)
+            except Exception as e:
+                print(f"Error predicting weather with the model: {e}")
+        if predicted is not None:
+            descriptions[missing], temperatures[missing], icons[missing] = (
+                np.array(column, dtype=object) for column in zip(*predicted)
+            )
+        else:
+            estimated = True
+            descriptions[missing], temperatures[missing], icons[missing] = _estimate(
+                destination, [dates[index] for index in missing], season
+            )
+        for index in missing:
+            store(keys[index], (descriptions[index], temperatures[index], icons[index], predicted is None))
+
+    return WeatherRange(start, descriptions, temperatures, icons, estimated=estimated)
+
+
+def predict_weather(destination, date, season, model=None, tokenizer=None, cache=None):
+    """
+    Predict the weather for a single day
+
+    Returns:
+    - Tuple of (weather_description, temperature_range, weather_icon)
+    """
+    return predict_weather_range(destination, date, date + timedelta(days=1), season, model, tokenizer, cache)[0]